@@ -0,0 +1,391 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import sys
+import json
+import random
+import hashlib
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime
+from time import perf_counter
+from timeit import Timer
+
+import coders
+import hashes
+from textsdb import TextsDB
+
+
+SIZES = ('1K', '64K', '1M', '16M')
+SIZE_UNITS = {'': 1, 'K': 2 ** 10, 'M': 2 ** 20, 'G': 2 ** 30}
+ALPHABETS = {
+    'latin': 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ',
+    'cyrillic': 'абвгдежзийклмнопрстуфхцчшщъыьэюя'
+                'АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ',
+    'mixed': 'abcdefghijklmnopqrstuvwxyzабвгдежзийклмнопрстуфхцчшщъыьэюя'
+             '0123456789😀😂🙂🚀🔥✨',
+}
+KEYS = {'ROT13': 13, 'Vigenere': 'keyключ'}
+SEED = 42
+BLOCK_SIZE = coders.CHUNK_SIZE
+# larger inputs are converted by streaming API to keep memory bounded
+DIRECT_MAX = 64 * 2 ** 20
+DB_ROW_SIZE = 4096
+DB_READS = 100
+DB_QUERIES = 20
+REPEAT = 3
+THRESHOLD = 0.1
+# peak memory below this is too noisy to be compared with baseline
+MEMORY_FLOOR = 64 * 1024
+RESULTS_FILE = 'bench_results.json'
+
+# run() returns bytes out, setup() (if any) runs before every timed call
+Case = namedtuple('Case', ('name', 'run', 'bytes_in', 'setup'))
+
+
+def parse_size(text):
+    """Convert size like '64K', '1M' or '1G' to integer"""
+    match = re.fullmatch(r'\s*(\d+)\s*([KMG]?)B?\s*', text.upper())
+    if not match:
+        raise ValueError(f'Bad size {text!r}')
+    return int(match[1]) * SIZE_UNITS[match[2]]
+
+
+def make_block(alphabet, size=BLOCK_SIZE, seed=SEED):
+    """Pseudo-random text of words made of alphabet chars"""
+    rnd = random.Random(seed)
+    chars = ALPHABETS[alphabet]
+    words = []
+    length = 0
+    while length < size:
+        word = ''.join(rnd.choices(chars, k=rnd.randint(2, 9)))
+        word += rnd.choice('      ,.\n')
+        words.append(word)
+        length += len(word)
+    return ''.join(words)[:size]
+
+
+def iter_text(size, alphabet):
+    """Text of size chars by BLOCK_SIZE chunks"""
+    block = make_block(alphabet)
+    for start in range(0, size, len(block)):
+        yield block[:size - start]
+
+
+def make_text(size, alphabet):
+    """Text of size chars in one string"""
+    return ''.join(iter_text(size, alphabet))
+
+
+def text_bytes(size, alphabet):
+    """UTF-8 length of make_text(size, alphabet)"""
+    return sum(len(chunk.encode('utf-8'))
+               for chunk in iter_text(size, alphabet))
+
+
+def codec_cases(size, label, alphabet):
+    """Encode and decode cases for every registered codec.
+    Inputs larger than DIRECT_MAX are converted by streaming API,
+    decoding is measured as encode + decode round trip then."""
+    if size > DIRECT_MAX:
+        bytes_in = text_bytes(size, alphabet)
+        for algorithm in coders.CODERS:
+            key = KEYS.get(algorithm)
+
+            def encode(algorithm=algorithm, key=key):
+                return sum(len(chunk) for chunk in coders.encode_stream(
+                    iter_text(size, alphabet), algorithm, key))
+
+            def roundtrip(algorithm=algorithm, key=key):
+                chunks = coders.encode_stream(iter_text(size, alphabet),
+                                              algorithm, key)
+                return sum(len(chunk) for chunk in
+                           coders.decode_stream(chunks, algorithm, key))
+
+            yield Case(f'codec/{algorithm}/encode/{alphabet}/{label}',
+                       encode, bytes_in, None)
+            if coders.REGISTRY[algorithm].decode:
+                yield Case(f'codec/{algorithm}/roundtrip/{alphabet}/{label}',
+                           roundtrip, bytes_in, None)
+        return
+
+    text = make_text(size, alphabet)
+    bytes_in = len(text.encode('utf-8'))
+    for algorithm, codec in coders.REGISTRY.items():
+        key = KEYS.get(algorithm)
+        encoded = codec.encode(text, key)
+        yield Case(f'codec/{algorithm}/encode/{alphabet}/{label}',
+                   lambda codec=codec, key=key: len(codec.encode(text, key)),
+                   bytes_in, None)
+        if codec.decode:
+            yield Case(f'codec/{algorithm}/decode/{alphabet}/{label}',
+                       lambda codec=codec, key=key, encoded=encoded:
+                           len(codec.decode(encoded, key)),
+                       len(encoded.encode('utf-8')), None)
+
+
+def hash_cases(size, label, alphabet):
+    """Case for every hash algorithm, data is fed by
+    FILE_CHUNK_SIZE slices like files are"""
+    block = make_text(min(size, hashes.FILE_CHUNK_SIZE), alphabet)
+    block = memoryview(block.encode('utf-8')[:size])
+
+    def chunks():
+        for start in range(0, size, len(block)):
+            yield block[:size - start]
+
+    for algorithm in sorted(hashlib.algorithms_available):
+        try:
+            hashlib.new(algorithm)
+        except ValueError:
+            continue
+        yield Case(f'hash/{algorithm}/{label}',
+                   lambda algorithm=algorithm:
+                       len(hashes.get_md_stream(chunks(), algorithm)),
+                   size, None)
+
+
+def db_cases(size, label, alphabet, tmp_dir):
+    """TextsDB cases over size chars split into DB_ROW_SIZE rows.
+    Write cases start from empty DB, read cases share filled one."""
+    block = make_block(alphabet)
+    count = max(1, size // DB_ROW_SIZE)
+    rows = [f'{i} ' + block[i % len(block):][:DB_ROW_SIZE]
+            for i in range(count)]
+    bytes_in = sum(len(row.encode('utf-8')) for row in rows)
+    name = os.path.join(tmp_dir, f'{alphabet}-{label}.sqlite')
+    state = {}
+
+    def reset():
+        state.clear()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(name + suffix):
+                os.remove(name + suffix)
+        state['tdb'] = TextsDB(name)
+
+    def filled():
+        if not state.get('filled'):
+            reset()
+            insert()
+            index()
+            state['filled'] = True
+        return state['tdb']
+
+    def insert():
+        with state['tdb'].batch() as batch:
+            for row in rows:
+                batch.add_row(row)
+        return bytes_in
+
+    def add_rows():
+        for row in rows[:DB_READS]:
+            state['tdb'].add_row(row)
+        return sum(len(row.encode('utf-8')) for row in rows[:DB_READS])
+
+    def fill():
+        reset()
+        insert()
+
+    def index():
+        while not state['tdb'].index_step():
+            pass
+        return bytes_in
+
+    def get_rows():
+        tdb = filled()
+        rnd = random.Random(SEED)
+        return sum(len(tdb.get_row(rnd.randint(1, count)).encode('utf-8'))
+                   for _ in range(DB_READS))
+
+    def previews():
+        tdb = filled()
+        after_id = 0
+        read = 0
+        while True:
+            page = tdb.get_previews(after_id)
+            if not page:
+                return read
+            after_id = page[-1][0]
+            read += sum(len((preview or '').encode('utf-8'))
+                        for id_, preview, timestamp in page)
+
+    def search():
+        tdb = filled()
+        return sum(len(snippet.encode('utf-8'))
+                   for word in block.split()[:DB_QUERIES]
+                   for id_, snippet, timestamp in tdb.search(word))
+
+    prefix = f'db/{{}}/{alphabet}/{label}'
+    yield Case(prefix.format('batch_insert'), insert, bytes_in, reset)
+    yield Case(prefix.format('add_row'), add_rows,
+               min(count, DB_READS) * DB_ROW_SIZE, reset)
+    yield Case(prefix.format('index'), index, bytes_in, fill)
+    yield Case(prefix.format('get_row'), get_rows, 0, None)
+    yield Case(prefix.format('get_previews'), previews, 0, None)
+    yield Case(prefix.format('search'), search, 0, None)
+
+
+def measure(case, repeat=REPEAT):
+    """Best time of one case.run() call in seconds.
+    Fast cases are looped by timeit autorange."""
+    if case.setup:
+        best = None
+        for _ in range(repeat):
+            case.setup()
+            started = perf_counter()
+            case.run()
+            elapsed = perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+    timer = Timer(case.run)
+    number = timer.autorange()[0]
+    return min(timer.repeat(repeat, number)) / number
+
+
+def peak_memory(case):
+    """Python heap peak of one case.run() call in bytes,
+    allocations of C libraries (sqlite, OpenSSL) are not seen"""
+    if case.setup:
+        case.setup()
+    tracemalloc.start()
+    try:
+        case.run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(case, repeat=REPEAT, memory=True):
+    """Measure case, returns results dictionary"""
+    seconds = measure(case, repeat)
+    bytes_out = case.run()
+    bytes_in = case.bytes_in or bytes_out
+    result = {'seconds': seconds,
+              'bytes_in': bytes_in,
+              'bytes_out': bytes_out,
+              'throughput': bytes_in / seconds / 2 ** 20 if seconds else 0}
+    if memory:
+        result['peak_memory'] = peak_memory(case)
+    return result
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Find regressions against baseline results.
+
+    Args:
+        results: Dictionary - case name to results dictionary.
+        baseline: Dictionary - the same for baseline run.
+        threshold: Float - allowed relative slowdown
+                   and peak memory growth.
+
+    Returns:
+        List - text strings describing regressions.
+
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result['throughput'] < base['throughput'] * (1 - threshold):
+            regressions.append(
+                f'{name}: throughput {result["throughput"]:.2f} MiB/s, '
+                f'baseline {base["throughput"]:.2f} MiB/s')
+        peak, base_peak = result.get('peak_memory'), base.get('peak_memory')
+        if peak and base_peak and max(peak, base_peak) > MEMORY_FLOOR and \
+           peak > base_peak * (1 + threshold):
+            regressions.append(f'{name}: peak memory {peak} bytes, '
+                               f'baseline {base_peak} bytes')
+    return regressions
+
+
+def iter_cases(sizes, alphabets, groups, tmp_dir):
+    """All cases of selected groups for every size and alphabet"""
+    for label in sizes:
+        size = parse_size(label)
+        for alphabet in alphabets:
+            if 'codec' in groups:
+                yield from codec_cases(size, label, alphabet)
+            if 'db' in groups:
+                yield from db_cases(size, label, alphabet, tmp_dir)
+        if 'hash' in groups:
+            yield from hash_cases(size, label, alphabets[0])
+
+
+def parse_args(args=None):
+    """Command line arguments parser"""
+    parser = argparse.ArgumentParser(
+        description='Benchmark codecs, hashes and saved texts database.')
+    parser.add_argument('-s', '--sizes', default=','.join(SIZES),
+                        help='comma-separated input sizes, 1K to 1G '
+                             f'(default: {",".join(SIZES)})')
+    parser.add_argument('-a', '--alphabets', default=','.join(ALPHABETS),
+                        help='comma-separated text kinds: '
+                             + ', '.join(ALPHABETS))
+    parser.add_argument('-g', '--groups', default='codec,hash,db',
+                        help='comma-separated case groups: codec, hash, db')
+    parser.add_argument('-f', '--filter', default=None,
+                        help='regex, only matching case names are run')
+    parser.add_argument('-r', '--repeat', type=int, default=REPEAT)
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip peak memory measurement')
+    parser.add_argument('-o', '--output', default=RESULTS_FILE,
+                        help=f'results JSON file (default: {RESULTS_FILE})')
+    parser.add_argument('-b', '--baseline', default=None,
+                        help='baseline results JSON file to compare with')
+    parser.add_argument('-t', '--threshold', type=float, default=THRESHOLD,
+                        help='allowed relative regression '
+                             f'(default: {THRESHOLD})')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Run benchmarks, write results and compare them with baseline.
+    Returns 1 if any regression exceeds threshold."""
+    args = parse_args(args)
+    for error in coders.load_plugins():
+        print(f'{error["title"]}: {error["text"]}', file=sys.stderr)
+    sizes = args.sizes.split(',')
+    alphabets = args.alphabets.split(',')
+    for alphabet in alphabets:
+        if alphabet not in ALPHABETS:
+            raise SystemExit(f'Unknown alphabet {alphabet!r}')
+    pattern = re.compile(args.filter) if args.filter else None
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for case in iter_cases(sizes, alphabets, args.groups.split(','),
+                               tmp_dir):
+            if pattern and not pattern.search(case.name):
+                continue
+            result = run_case(case, args.repeat, not args.no_memory)
+            results[case.name] = result
+            peak = result.get('peak_memory', 0) / 2 ** 20
+            print(f'{case.name:<56} {result["throughput"]:10.2f} MiB/s '
+                  f'{peak:9.2f} MiB', flush=True)
+
+    report = {'date': datetime.now().isoformat(timespec='seconds'),
+              'python': sys.version,
+              'platform': platform.platform(),
+              'results': results}
+    with open(args.output, 'w') as fp:
+        json.dump(report, fp, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as fp:
+            baseline = json.load(fp)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(regression, file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import binascii
+import base64 as b64
+import urllib.parse
+from collections import namedtuple
+
+
+CHUNK_SIZE = 1024 * 1024
+WHITESPACE = re.compile(rb'\s+')
+
+# Binary codec callables take bytes-like object
+# (bytes, bytearray, memoryview or mmap) and return bytes.
+# quantum - bytes encoded independently of their neighbours,
+# width - max encoded length of one quantum,
+# cut(data) - length of data prefix decodable without the rest.
+BinaryCodec = namedtuple('BinaryCodec', ('name', 'encode', 'decode',
+                                         'quantum', 'width', 'cut'))
+CODECS = {}
+
+
+def register(name, encode, decode, quantum, width, cut):
+    """Add binary codec, codec with the same name is replaced"""
+    codec = BinaryCodec(name, encode, decode, quantum, width, cut)
+    CODECS[name] = codec
+    return codec
+
+
+def cut_quanta(width):
+    """Make cut() function for codecs with fixed-width encoded quanta"""
+    def cut(data):
+        return len(data) - len(data) % width
+    return cut
+
+
+def cut_percent(data):
+    """Percent-encoded data is decodable up to incomplete %XX escape"""
+    tail = bytes(data[-2:])
+    cut = tail.rfind(b'%')
+    return len(data) if cut == -1 else len(data) - len(tail) + cut
+
+
+def base64_encode(data):
+    """Base64 encoding without trailing newline"""
+    return binascii.b2a_base64(data, newline=False)
+
+
+def base85_encode(data):
+    """Base85 encoding, no padding so quanta concatenate"""
+    return b64.b85encode(data)
+
+
+def percent_encode(data):
+    """Percent-encoding of all bytes except unreserved ones"""
+    if not isinstance(data, (bytes, bytearray)):
+        data = bytes(data)
+    return urllib.parse.quote_from_bytes(data, safe='').encode('ascii')
+
+
+def percent_decode(data):
+    """Percent-decoding, malformed escapes are kept as is"""
+    return urllib.parse.unquote_to_bytes(bytes(data))
+
+
+register('Base64', base64_encode, binascii.a2b_base64, 3, 4, cut_quanta(4))
+register('Base64 URL-safe', b64.urlsafe_b64encode, b64.urlsafe_b64decode,
+         3, 4, cut_quanta(4))
+register('Base32', b64.b32encode, b64.b32decode, 5, 8, cut_quanta(8))
+register('Base85', base85_encode, b64.b85decode, 4, 5, cut_quanta(5))
+register('Percent', percent_encode, percent_decode, 1, 3, cut_percent)
+
+
+def get_codec(algorithm):
+    """Return registered binary codec or raise KeyError"""
+    try:
+        return CODECS[algorithm]
+    except KeyError:
+        raise KeyError(f'Unknown binary codec {algorithm!r}') from None
+
+
+def encoded_length(size, algorithm):
+    """Max encoded length of size bytes, use it to allocate
+    output buffer for encode_into()"""
+    codec = get_codec(algorithm)
+    return -(-size // codec.quantum) * codec.width
+
+
+def decoded_length(size, algorithm):
+    """Max decoded length of size encoded bytes, use it to allocate
+    output buffer for decode_into()"""
+    codec = get_codec(algorithm)
+    if codec.cut is cut_percent:
+        return size
+    return -(-size // codec.width) * codec.quantum
+
+
+def encode(data, algorithm):
+    """Encode bytes-like object.
+
+    Args:
+        data: Bytes-like object - bytes, bytearray, memoryview or mmap.
+        algorithm: Text string - one of CODECS names.
+
+    Returns:
+        Bytes - encoded data.
+
+    """
+    return get_codec(algorithm).encode(data)
+
+
+def decode(data, algorithm):
+    """Decode bytes-like object or ASCII text string.
+    Whitespace is ignored by all codecs except Percent.
+
+    Args:
+        data: Bytes-like object or text string - encoded data.
+        algorithm: Text string - one of CODECS names.
+
+    Returns:
+        Bytes - decoded data.
+
+    """
+    codec = get_codec(algorithm)
+    if isinstance(data, str):
+        data = data.encode('ascii')
+    if codec.cut is not cut_percent:
+        data = WHITESPACE.sub(b'', data)
+    return codec.decode(data)
+
+
+def encode_stream(chunks, algorithm):
+    """Streaming encoding of bytes-like chunks.
+    Chunks are encoded by whole quanta through memoryview slices,
+    only quantum split between chunks is copied.
+
+    Args:
+        chunks: Iterable of bytes-like objects.
+        algorithm: Text string - one of CODECS names.
+
+    Returns:
+        Generator - encoded bytes chunks.
+
+    """
+    codec = get_codec(algorithm)
+    quantum = codec.quantum
+    tail = b''
+    for chunk in chunks:
+        # derived views are released explicitly, a view left alive
+        # keeps memory-mapped source from closing
+        with memoryview(chunk) as view:
+            start = 0
+            if tail:
+                start = min(quantum - len(tail), len(view))
+                with view[:start] as part:
+                    tail += part
+                if len(tail) < quantum:
+                    continue
+                yield codec.encode(tail)
+            cut = len(view) - (len(view) - start) % quantum
+            if cut > start:
+                with view[start:cut] as part:
+                    encoded = codec.encode(part)
+                yield encoded
+            with view[cut:] as part:
+                tail = bytes(part)
+    if tail:
+        yield codec.encode(tail)
+
+
+def decode_stream(chunks, algorithm):
+    """Streaming decoding of bytes-like or ASCII text chunks,
+    incomplete encoded quantum is carried to the next chunk.
+
+    Args:
+        chunks: Iterable of bytes-like objects or text strings.
+        algorithm: Text string - one of CODECS names.
+
+    Returns:
+        Generator - decoded bytes chunks.
+
+    """
+    codec = get_codec(algorithm)
+    strip = codec.cut is not cut_percent
+    tail = b''
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('ascii')
+        if strip:
+            chunk = WHITESPACE.sub(b'', chunk)
+        data = tail + chunk if tail else chunk
+        cut = codec.cut(data)
+        tail = bytes(data[cut:])
+        if cut:
+            yield codec.decode(data[:cut])
+    if tail:
+        yield codec.decode(tail)
+
+
+def write_into(chunks, out):
+    """Write bytes chunks into caller-provided buffer.
+
+    Args:
+        chunks: Iterable of bytes-like objects.
+        out: Writable buffer - bytearray, memoryview or mmap.
+
+    Returns:
+        Integer - bytes written.
+
+    Raises:
+        ValueError - if buffer is too small.
+
+    """
+    with memoryview(out) as view:
+        pos = 0
+        try:
+            for chunk in chunks:
+                end = pos + len(chunk)
+                if end > len(view):
+                    raise ValueError('Output buffer is too small: '
+                                     f'{len(view)}')
+                view[pos:end] = chunk
+                pos = end
+        finally:
+            # suspended generators hold views of the source
+            if hasattr(chunks, 'close'):
+                chunks.close()
+    return pos
+
+
+def iter_slices(data, chunk_size=CHUNK_SIZE):
+    """Zero-copy memoryview slices of bytes-like object,
+    every slice is released when the next one is requested"""
+    with memoryview(data) as view:
+        for start in range(0, len(view), chunk_size):
+            with view[start:start + chunk_size] as part:
+                yield part
+
+
+def encode_into(data, out, algorithm, chunk_size=CHUNK_SIZE):
+    """Encode bytes-like object into caller-provided buffer
+    chunk by chunk, no full-size intermediate copies are made.
+
+    Args:
+        data: Bytes-like object - bytes, bytearray, memoryview or mmap.
+        out: Writable buffer of at least encoded_length() bytes.
+        algorithm: Text string - one of CODECS names.
+        chunk_size: Integer - bytes encoded at once.
+
+    Returns:
+        Integer - encoded bytes written into out.
+
+    """
+    return write_into(encode_stream(iter_slices(data, chunk_size),
+                                    algorithm), out)
+
+
+def decode_into(data, out, algorithm, chunk_size=CHUNK_SIZE):
+    """Decode bytes-like object into caller-provided buffer
+    chunk by chunk, no full-size intermediate copies are made.
+
+    Args:
+        data: Bytes-like object - encoded data.
+        out: Writable buffer of at least decoded_length() bytes.
+        algorithm: Text string - one of CODECS names.
+        chunk_size: Integer - encoded bytes decoded at once.
+
+    Returns:
+        Integer - decoded bytes written into out.
+
+    """
+    return write_into(decode_stream(iter_slices(data, chunk_size),
+                                    algorithm), out)
+
+
+def main():
+    """minimal funcs testing"""
+    data = bytes(range(256)) * 5 + b'\x00'
+    for algorithm in CODECS:
+        encoded = encode(data, algorithm)
+        assert decode(encoded, algorithm) == data
+        chunks = [data[i:i + 7] for i in range(0, len(data), 7)]
+        assert b''.join(encode_stream(chunks, algorithm)) == encoded
+        chunks = [encoded[i:i + 7] for i in range(0, len(encoded), 7)]
+        assert b''.join(decode_stream(chunks, algorithm)) == data
+        out = bytearray(encoded_length(len(data), algorithm))
+        size = encode_into(memoryview(data), out, algorithm, 10)
+        assert out[:size] == encoded
+        back = bytearray(decoded_length(size, algorithm))
+        size = decode_into(out[:size], back, algorithm, 10)
+        assert back[:size] == data
+
+    # memory-mapped file by chunks not aligned to quanta
+    import mmap
+    import tempfile
+    from hashes import iter_file_slices
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = os.path.join(tmp_dir, 'data.bin')
+        for algorithm in CODECS:
+            with open(file_name, 'wb') as fp:
+                fp.write(data)
+            with open(file_name, 'rb') as fp:
+                encoded = b''.join(encode_stream(
+                    iter_file_slices(fp, 1000), algorithm))
+            assert encoded == encode(data, algorithm)
+            out = bytearray(encoded_length(len(data), algorithm))
+            with open(file_name, 'rb') as fp, \
+                 mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as source:
+                size = encode_into(source, out, algorithm, 1000)
+            assert out[:size] == encoded
+            # error raised out of mmap block is not masked by BufferError
+            try:
+                with open(file_name, 'rb') as fp, \
+                     mmap.mmap(fp.fileno(), 0,
+                               access=mmap.ACCESS_READ) as source:
+                    encode_into(source, bytearray(10), algorithm, 1000)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError('small buffer accepted')
+            with open(file_name, 'wb') as fp:
+                fp.write(encoded)
+            with open(file_name, 'rb') as fp:
+                assert b''.join(decode_stream(
+                    iter_file_slices(fp, 1000), algorithm)) == data
+            back = bytearray(decoded_length(len(encoded), algorithm))
+            with open(file_name, 'rb') as fp, \
+                 mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as source:
+                size = decode_into(source, back, algorithm, 1000)
+            assert back[:size] == data
+
+
+if __name__ == '__main__':
+    main()
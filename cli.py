@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import glob
+import argparse
+from time import perf_counter, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import binary
+import coders
+import hashes
+import metrics
+
+
+MODES = ('encode', 'decode', 'hash')
+# suffix of result file being written
+TMP_SUFFIX = '.tmp'
+
+
+def hash_file(file_name, algorithm):
+    """Hash file content, comma-separated algorithms
+    give 'name digest' line per algorithm computed in one pass.
+
+    Args:
+        file_name: Text string defines filename.
+        algorithm: Text string defines hash-algorithm(s).
+
+    Returns:
+        Text string - hexdigest or digests lines.
+
+    """
+    if ',' not in algorithm:
+        return hashes.get_md_file(file_name, algorithm)
+    errors, digests = hashes.get_mds_file(file_name, algorithm.split(','))
+    if errors:
+        name, error = next(iter(errors.items()))
+        raise ValueError(f'{name}: {error["text"]}')
+    return ''.join(f'{name} {digest}\n' for name, digest in digests.items())
+
+
+def convert_binary(in_name, out_name, mode, algorithm):
+    """Encode any file by binary codec or decode it back,
+    source file is read by memory-mapped slices.
+
+    Args:
+        in_name: Text string defines source filename.
+        out_name: Text string defines result filename.
+        mode: Text string - 'encode' or 'decode'.
+        algorithm: Text string - one of binary.CODECS names.
+
+    """
+    binary.get_codec(algorithm)
+    with open(in_name, 'rb') as fp, open(out_name, 'wb') as out:
+        chunks = hashes.iter_file_slices(fp)
+        if mode == 'encode':
+            chunks = binary.encode_stream(chunks, algorithm)
+        else:
+            chunks = binary.decode_stream(chunks, algorithm)
+        for chunk in chunks:
+            out.write(chunk)
+
+
+def convert_file(in_name, out_name, mode, algorithm, key=None,
+                 binary_mode=False):
+    """Convert one file by streaming it through selected algorithm.
+    Runs in pool worker process.
+
+    Args:
+        in_name: Text string defines source filename.
+        out_name: Text string defines result filename.
+        mode: Text string - one of MODES.
+        algorithm: Text string defines algorithm.
+        key: Text string or integer - algorithm key.
+        binary_mode: Boolean - convert raw bytes by binary codec.
+
+    Returns:
+        Error - None if conversion is ok,
+                else dictionary with error title and error text.
+        Integer - bytes read.
+        Integer - bytes written.
+        Float - conversion wall time in seconds.
+
+    """
+    error = None
+    bytes_in = bytes_out = 0
+    started = perf_counter()
+    # result is written under temporary name, so failed conversion
+    # leaves no truncated file looking like a good one
+    tmp_name = out_name + TMP_SUFFIX
+    try:
+        bytes_in = os.path.getsize(in_name)
+        if mode == 'hash':
+            text = hash_file(in_name, algorithm)
+            with open(tmp_name, 'w', encoding='utf-8') as out:
+                out.write(text)
+        elif binary_mode:
+            convert_binary(in_name, tmp_name, mode, algorithm)
+        else:
+            with open(in_name, 'r', encoding='utf-8', newline='') as fp, \
+                 open(tmp_name, 'w', encoding='utf-8', newline='') as out:
+                chunks = coders.iter_chunks(fp)
+                if mode == 'encode':
+                    chunks = coders.encode_stream(chunks, algorithm, key)
+                else:
+                    chunks = coders.decode_stream(chunks, algorithm, key)
+                for chunk in chunks:
+                    out.write(chunk)
+        os.replace(tmp_name, out_name)
+        bytes_out = os.path.getsize(out_name)
+    except Exception as ex:
+        error = {'title': ex.__class__.__name__, 'text': str(ex)}
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+    return error, bytes_in, bytes_out, perf_counter() - started
+
+
+def output_names(files, output_dir):
+    """Result filenames keeping input paths relative to
+    their common directory, so equal basenames do not collide.
+
+    Args:
+        files: List of source filenames.
+        output_dir: Text string defines output directory.
+
+    Returns:
+        List of text strings - result filenames.
+
+    """
+    paths = [os.path.abspath(name) for name in files]
+    try:
+        base = os.path.commonpath([os.path.dirname(path) for path in paths])
+    except ValueError:
+        # paths on different drives
+        base = ''
+    return [os.path.join(output_dir, os.path.relpath(path, base) if base
+                         else os.path.splitdrive(path)[1].lstrip(os.sep))
+            for path in paths]
+
+
+def init_worker():
+    """Pool worker process initializer, metrics are reported
+    by the main process only"""
+    metrics.reset()
+    coders.load_plugins()
+
+
+def parse_args(args=None):
+    """Command line arguments parser"""
+    parser = argparse.ArgumentParser(
+        description='Batch encode/decode/hash files without GUI.')
+    parser.add_argument('files', nargs='+', metavar='GLOB',
+                        help='input files glob patterns')
+    parser.add_argument('-m', '--mode', choices=MODES, default='encode')
+    parser.add_argument('-a', '--algorithm', required=True,
+                        help='coding method or hash algorithm name, '
+                             'comma-separated names compute several '
+                             'digests in one pass')
+    parser.add_argument('-k', '--key', default=None,
+                        help='ROT13 shift or Vigenere key')
+    parser.add_argument('-b', '--binary', action='store_true',
+                        help='encode/decode raw bytes by binary codec: '
+                             + ', '.join(binary.CODECS))
+    parser.add_argument('-o', '--output-dir', required=True,
+                        help='directory for converted files')
+    parser.add_argument('--metrics', default=None,
+                        help='per-file metrics sinks like '
+                             '"jsonl:metrics.jsonl,prom:cryptex.prom" '
+                             f'(default: ${metrics.ENV_VARIABLE})')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='worker processes count (default: CPU count)')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Convert files matched by globs, print errors and throughput"""
+    args = parse_args(args)
+    metrics.configure(args.metrics)
+    for error in coders.load_plugins():
+        print(f'{error["title"]}: {error["text"]}', file=sys.stderr)
+    files = sorted({name for pattern in args.files
+                    for name in glob.glob(pattern, recursive=True)
+                    if os.path.isfile(name)})
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    errors = 0
+    total_in = total_out = 0
+    started = perf_counter()
+    with ProcessPoolExecutor(max_workers=args.jobs,
+                             initializer=init_worker) as pool:
+        futures = {}
+        for in_name, out_name in zip(files,
+                                     output_names(files, args.output_dir)):
+            if os.path.exists(out_name) and \
+               os.path.samefile(in_name, out_name):
+                errors += 1
+                print(f'{in_name}: Result file must differ from '
+                      'source file', file=sys.stderr)
+                continue
+            os.makedirs(os.path.dirname(out_name), exist_ok=True)
+            future = pool.submit(convert_file, in_name, out_name, args.mode,
+                                 args.algorithm, args.key, args.binary)
+            futures[future] = in_name
+        for future in as_completed(futures):
+            error, bytes_in, bytes_out, seconds = future.result()
+            total_in += bytes_in
+            total_out += bytes_out
+            if metrics.SINKS:
+                metrics.emit(metrics.Measurement(
+                    'file', f'{args.mode}:{args.algorithm}', seconds,
+                    bytes_in, bytes_out, None,
+                    error and error['title'], time()))
+            if error:
+                errors += 1
+                print(f'{futures[future]}: {error["title"]}: '
+                      f'{error["text"]}', file=sys.stderr)
+    elapsed = perf_counter() - started
+    metrics.shutdown()
+
+    speed = total_in / elapsed / 2 ** 20 if elapsed else 0
+    print(f'{len(files) - errors}/{len(files)} files, '
+          f'{total_in} bytes in, {total_out} bytes out, '
+          f'{elapsed:.2f} s, {speed:.2f} MiB/s')
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
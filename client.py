@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import socket
+import asyncio
+import tempfile
+
+
+# Conversion daemon protocol: JSON lines over Unix domain socket.
+# Request:  {"id": 1, "op": "encode", "algorithm": "ROT13",
+#            "key": 13, "text": "..."}, op - encode, decode or hash.
+# Response: {"id": 1, "error": null, "result": "..."}, error is
+#           {"title": ..., "text": ...} dictionary like coders.encode() one.
+# Responses on one connection may come out of order, id matches request.
+SOCKET_ENV_VARIABLE = 'CRYPTEX_SOCKET'
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), 'cryptex-{}.sock'.format(
+    os.getuid() if hasattr(os, 'getuid') else 'user'))
+# max request or response line length
+LINE_MAX = 256 * 2 ** 20
+
+
+def socket_path(path=None):
+    """Daemon socket path: argument, CRYPTEX_SOCKET
+    environment variable or DEFAULT_SOCKET"""
+    return path or os.environ.get(SOCKET_ENV_VARIABLE, DEFAULT_SOCKET)
+
+
+def make_request(request_id, op, algorithm, text, key=None):
+    """Encoded request line"""
+    request = {'id': request_id, 'op': op, 'algorithm': algorithm,
+               'key': key, 'text': text}
+    return json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+class DaemonError(Exception):
+    """Error response, title is daemon-side exception class name"""
+    def __init__(self, title, text):
+        super().__init__(f'{title}: {text}')
+        self.title = title
+        self.text = text
+
+
+def response_result(response):
+    """Return response result or raise DaemonError"""
+    error = response['error']
+    if error:
+        raise DaemonError(error['title'], error['text'])
+    return response['result']
+
+
+class Client():
+    """Blocking daemon client, one request at a time:
+
+        with Client() as client:
+            text = client.encode('Hello', 'Vigenere', 'key')
+
+    """
+    def __init__(self, path=None, timeout=None):
+        """Init method.
+
+        Args:
+            path: Text string - socket path, see socket_path().
+            timeout: Float - socket timeout in seconds.
+
+        """
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path(path))
+        self.fp = self.sock.makefile('rwb')
+        self.last_id = 0
+
+    def request(self, op, algorithm, text, key=None):
+        """Send request and wait for its result.
+
+        Args:
+            op: Text string - 'encode', 'decode' or 'hash'.
+            algorithm: Text string defines algorithm.
+            text: Text string for conversion.
+            key: Text string or integer - algorithm key.
+
+        Returns:
+            Text string - conversion result or hexdigest.
+
+        Raises:
+            DaemonError - if daemon failed to process request.
+
+        """
+        self.last_id += 1
+        self.fp.write(make_request(self.last_id, op, algorithm, text, key))
+        self.fp.flush()
+        line = self.fp.readline(LINE_MAX)
+        if not line:
+            raise ConnectionError('Daemon closed connection')
+        return response_result(json.loads(line))
+
+    def encode(self, text, algorithm, key=None):
+        """Encode text by daemon"""
+        return self.request('encode', algorithm, text, key)
+
+    def decode(self, text, algorithm, key=None):
+        """Decode text by daemon"""
+        return self.request('decode', algorithm, text, key)
+
+    def hash(self, text, algorithm):
+        """Hexdigest of text by daemon"""
+        return self.request('hash', algorithm, text)
+
+    def close(self):
+        """Close connection"""
+        self.fp.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+
+class AsyncClient():
+    """asyncio daemon client, concurrent requests share connection:
+
+        client = await AsyncClient.connect()
+        texts = await asyncio.gather(*(client.encode(text, 'ROT13', 3)
+                                       for text in texts))
+
+    """
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.last_id = 0
+        self.pending = {}
+        self.receiver = asyncio.ensure_future(self.receive())
+
+    @classmethod
+    async def connect(cls, path=None):
+        """Connect to daemon, path as in socket_path()"""
+        reader, writer = await asyncio.open_unix_connection(
+            socket_path(path), limit=LINE_MAX)
+        return cls(reader, writer)
+
+    async def receive(self):
+        """Resolve pending requests by responses ids"""
+        try:
+            while line := await self.reader.readline():
+                response = json.loads(line)
+                future = self.pending.pop(response['id'], None)
+                if future and not future.done():
+                    future.set_result(response)
+            error = ConnectionError('Daemon closed connection')
+        except Exception as ex:
+            error = ex
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self.pending.clear()
+
+    async def request(self, op, algorithm, text, key=None):
+        """Coroutine version of Client.request()"""
+        if self.receiver.done():
+            raise ConnectionError('Daemon closed connection')
+        self.last_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.last_id] = future
+        self.writer.write(make_request(self.last_id, op, algorithm,
+                                       text, key))
+        await self.writer.drain()
+        return response_result(await future)
+
+    async def encode(self, text, algorithm, key=None):
+        """Encode text by daemon"""
+        return await self.request('encode', algorithm, text, key)
+
+    async def decode(self, text, algorithm, key=None):
+        """Decode text by daemon"""
+        return await self.request('decode', algorithm, text, key)
+
+    async def hash(self, text, algorithm):
+        """Hexdigest of text by daemon"""
+        return await self.request('hash', algorithm, text)
+
+    async def close(self):
+        """Close connection"""
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.receiver.cancel()
@@ -2,15 +2,91 @@
 # -*- coding: utf-8 -*-
 
 import base64 as b64
+import codecs
+import re
 import urllib.parse
-from itertools import cycle
+from collections import namedtuple
+from functools import lru_cache
+from importlib.metadata import entry_points
+from itertools import accumulate, cycle
+
+import binary
+import metrics
 
 
-CODERS = ('ROT13', 'Vigenere', 'A1Z26', 'Base64', 'URL')
-DECODERS = ('ROT13', 'Vigenere', 'A1Z26', 'Base64', 'URL')
 KEY_NOKEY = 0
 KEY_DECIMAL = 1
 KEY_TEXT = 2
+CHUNK_SIZE = 64 * 1024
+PLUGINS_GROUP = 'cryptex.codecs'
+
+# Codec callables signatures:
+#   encode(text, key) / decode(text, key) -> text string,
+#   encode_stream(chunks, key) / decode_stream(chunks, key) -> generator,
+# decode, encode_stream and decode_stream may be None if not supported.
+Codec = namedtuple('Codec', ('name', 'encode', 'decode', 'key_type',
+                             'encode_stream', 'decode_stream'))
+REGISTRY = {}
+CODERS = ()
+DECODERS = ()
+
+
+def register(name, encode, decode=None, key_type=KEY_NOKEY,
+             encode_stream=None, decode_stream=None):
+    """Add codec to registry, codec with the same name is replaced.
+
+    Args:
+        name: Text string - algorithm name shown in drop-down menu.
+        encode: Encoding callable.
+        decode: Decoding callable or None.
+        key_type: Constant - KEY_NOKEY, KEY_DECIMAL or KEY_TEXT.
+        encode_stream: Streaming encoding callable or None.
+        decode_stream: Streaming decoding callable or None.
+
+    Returns:
+        Codec - registered codec.
+
+    """
+    global CODERS, DECODERS
+    codec = Codec(name, encode, decode, key_type,
+                  encode_stream, decode_stream)
+    REGISTRY[name] = codec
+    CODERS = tuple(REGISTRY)
+    DECODERS = tuple(name for name, codec in REGISTRY.items()
+                     if codec.decode)
+    return codec
+
+
+def load_plugins(group=PLUGINS_GROUP):
+    """Load third-party codecs from entry points.
+    Entry point should reference a Codec or a callable
+    which registers its codecs by register() function.
+
+    Args:
+        group: Text string - entry points group name.
+
+    Returns:
+        List - dictionaries with error title and error text
+               for every entry point failed to load.
+
+    """
+    errors = []
+    eps = entry_points()
+    if hasattr(eps, 'select'):
+        eps = eps.select(group=group)
+    else:
+        eps = eps.get(group, ())
+    for ep in eps:
+        try:
+            plugin = ep.load()
+            if isinstance(plugin, Codec):
+                register(*plugin)
+            else:
+                plugin()
+        except Exception as ex:
+            errors.append({'title': ex.__class__.__name__,
+                           'text': f'{ep.name}: {ex}'})
+    return errors
 
 
 def is_key(algorithm):
@@ -25,12 +101,8 @@ def is_key(algorithm):
                    KEY_NOKEY otherwise.
 
     """
-    if algorithm == 'ROT13':
-        return KEY_DECIMAL
-    elif algorithm == 'Vigenere':
-        return KEY_TEXT
-    else:
-        return KEY_NOKEY
+    codec = REGISTRY.get(algorithm)
+    return codec.key_type if codec else KEY_NOKEY
 
 
 def encode(text, algorithm, key=None):
@@ -48,17 +120,14 @@ def encode(text, algorithm, key=None):
 
     """
     error = None
+    codec = REGISTRY.get(algorithm)
     try:
-        if algorithm == 'Base64':
-            text = b64.b64encode(text.encode('utf-8')).decode('utf-8')
-        elif algorithm == 'URL':
-            text = urllib.parse.quote(text)
-        elif algorithm == 'ROT13':
-            text = rot13(text, int(key))
-        elif algorithm == 'Vigenere':
-            text = vigenere_encode(text, key)
-        elif algorithm == 'A1Z26':
-            text = a1z26_encode(text)
+        # inline check keeps disabled instrumentation free on hot path
+        if codec and metrics.SINKS:
+            text = metrics.call('codec', algorithm, 'encode',
+                                codec.encode, text, key)
+        elif codec:
+            text = codec.encode(text, key)
     except Exception as ex:
         error = {'title': ex.__class__.__name__, 'text': str(ex)}
     return error, text
@@ -79,17 +148,14 @@ def decode(text, algorithm, key=None):
 
     """
     error = None
+    codec = REGISTRY.get(algorithm)
     try:
-        if algorithm == 'Base64':
-            text = b64.b64decode(text.encode('utf-8')).decode('utf-8')
-        elif algorithm == 'URL':
-            text = urllib.parse.unquote(text)
-        elif algorithm == 'ROT13':
-            text = rot13(text, int(key) * -1)
-        elif algorithm == 'Vigenere':
-            text = vigenere_decode(text, key)
-        elif algorithm == 'A1Z26':
-            text = a1z26_decode(text)
+        # inline check keeps disabled instrumentation free on hot path
+        if codec and codec.decode and metrics.SINKS:
+            text = metrics.call('codec', algorithm, 'decode',
+                                codec.decode, text, key)
+        elif codec and codec.decode:
+            text = codec.decode(text, key)
     except Exception as ex:
         error = {'title': ex.__class__.__name__, 'text': str(ex)}
     return error, text
@@ -101,6 +167,31 @@ cyr_range_1 = 1040, 1072, 32
 cyr_range_2 = 1072, 1104, 32
 
 
+ROT_ALPHABETS = (lat_range_1, lat_range_2, cyr_range_1, cyr_range_2)
+# shifts repeat every lcm(26, 32) positions for both alphabets at once
+ROT_PERIOD = 416
+ROT_CACHE_SIZE = 64
+
+
+@lru_cache(maxsize=ROT_CACHE_SIZE)
+def rot_table(shift):
+    """Build str.translate() table for ROT algorithm.
+
+    Args:
+        shift: Integer - alphabet shift normalized by ROT_PERIOD.
+
+    Returns:
+        Dictionary - char number to shifted char number
+                     for every Latin and Cyrillic letter.
+
+    """
+    table = {}
+    for start, stop, len_ in ROT_ALPHABETS:
+        for char_num in range(start, stop):
+            table[char_num] = start + (char_num - start + shift) % len_
+    return table
+
+
 def rot13(text, shift=13):
     """Simple letter substitution cipher that replaces a letter
     with the 13th letter after it in the alphabet or use selected shift.
@@ -113,34 +204,40 @@ def rot13(text, shift=13):
         Text string - converted text.
 
     """
-    new_text = ''
-    for char in text:
-        char_num = ord(char)
-        start, len_ = 0, 1
-        if char_num in range(*lat_range_1[:2]):
-            start, len_ = lat_range_1[0], lat_range_1[2]
-        elif char_num in range(*lat_range_2[:2]):
-            start, len_ = lat_range_2[0], lat_range_2[2]
-        elif char_num in range(*cyr_range_1[:2]):
-            start, len_ = cyr_range_1[0], cyr_range_1[2]
-        elif char_num in range(*cyr_range_2[:2]):
-            start, len_ = cyr_range_2[0], cyr_range_2[2]
-        else:
-            start = char_num
+    return text.translate(rot_table(shift % ROT_PERIOD))
 
-        new_text += chr(start + (char_num - start + shift) % len_)
-    return new_text
 
+def rot13_shift(key):
+    """ROT shift of integer or decimal string key, 13 without key"""
+    return 13 if key is None else int(key)
+
+
+def rot13_encode(text, key=13):
+    """ROT encoding with integer or decimal string key"""
+    return rot13(text, rot13_shift(key))
 
-def vigenere_make_key(key, rev=False):
-    """Generate key iterator for Vigenere algorithm.
+
+def rot13_decode(text, key=13):
+    """ROT decoding with integer or decimal string key"""
+    return rot13(text, rot13_shift(key) * -1)
+
+
+VIGENERE_CACHE_SIZE = 64
+# shorter texts are converted char by char, longer ones in batch
+VIGENERE_BATCH_MIN = 256
+VIGENERE_LETTERS = re.compile('([A-Za-z\u0410-\u044f]+)')
+
+
+@lru_cache(maxsize=VIGENERE_CACHE_SIZE)
+def vigenere_key_shifts(key, rev=False):
+    """Key schedule for Vigenere algorithm.
 
     Args:
         key: Text string.
         rev: Boolean - reverse shifts direction for decoding.
 
     Returns:
-        cycle() iterator - shifts defined by key.
+        Tuple - integer shifts defined by key letters.
 
     """
     key_ = []
@@ -163,7 +260,21 @@ def vigenere_make_key(key, rev=False):
     if rev:
         key_ = map(lambda x: x * -1, key_)
 
-    return cycle(key_)
+    return tuple(key_)
+
+
+def vigenere_make_key(key, rev=False):
+    """Generate key iterator for Vigenere algorithm.
+
+    Args:
+        key: Text string.
+        rev: Boolean - reverse shifts direction for decoding.
+
+    Returns:
+        cycle() iterator - shifts defined by key.
+
+    """
+    return cycle(vigenere_key_shifts(key, rev))
 
 
 def vigenere_transform(text, key):
@@ -199,6 +310,44 @@ def vigenere_transform(text, key):
     return new_text
 
 
+def vigenere_batch_transform(text, shifts, phase=0):
+    """Batched version of vigenere_transform().
+    Letters are gathered into one buffer, every key column
+    is shifted at once by ROT translation table
+    and letters are placed back by running letter index.
+
+    Args:
+        text: Text string for conversion.
+        shifts: Tuple from vigenere_key_shifts() function.
+        phase: Integer - key position of the first letter.
+
+    Returns:
+        Text string - converted text.
+
+    """
+    parts = VIGENERE_LETTERS.split(text)
+    runs = parts[1::2]
+    letters = ''.join(runs)
+    if not letters:
+        return text
+    if not shifts:
+        raise ValueError('Key must contain at least one letter')
+
+    len_key = len(shifts)
+    new_letters = list(letters)
+    for i, shift in enumerate(shifts):
+        column = (i - phase) % len_key
+        table = rot_table(shift % ROT_PERIOD)
+        new_letters[column::len_key] = \
+            letters[column::len_key].translate(table)
+    letters = ''.join(new_letters)
+
+    ends = list(accumulate(map(len, runs)))
+    parts[1::2] = [letters[start:end]
+                   for start, end in zip([0] + ends, ends)]
+    return ''.join(parts)
+
+
 def vigenere_encode(text, key):
     """Convert text by Vigenere algorithm with forward direction key
 
@@ -210,8 +359,9 @@ def vigenere_encode(text, key):
         Text string - converted text.
 
     """
-    key = vigenere_make_key(key, rev=False)
-    return vigenere_transform(text, key)
+    if len(text) < VIGENERE_BATCH_MIN:
+        return vigenere_transform(text, vigenere_make_key(key, rev=False))
+    return vigenere_batch_transform(text, vigenere_key_shifts(key, False))
 
 
 def vigenere_decode(text, key):
@@ -225,22 +375,551 @@ def vigenere_decode(text, key):
         Text string - converted text.
 
     """
-    key = vigenere_make_key(key, rev=True)
-    return vigenere_transform(text, key)
+    if len(text) < VIGENERE_BATCH_MIN:
+        return vigenere_transform(text, vigenere_make_key(key, rev=True))
+    return vigenere_batch_transform(text, vigenere_key_shifts(key, True))
 
 
-def a1z26_encode(text):
+def a1z26_encode(text, key=None):
     """Simple alphabetic text encoding by replacing
     each char with char number"""
     text = '-'.join(map(str, map(ord, text)))
     return text
 
 
-def a1z26_decode(text):
+class A1Z26Error(ValueError):
+    """Bad token in A1Z26 encoded text,
+    offset is token position in encoded text"""
+    def __init__(self, token, offset):
+        super().__init__(f'Bad token {token!r} at offset {offset}')
+        self.token = token
+        self.offset = offset
+
+
+A1Z26_SEPARATOR = re.compile(rb'-')
+A1Z26_TOKEN = re.compile(rb'[^-]+')
+A1Z26_TABLE_SIZE = 1 << 16
+
+
+def a1z26_char(token):
+    """Char of A1Z26 token, token syntax is int() one: surrounding
+    whitespace, sign, underscores and Unicode digits are accepted.
+
+    Args:
+        token: Bytes - UTF-8 encoded token.
+
+    Returns:
+        Text string - decoded char.
+
+    Raises:
+        ValueError - if token is not a char number.
+
+    """
+    try:
+        return chr(int(token.decode('utf-8')))
+    except (ValueError, OverflowError):
+        raise ValueError(token) from None
+
+
+class A1Z26Table(dict):
+    """Encoded token to char mapping filled on demand,
+    so every distinct token is validated and parsed only once"""
+    def __missing__(self, token):
+        char = a1z26_char(token)
+        if len(self) < A1Z26_TABLE_SIZE:
+            self[token] = char
+        return char
+
+
+A1Z26_TABLE = A1Z26Table()
+
+
+def a1z26_bad_token(data, offset=0):
+    """Find the first bad token of A1Z26 encoded bytes.
+    Slow path, runs only for data already failed to decode.
+
+    Args:
+        data: Bytes - encoded text.
+        offset: Integer - data position in the whole buffer.
+
+    Returns:
+        A1Z26Error - error with bad token and its offset.
+
+    """
+    for token in data.split(b'-'):
+        try:
+            a1z26_char(token)
+        except ValueError:
+            return A1Z26Error(token.decode('utf-8', 'replace'), offset)
+        offset += len(token) + 1
+    return A1Z26Error('', offset)
+
+
+def a1z26_decode_bytes(data, window=CHUNK_SIZE):
+    """A1Z26 decoding of encoded bytes buffer.
+    Buffer is cut into windows at '-' separators, window tokens
+    are matched one by one and mapped to chars by cached table
+    lookups, so there is no list of token substrings.
+
+    Args:
+        data: Bytes-like object - bytes, bytearray, memoryview or mmap.
+        window: Integer - approximate window size in bytes.
+
+    Returns:
+        Text string - decoded text.
+
+    Raises:
+        A1Z26Error - with offset of the first bad token.
+
+    """
+    parts = []
+    start = 0
+    size = len(data)
+    while True:
+        match = A1Z26_SEPARATOR.search(data, min(start + window, size))
+        end = match.start() if match else size
+        chunk = bytes(data[start:end])
+        # empty tokens are never valid and finditer() skips them
+        if not chunk or chunk[:1] == b'-' or chunk[-1:] == b'-' or \
+           b'--' in chunk:
+            raise a1z26_bad_token(chunk, start)
+        try:
+            parts.append(''.join(map(A1Z26_TABLE.__getitem__,
+                                     map(re.Match.group,
+                                         A1Z26_TOKEN.finditer(chunk)))))
+        except ValueError:
+            raise a1z26_bad_token(chunk, start) from None
+        if not match:
+            return ''.join(parts)
+        start = end + 1
+
+
+def a1z26_decode(text, key=None):
     """Simple alphabetic text decoding by replacing
     each char number in source text by char itself"""
-    text = ''.join(map(chr, map(int, text.split('-'))))
-    return text
+    data = text.encode('utf-8')
+    try:
+        return a1z26_decode_bytes(data)
+    except A1Z26Error as ex:
+        if len(data) == len(text):
+            raise
+        # offset in chars, not in UTF-8 bytes
+        raise A1Z26Error(ex.token, len(data[:ex.offset].decode('utf-8'))) \
+            from None
+
+
+class VarintTable(dict):
+    """str.translate() table mapping char to its code point
+    LEB128 varint bytes as latin-1 chars, filled on demand"""
+    def __missing__(self, char):
+        code = char
+        varint = []
+        while code > 0x7F:
+            varint.append(chr(code & 0x7F | 0x80))
+            code >>= 7
+        varint.append(chr(code))
+        self[char] = value = ''.join(varint)
+        return value
+
+
+VARINT_TABLE = VarintTable()
+VARINT_TOKEN = re.compile('[\x80-\xff]+[\x00-\x7f]')
+VARINT_TAIL = re.compile('[\x80-\xff]+$')
+
+
+@lru_cache(maxsize=1024)
+def varint_char(token):
+    """Decode multibyte LEB128 varint written as latin-1 chars"""
+    code = 0
+    for shift, byte in enumerate(map(ord, token)):
+        code |= (byte & 0x7F) << 7 * shift
+    return chr(code)
+
+
+def varint_pack(text):
+    """Pack text code points as LEB128 varints, ASCII is kept as is.
+
+    Args:
+        text: Text string.
+
+    Returns:
+        Bytes - packed code points.
+
+    """
+    if text.isascii():
+        return text.encode('ascii')
+    return text.translate(VARINT_TABLE).encode('latin-1')
+
+
+def varint_unpack(data, offset=0):
+    """Unpack text packed by varint_pack().
+
+    Args:
+        data: Bytes - packed code points.
+        offset: Integer - data position in the whole packed buffer.
+
+    Returns:
+        Text string - unpacked text.
+
+    Raises:
+        A1Z26Error - on truncated or out of range varint.
+
+    """
+    text = data.decode('latin-1')
+    if text.isascii():
+        return text
+    tail = VARINT_TAIL.search(text)
+    if tail:
+        raise A1Z26Error(tail[0], offset + tail.start())
+    try:
+        return VARINT_TOKEN.sub(lambda match: varint_char(match[0]), text)
+    except (ValueError, OverflowError):
+        for match in VARINT_TOKEN.finditer(text):
+            try:
+                varint_char(match[0])
+            except (ValueError, OverflowError):
+                raise A1Z26Error(match[0], offset + match.start()) from None
+        raise
+
+
+def a1z26_compact_encode(text, key=None):
+    """Compact A1Z26: char numbers are packed as LEB128 varints
+    and Base64 encoded, output is several times shorter"""
+    return b64.b64encode(varint_pack(text)).decode('ascii')
+
+
+def a1z26_compact_decode(text, key=None):
+    """Decoding of a1z26_compact_encode() output"""
+    return varint_unpack(b64.b64decode(text))
+
+
+def a1z26_compact(text):
+    """Convert classic A1Z26 encoded text to compact form"""
+    return a1z26_compact_encode(a1z26_decode(text))
+
+
+def a1z26_classic(text):
+    """Convert compact A1Z26 encoded text to classic form"""
+    return a1z26_encode(a1z26_compact_decode(text))
+
+
+def base64_encode(text, key=None):
+    """Base64 encoding of UTF-8 text"""
+    return b64.b64encode(text.encode('utf-8')).decode('utf-8')
+
+
+def base64_decode(text, key=None):
+    """Base64 decoding to UTF-8 text"""
+    return b64.b64decode(text.encode('utf-8')).decode('utf-8')
+
+
+def url_encode(text, key=None):
+    """Percent-encoding of URL special chars"""
+    return urllib.parse.quote(text)
+
+
+def url_decode(text, key=None):
+    """Percent-decoding of %XX escapes"""
+    return urllib.parse.unquote(text)
+
+
+def iter_chunks(fp, chunk_size=CHUNK_SIZE):
+    """Read file object by fixed-size chunks.
+
+    Args:
+        fp: File object opened for reading.
+        chunk_size: Integer - max chunk length.
+
+    Returns:
+        Generator - file content chunks.
+
+    """
+    return iter(lambda: fp.read(chunk_size), fp.read(0))
+
+
+def rot13_stream(chunks, shift=13):
+    """Streaming version of rot13()"""
+    for chunk in chunks:
+        yield rot13(chunk, shift)
+
+
+def rot13_encode_stream(chunks, key=13):
+    """Streaming version of rot13_encode()"""
+    return rot13_stream(chunks, rot13_shift(key))
+
+
+def rot13_decode_stream(chunks, key=13):
+    """Streaming version of rot13_decode()"""
+    return rot13_stream(chunks, rot13_shift(key) * -1)
+
+
+def vigenere_letters_count(text):
+    """Count letters which consume Vigenere key positions"""
+    return sum(map(len, VIGENERE_LETTERS.findall(text)))
+
+
+def vigenere_stream(chunks, key, rev=False):
+    """Streaming Vigenere conversion.
+
+    Args:
+        chunks: Iterable of text strings.
+        key: Text string defines key.
+        rev: Boolean - reverse shifts direction for decoding.
+
+    Returns:
+        Generator - converted text chunks.
+
+    """
+    return vigenere_shifts_stream(chunks, vigenere_key_shifts(key, rev))
+
+
+def vigenere_shifts_stream(chunks, shifts, phase=0):
+    """Streaming Vigenere conversion by key schedule.
+    Key phase is carried from one chunk to the next one.
+
+    Args:
+        chunks: Iterable of text strings.
+        shifts: Tuple from vigenere_key_shifts() function.
+        phase: Integer - key position of the first letter.
+
+    Returns:
+        Generator - converted text chunks.
+
+    """
+    for chunk in chunks:
+        yield vigenere_batch_transform(chunk, shifts, phase)
+        if shifts:
+            phase = (phase + vigenere_letters_count(chunk)) % len(shifts)
+
+
+def vigenere_encode_stream(chunks, key):
+    """Streaming version of vigenere_encode()"""
+    return vigenere_stream(chunks, key, rev=False)
+
+
+def vigenere_decode_stream(chunks, key):
+    """Streaming version of vigenere_decode()"""
+    return vigenere_stream(chunks, key, rev=True)
+
+
+def a1z26_encode_stream(chunks, key=None):
+    """Streaming version of a1z26_encode()"""
+    separator = ''
+    for chunk in chunks:
+        if chunk:
+            yield separator + a1z26_encode(chunk)
+            separator = '-'
+
+
+def a1z26_decode_stream(chunks, key=None):
+    """Streaming version of a1z26_decode().
+    Number split between chunks is carried to the next chunk."""
+    tail = None
+    for chunk in chunks:
+        if tail is not None:
+            chunk = tail + chunk
+        head, sep, tail = chunk.rpartition('-')
+        if sep:
+            yield a1z26_decode(head)
+    if tail is not None:
+        yield a1z26_decode(tail)
+
+
+def base64_encode_bytes_stream(chunks):
+    """Streaming Base64 encoding of bytes chunks.
+    Bytes are encoded by whole 3-byte groups,
+    remainder is carried to the next chunk."""
+    tail = b''
+    for chunk in chunks:
+        data = tail + chunk
+        cut = len(data) - len(data) % 3
+        tail = data[cut:]
+        if cut:
+            yield b64.b64encode(data[:cut]).decode('utf-8')
+    if tail:
+        yield b64.b64encode(tail).decode('utf-8')
+
+
+def base64_encode_stream(chunks, key=None):
+    """Streaming Base64 encoding of UTF-8 text"""
+    return base64_encode_bytes_stream(chunk.encode('utf-8')
+                                      for chunk in chunks)
+
+
+BASE64_JUNK = re.compile('[^A-Za-z0-9+/=]')
+
+
+def base64_decode_bytes_stream(chunks):
+    """Streaming Base64 decoding to bytes chunks.
+    Encoded text is decoded by whole 4-char quanta,
+    remainder is carried to the next chunk."""
+    tail = ''
+    for chunk in chunks:
+        data = tail + BASE64_JUNK.sub('', chunk)
+        cut = len(data) - len(data) % 4
+        tail = data[cut:]
+        if cut:
+            yield b64.b64decode(data[:cut])
+    yield b64.b64decode(tail)
+
+
+def base64_decode_stream(chunks, key=None):
+    """Streaming Base64 decoding to UTF-8 text"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for data in base64_decode_bytes_stream(chunks):
+        yield decoder.decode(data)
+    yield decoder.decode(b'', final=True)
+
+
+def a1z26_compact_encode_stream(chunks, key=None):
+    """Streaming version of a1z26_compact_encode()"""
+    return base64_encode_bytes_stream(varint_pack(chunk) for chunk in chunks)
+
+
+def a1z26_compact_decode_stream(chunks, key=None):
+    """Streaming version of a1z26_compact_decode().
+    Varint split between chunks is carried to the next chunk."""
+    tail = b''
+    offset = 0
+    for data in base64_decode_bytes_stream(chunks):
+        data = tail + data
+        cut = len(data)
+        while cut and data[cut - 1] > 0x7F:
+            cut -= 1
+        tail = data[cut:]
+        yield varint_unpack(data[:cut], offset)
+        offset += cut
+    if tail:
+        varint_unpack(tail, offset)
+
+
+def url_encode_stream(chunks, key=None):
+    """Streaming version of urllib.parse.quote()"""
+    for chunk in chunks:
+        yield urllib.parse.quote(chunk)
+
+
+def url_decode_stream(chunks, key=None):
+    """Streaming version of urllib.parse.unquote().
+    %XX escape split between chunks is carried to the next chunk,
+    multibyte UTF-8 chars are decoded incrementally."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    tail = ''
+    for chunk in chunks:
+        chunk = tail + chunk
+        cut = chunk.rfind('%', len(chunk) - 2)
+        if cut == -1:
+            cut = len(chunk)
+        chunk, tail = chunk[:cut], chunk[cut:]
+        yield decoder.decode(urllib.parse.unquote_to_bytes(chunk))
+    yield decoder.decode(urllib.parse.unquote_to_bytes(tail), final=True)
+
+
+def register_binary(name, algorithm=None):
+    """Register text codec over binary codec:
+    UTF-8 text is encoded by binary.CODECS algorithm to ASCII text.
+
+    Args:
+        name: Text string - algorithm name shown in drop-down menu.
+        algorithm: Text string - binary codec name, name by default.
+
+    Returns:
+        Codec - registered codec.
+
+    """
+    algorithm = algorithm or name
+
+    def encode_text(text, key=None):
+        data = binary.encode(text.encode('utf-8'), algorithm)
+        return data.decode('ascii')
+
+    def decode_text(text, key=None):
+        return binary.decode(text, algorithm).decode('utf-8')
+
+    def encode_text_stream(chunks, key=None):
+        chunks = (chunk.encode('utf-8') for chunk in chunks)
+        for data in binary.encode_stream(chunks, algorithm):
+            yield data.decode('ascii')
+
+    def decode_text_stream(chunks, key=None):
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for data in binary.decode_stream(chunks, algorithm):
+            yield decoder.decode(data)
+        yield decoder.decode(b'', final=True)
+
+    return register(name, encode_text, decode_text, KEY_NOKEY,
+                    encode_text_stream, decode_text_stream)
+
+
+def encode_stream(chunks, algorithm, key=None):
+    """Streaming encode function.
+    Unlike encode() exceptions are raised to the caller,
+    codecs without streaming support convert joined chunks at once.
+
+    Args:
+        chunks: Iterable of text strings for encryption.
+        algorithm: Text string defines algorithm.
+        key: Text string or integer - encryption key.
+
+    Returns:
+        Iterator - encrypted text chunks.
+
+    """
+    codec = REGISTRY.get(algorithm)
+    if not codec:
+        return iter(chunks)
+    if codec.encode_stream:
+        def convert(chunks):
+            return codec.encode_stream(chunks, key)
+    else:
+        def convert(chunks):
+            return iter((codec.encode(''.join(chunks), key),))
+    return metrics.stream('codec', f'{algorithm}.encode_stream',
+                          chunks, convert)
+
+
+def decode_stream(chunks, algorithm, key=None):
+    """Streaming decode function.
+    Unlike decode() exceptions are raised to the caller,
+    codecs without streaming support convert joined chunks at once.
+
+    Args:
+        chunks: Iterable of encrypted text strings for decryption.
+        algorithm: Text string defines algorithm.
+        key: Text string or integer - decryption key.
+
+    Returns:
+        Iterator - decrypted text chunks.
+
+    """
+    codec = REGISTRY.get(algorithm)
+    if not codec or not codec.decode:
+        return iter(chunks)
+    if codec.decode_stream:
+        def convert(chunks):
+            return codec.decode_stream(chunks, key)
+    else:
+        def convert(chunks):
+            return iter((codec.decode(''.join(chunks), key),))
+    return metrics.stream('codec', f'{algorithm}.decode_stream',
+                          chunks, convert)
+
+
+register('ROT13', rot13_encode, rot13_decode, KEY_DECIMAL,
+         rot13_encode_stream, rot13_decode_stream)
+register('Vigenere', vigenere_encode, vigenere_decode, KEY_TEXT,
+         vigenere_encode_stream, vigenere_decode_stream)
+register('A1Z26', a1z26_encode, a1z26_decode, KEY_NOKEY,
+         a1z26_encode_stream, a1z26_decode_stream)
+register('A1Z26 compact', a1z26_compact_encode, a1z26_compact_decode,
+         KEY_NOKEY, a1z26_compact_encode_stream, a1z26_compact_decode_stream)
+register('Base64', base64_encode, base64_decode, KEY_NOKEY,
+         base64_encode_stream, base64_decode_stream)
+register('URL', url_encode, url_decode, KEY_NOKEY,
+         url_encode_stream, url_decode_stream)
+register_binary('Base64 URL-safe')
+register_binary('Base32')
+register_binary('Base85')
 
 
 def main():
@@ -259,6 +938,28 @@ def main():
     encoded = vigenere_encode('Некий текст тут', 'ключ')
     assert vigenere_decode(encoded, 'ключ') == 'Некий текст тут'
 
+    assert a1z26_decode('83-111-109-101') == 'Some'
+    assert a1z26_decode('+65- 66-1_0-\u0663\u0663') == 'AB\n!'
+    assert a1z26_classic(a1z26_compact('83-1084-128512')) == \
+        '83-1084-128512'
+    try:
+        a1z26_decode('83-111-x-101')
+    except A1Z26Error as ex:
+        assert ex.offset == 7
+    else:
+        assert False
+
+    text = 'Некий text тут, 100%! ' * 50
+    for algorithm in CODERS:
+        key = 'ключ' if algorithm == 'Vigenere' else 5
+        encoded = encode(text, algorithm, key)[1]
+        chunks = [encoded[i:i + 7] for i in range(0, len(encoded), 7)]
+        assert ''.join(encode_stream(text, algorithm, key)) == encoded
+        assert ''.join(decode_stream(chunks, algorithm, key)) == text
+    assert ''.join(encode_stream(['Some ', 'text'], 'ROT13')) == \
+        rot13('Some text')
+    assert ''.join(decode_stream(['Fbzr ', 'grkg'], 'ROT13')) == 'Some text'
+
 
 if __name__ == '__main__':
     main()
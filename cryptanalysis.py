@@ -0,0 +1,382 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import Counter, namedtuple
+from itertools import repeat
+from math import exp, gcd, log
+from operator import mul
+
+import coders
+
+
+# letter frequencies in percents, alphabet order
+ENGLISH_FREQUENCIES = (8.167, 1.492, 2.782, 4.253, 12.702, 2.228, 2.015,
+                       6.094, 6.966, 0.153, 0.772, 4.025, 2.406, 6.749,
+                       7.507, 1.929, 0.095, 5.987, 6.327, 9.056, 2.758,
+                       0.978, 2.360, 0.150, 1.974, 0.074)
+# А-Я without Ё, Ё is counted as Е
+RUSSIAN_FREQUENCIES = (8.01, 1.59, 4.54, 1.70, 2.98, 8.49, 0.94, 1.65,
+                       7.35, 1.21, 3.49, 4.40, 3.21, 6.70, 10.97, 2.81,
+                       4.73, 5.47, 6.26, 2.62, 0.26, 0.97, 0.48, 1.44,
+                       0.73, 0.36, 0.04, 1.90, 1.74, 0.32, 0.64, 2.01)
+
+# (upper case range, lower case range, letter frequencies)
+LANGUAGES = ((coders.lat_range_1, coders.lat_range_2, ENGLISH_FREQUENCIES),
+             (coders.cyr_range_1, coders.cyr_range_2, RUSSIAN_FREQUENCIES))
+
+# key length is estimated and key columns are scored
+# on this many first letters of text
+ANALYSIS_SAMPLE = 100000
+KASISKI_SAMPLE = 20000
+KASISKI_GRAM = 3
+KEY_LENGTH_MAX = 24
+# best lengths by index of coincidence and by Kasiski votes
+# are evaluated, multiples of key length give the same key
+KEY_LENGTH_CANDIDATES = 4
+PREVIEW_LENGTH = 80
+
+# shift - ROT decoding key, confidence - probability of shift
+# among all shifts, score - log-likelihood of decoded letters
+ShiftScore = namedtuple('ShiftScore', ('shift', 'confidence', 'score'))
+# ioc - mean index of coincidence of key columns,
+# kasiski - repeated trigram distances divisible by length
+KeyLength = namedtuple('KeyLength', ('length', 'ioc', 'kasiski'))
+# score - mean log-likelihood of decoded letter,
+# preview - decoded beginning of text
+KeyCandidate = namedtuple('KeyCandidate', ('key', 'score', 'preview'))
+
+
+def log_frequencies(frequencies):
+    """Natural logarithms of normalized letter frequencies"""
+    total = sum(frequencies)
+    return tuple(log(frequency / total) for frequency in frequencies)
+
+
+LOG_FREQUENCIES = tuple(log_frequencies(frequencies)
+                        for _, _, frequencies in LANGUAGES)
+LOWER_ALPHABETS = tuple(''.join(map(chr, range(*lower[:2])))
+                        for _, lower, _ in LANGUAGES)
+
+
+def letter_histograms(text):
+    """Case-folded letter counts of every LANGUAGES alphabet.
+    Every letter is counted by str.count(), so text is scanned
+    in C without per-char Python objects.
+
+    Args:
+        text: Text string.
+
+    Returns:
+        List - list of letter counts for every alphabet.
+
+    """
+    histograms = []
+    for upper, lower, _ in LANGUAGES:
+        histograms.append([text.count(chr(upper_num)) +
+                           text.count(chr(lower_num))
+                           for upper_num, lower_num in
+                           zip(range(*upper[:2]), range(*lower[:2]))])
+    return histograms
+
+
+def shift_log_likelihoods(histogram, log_freqs):
+    """Log-likelihood of ciphertext histogram for every shift.
+    It is circulant matrix of rotated histograms multiplied
+    by log-frequencies vector: letter i encoded by shift k
+    is counted at (i + k) % n.
+
+    Args:
+        histogram: List - letter counts of one alphabet.
+        log_freqs: Tuple - log_frequencies() of the same alphabet.
+
+    Returns:
+        List - log-likelihoods indexed by shift.
+
+    """
+    return [sum(map(mul, histogram[shift:] + histogram[:shift], log_freqs))
+            for shift in range(len(histogram))]
+
+
+def rot_scores(histograms):
+    """Rank ROT shifts by letter_histograms() of ciphertext.
+    Work does not depend on text length. Text with letters
+    of both alphabets is scored by ROT keys up to ROT_PERIOD,
+    Latin and Cyrillic shifts of one key are scored together.
+
+    Args:
+        histograms: List - letter_histograms() result.
+
+    Returns:
+        List - ShiftScore tuples, most probable first,
+               empty if there are no letters.
+
+    """
+    period = 1
+    tables = []
+    for histogram, log_freqs in zip(histograms, LOG_FREQUENCIES):
+        if any(histogram):
+            tables.append(shift_log_likelihoods(histogram, log_freqs))
+            period = period * len(histogram) // gcd(period, len(histogram))
+    if not tables:
+        return []
+    scores = [sum(table[shift % len(table)] for table in tables)
+              for shift in range(period)]
+    best = max(scores)
+    weights = [exp(score - best) for score in scores]
+    total = sum(weights)
+    ranked = sorted(range(period), key=scores.__getitem__, reverse=True)
+    return [ShiftScore(shift, weights[shift] / total, scores[shift])
+            for shift in ranked]
+
+
+def rot_crack(text, top=None):
+    """Find ROT key of text encoded with unknown shift.
+
+    Args:
+        text: Text string - ROT encoded text.
+        top: Integer - max results count, all shifts by default.
+
+    Returns:
+        List - ShiftScore tuples, most probable first.
+
+    """
+    ranked = rot_scores(letter_histograms(text))
+    return ranked[:top] if top else ranked
+
+
+def vigenere_letters(text):
+    """Case-folded letters of text transformed by Vigenere algorithm,
+    key phase of letter is its position in result"""
+    return ''.join(coders.VIGENERE_LETTERS.findall(text)).lower()
+
+
+def folded_histograms(letters):
+    """letter_histograms() of vigenere_letters() result"""
+    return [[letters.count(char) for char in alphabet]
+            for alphabet in LOWER_ALPHABETS]
+
+
+def index_of_coincidence(histograms):
+    """Probability of two random letters to be the same,
+    about 0.066 for English, 0.055 for Russian
+    and 0.038 or 0.031 for uniformly random letters"""
+    total = sum(map(sum, histograms))
+    if total < 2:
+        return 0.0
+    return sum(count * (count - 1) for histogram in histograms
+               for count in histogram) / (total * (total - 1))
+
+
+def kasiski_votes(letters, max_length, gram=KASISKI_GRAM):
+    """Kasiski examination: distances between repeated n-grams
+    are multiples of key length.
+
+    Args:
+        letters: Text string - vigenere_letters() result.
+        max_length: Integer - max key length.
+        gram: Integer - n-gram length.
+
+    Returns:
+        List - distances count divisible by every length, by length.
+
+    """
+    last = {}
+    distances = Counter()
+    for pos in range(len(letters) - gram + 1):
+        chunk = letters[pos:pos + gram]
+        if chunk in last:
+            distances[pos - last[chunk]] += 1
+        last[chunk] = pos
+    votes = [0] * (max_length + 1)
+    for distance, count in distances.items():
+        for length in range(2, max_length + 1):
+            if distance % length == 0:
+                votes[length] += count
+    return votes
+
+
+def length_ioc(letters, length):
+    """Mean index of coincidence of key columns for key length"""
+    return sum(index_of_coincidence(folded_histograms(letters[column::length]))
+               for column in range(length)) / length
+
+
+def key_lengths(letters, max_length=KEY_LENGTH_MAX, executor=None):
+    """Estimate Vigenere key length.
+
+    Args:
+        letters: Text string - vigenere_letters() result.
+        max_length: Integer - max key length.
+        executor: concurrent.futures executor, sequential by default.
+
+    Returns:
+        List - KeyLength tuples for lengths from 1 to max_length.
+
+    """
+    votes = kasiski_votes(letters[:KASISKI_SAMPLE], max_length)
+    lengths = range(1, max_length + 1)
+    mapper = executor.map if executor else map
+    return [KeyLength(length, ioc, votes[length]) for length, ioc in
+            zip(lengths, mapper(length_ioc, repeat(letters), lengths))]
+
+
+def column_key_scores(histograms):
+    """Log-likelihoods of key values of one key column.
+    Key value is vigenere_key_shifts() item, from 1 to the longest
+    alphabet length, shifts of both alphabets are scored together.
+
+    Args:
+        histograms: List - folded_histograms() of column letters.
+
+    Returns:
+        Dictionary - key value to log-likelihood.
+
+    """
+    tables = [shift_log_likelihoods(histogram, log_freqs)
+              for histogram, log_freqs in zip(histograms, LOG_FREQUENCIES)
+              if any(histogram)]
+    top = max(map(len, tables), default=len(LOWER_ALPHABETS[0]))
+    return {value: sum(table[value % len(table)] for table in tables)
+            for value in range(1, top + 1)}
+
+
+def evaluate_key_length(letters, length):
+    """Recover key of given length by frequency scoring of columns.
+    Module-level function, so process pool can run it.
+
+    Args:
+        letters: Text string - vigenere_letters() result.
+        length: Integer - key length.
+
+    Returns:
+        Tuple - key values, summary log-likelihood and list of
+                (loss, column, value) alternatives for every column.
+
+    """
+    values = []
+    score = 0
+    alternatives = []
+    for column in range(length):
+        scores = column_key_scores(folded_histograms(letters[column::length]))
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        values.append(ranked[0])
+        score += scores[ranked[0]]
+        if len(ranked) > 1:
+            alternatives.append((scores[ranked[0]] - scores[ranked[1]],
+                                 column, ranked[1]))
+    return tuple(values), score, alternatives
+
+
+def primitive_key(values):
+    """Shortest period of key values, 'keykey' is 'key'"""
+    for length in range(1, len(values)):
+        if len(values) % length == 0 and \
+           values == values[:length] * (len(values) // length):
+            return values[:length]
+    return values
+
+
+def key_text(values, letters):
+    """Key string of key values, in alphabet of most text letters.
+    Latin letters go up to 26, so larger values are Cyrillic."""
+    counts = [sum(map(letters.count, alphabet))
+              for alphabet in LOWER_ALPHABETS]
+    alphabets = sorted(LOWER_ALPHABETS, key=lambda alphabet:
+                       counts[LOWER_ALPHABETS.index(alphabet)],
+                       reverse=True)
+    key = ''
+    for value in values:
+        alphabet = next((alphabet for alphabet in alphabets
+                         if value <= len(alphabet)), alphabets[-1])
+        key += alphabet[value - 1]
+    return key
+
+
+def penalized(score, values, letters):
+    """Key log-likelihood with BIC penalty for key length,
+    longer keys fit noise of short texts better"""
+    return score - len(values) * log(len(letters)) / 2
+
+
+def vigenere_crack(text, top=3, max_length=KEY_LENGTH_MAX, executor=None):
+    """Find Vigenere keys of text encoded with unknown key.
+    Key length candidates come from index of coincidence and
+    Kasiski examination, every candidate is evaluated by
+    evaluate_key_length(), repeated keys collapse to one.
+
+    Args:
+        text: Text string - Vigenere encoded text.
+        top: Integer - max results count.
+        max_length: Integer - max key length.
+        executor: concurrent.futures executor evaluating candidate
+                  lengths in parallel, sequential by default.
+
+    Returns:
+        List - KeyCandidate tuples, most probable first,
+               empty if there are no letters.
+
+    """
+    letters = vigenere_letters(text)[:ANALYSIS_SAMPLE]
+    if not letters:
+        return []
+    estimates = key_lengths(letters, min(max_length, len(letters)),
+                            executor)
+    candidates = set()
+    for field in ('ioc', 'kasiski'):
+        estimates.sort(key=lambda estimate: getattr(estimate, field),
+                       reverse=True)
+        candidates.update(estimate.length for estimate
+                          in estimates[:KEY_LENGTH_CANDIDATES])
+    candidates = sorted(candidates)
+    mapper = executor.map if executor else map
+    results = dict(zip(candidates, mapper(evaluate_key_length,
+                                          repeat(letters), candidates)))
+
+    keys = {}
+    for length in candidates:
+        values = primitive_key(results[length][0])
+        if len(values) not in results:
+            results[len(values)] = evaluate_key_length(letters, len(values))
+        keys[values] = results[len(values)][1]
+    best = max(keys, key=lambda values: penalized(keys[values], values,
+                                                  letters))
+    for loss, column, value in results[len(best)][2]:
+        values = best[:column] + (value,) + best[column + 1:]
+        keys.setdefault(values, keys[best] - loss)
+    ranked = sorted(keys, reverse=True, key=lambda values:
+                    penalized(keys[values], values, letters))[:top]
+
+    preview = text[:PREVIEW_LENGTH]
+    result = []
+    for values in ranked:
+        key = key_text(values, letters)
+        result.append(KeyCandidate(key, keys[values] / len(letters),
+                                   coders.vigenere_decode(preview, key)))
+    return result
+
+
+def main():
+    """minimal funcs testing"""
+    import random
+    english = 'The quick brown fox jumps over the lazy dog near the river ' \
+              'bank while the farmer is watching his sheep in the field. '
+    russian = 'Съешь же ещё этих мягких французских булок, да выпей чаю. ' \
+              'Мороз и солнце, день чудесный, ещё ты дремлешь, друг мой. '
+    for text, key in ((english, 7), (russian, 20), (english + russian, 211)):
+        ranked = rot_crack(coders.rot13_encode(text, key), top=3)
+        assert ranked[0].shift == key, ranked
+        assert ranked[0].confidence > 0.9
+    assert rot_crack('12345') == []
+    shuffle = random.Random(0).sample
+    for text, keys in ((english, ('key', 'lemon')), (russian, ('ключ',))):
+        words = text.split() * 20
+        text = ' '.join(shuffle(words, len(words)))
+        for key in keys:
+            ranked = vigenere_crack(coders.vigenere_encode(text, key))
+            assert ranked[0].key == key, ranked
+            assert ranked[0].preview == text[:PREVIEW_LENGTH]
+    assert vigenere_crack('12345') == []
+
+
+if __name__ == '__main__':
+    main()
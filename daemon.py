@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import json
+import signal
+import socket
+import asyncio
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from client import LINE_MAX, socket_path
+import cli
+import coders
+import hashes
+import metrics
+
+
+OPS = ('encode', 'decode', 'hash')
+# requests up to BATCH_MAX chars are coalesced into batches
+BATCH_MAX = 64 * 1024
+# batch is run BATCH_DELAY seconds after its first request
+# or as soon as it reaches BATCH_SIZE chars, zero delay still
+# coalesces requests read in one event loop iteration
+BATCH_DELAY = 0
+BATCH_SIZE = 256 * 1024
+# smaller batches run in event loop, larger ones in process pool
+INLINE_MAX = 32 * 1024
+
+
+def run_request(request):
+    """Process request dictionary in current process.
+
+    Args:
+        request: Dictionary - decoded request line, see client module.
+
+    Returns:
+        Dictionary - response without id.
+
+    """
+    error = result = None
+    try:
+        op, algorithm = request['op'], request['algorithm']
+        text, key = request['text'], request.get('key')
+        if op == 'hash':
+            result = hashes.get_md(text, algorithm)
+        elif op in OPS:
+            codec = coders.REGISTRY.get(algorithm)
+            if not codec or not getattr(codec, op):
+                raise ValueError(f'Unknown codec {algorithm!r} for {op}')
+            error, result = getattr(coders, op)(text, algorithm, key)
+        else:
+            raise ValueError(f'Unknown operation {op!r}')
+    except Exception as ex:
+        error = {'title': ex.__class__.__name__, 'text': str(ex)}
+    return {'error': error, 'result': None if error else result}
+
+
+def run_batch(requests):
+    """Process requests list, runs in event loop or pool worker"""
+    return [run_request(request) for request in requests]
+
+
+class Daemon():
+    """asyncio conversion server on Unix domain socket.
+    Small requests of all connections are coalesced into batches,
+    large requests and batches run in process pool."""
+    def __init__(self, path=None, jobs=None, batch_delay=BATCH_DELAY):
+        """Init method.
+
+        Args:
+            path: Text string - socket path, see client.socket_path().
+            jobs: Integer - pool processes count (default: CPU count).
+            batch_delay: Float - seconds to wait for batch requests.
+
+        """
+        self.path = socket_path(path)
+        self.pool = ProcessPoolExecutor(max_workers=jobs,
+                                        initializer=cli.init_worker)
+        self.batch_delay = batch_delay
+        self.batch = []
+        self.batch_size = 0
+        self.flush_handle = None
+        self.bound = False
+
+    def check_socket(self):
+        """Remove stale socket file left by killed daemon,
+        raise RuntimeError if daemon is running"""
+        if not os.path.exists(self.path):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(self.path)
+            except OSError:
+                os.unlink(self.path)
+                return
+        raise RuntimeError(f'Daemon is already running on {self.path}')
+
+    async def serve(self):
+        """Serve until SIGINT or SIGTERM"""
+        self.check_socket()
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        server = await asyncio.start_unix_server(self.handle, self.path,
+                                                 limit=LINE_MAX)
+        self.bound = True
+        os.chmod(self.path, 0o600)
+        async with server:
+            await stop.wait()
+
+    async def handle(self, reader, writer):
+        """Connection handler, requests run concurrently
+        and responses are written as they are ready"""
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.ensure_future(self.respond(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except (ConnectionError, ValueError):
+            # ValueError - line is longer than LINE_MAX
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, line, writer, lock):
+        """Process request line and write response line"""
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            response = await self.submit(request)
+        except Exception as ex:
+            response = {'error': {'title': ex.__class__.__name__,
+                                  'text': str(ex)}, 'result': None}
+        response['id'] = request_id
+        async with lock:
+            writer.write(json.dumps(response, ensure_ascii=False)
+                         .encode('utf-8') + b'\n')
+            await writer.drain()
+
+    def submit(self, request):
+        """Queue request to batch or to process pool.
+
+        Returns:
+            Awaitable - response dictionary without id.
+
+        """
+        loop = asyncio.get_running_loop()
+        size = len(request.get('text') or '')
+        if size > BATCH_MAX:
+            return loop.run_in_executor(self.pool, run_request, request)
+        future = loop.create_future()
+        self.batch.append((request, future))
+        self.batch_size += size
+        if self.batch_size >= BATCH_SIZE:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.batch_delay, self.flush)
+        return future
+
+    def flush(self):
+        """Run collected batch"""
+        if self.flush_handle:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, size = self.batch, self.batch_size
+        self.batch, self.batch_size = [], 0
+        requests = [request for request, future in batch]
+        if size <= INLINE_MAX:
+            with metrics.span('daemon', 'batch', size):
+                self.resolve(batch, run_batch(requests))
+            return
+        job = asyncio.get_running_loop().run_in_executor(
+            self.pool, run_batch, requests)
+        job.add_done_callback(partial(self.resolve_job, batch))
+
+    @staticmethod
+    def resolve(batch, responses):
+        """Set batch futures results"""
+        for (request, future), response in zip(batch, responses):
+            if not future.done():
+                future.set_result(response)
+
+    @classmethod
+    def resolve_job(cls, batch, job):
+        """Set batch futures by pool job result or error"""
+        if job.cancelled() or job.exception():
+            error = job.exception() if not job.cancelled() \
+                else ConnectionError('Daemon is shutting down')
+            for request, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        else:
+            cls.resolve(batch, job.result())
+
+    def close(self):
+        """Stop pool and remove socket file"""
+        self.pool.shutdown(cancel_futures=True)
+        if self.bound and os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def parse_args(args=None):
+    """Command line arguments parser"""
+    parser = argparse.ArgumentParser(
+        description='Serve codecs and hashes over Unix domain socket.')
+    parser.add_argument('-s', '--socket', default=None,
+                        help='socket path (default: $CRYPTEX_SOCKET '
+                             'or cryptex-UID.sock in temp directory)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='worker processes count (default: CPU count)')
+    parser.add_argument('-d', '--batch-delay', type=float,
+                        default=BATCH_DELAY,
+                        help='seconds to collect small requests '
+                             f'into batch (default: {BATCH_DELAY})')
+    parser.add_argument('--metrics', default=None,
+                        help='metrics sinks like "jsonl:daemon.jsonl" '
+                             f'(default: ${metrics.ENV_VARIABLE})')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Run daemon until interrupted"""
+    args = parse_args(args)
+    metrics.configure(args.metrics)
+    for error in coders.load_plugins():
+        print(f'{error["title"]}: {error["text"]}', file=sys.stderr)
+    daemon = Daemon(args.socket, args.jobs, args.batch_delay)
+    try:
+        asyncio.run(daemon.serve())
+    except RuntimeError as ex:
+        print(ex, file=sys.stderr)
+        return 1
+    finally:
+        daemon.close()
+        metrics.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import mmap
+import hashlib
+from inspect import signature
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+
+# digest length for variable-length hash-functions (SHAKE)
+SHAKE_LENGTH = 1024
+FILE_CHUNK_SIZE = 1024 * 1024
+DEFAULT_HASH = 'sha256'
+# hashlib releases GIL for buffers larger than 2047 bytes,
+# smaller chunks are hashed sequentially
+PARALLEL_MIN = 2048
+
+
+def hexdigest(hash_obj):
+    """Return hash object hexdigest,
+    variable-length hash-functions return SHAKE_LENGTH bytes digest.
+
+    Args:
+        hash_obj: hashlib hash object.
+
+    Returns:
+        Text string - hash-function hexdigest.
+
+    """
+    try:
+        sig = signature(hash_obj.hexdigest).parameters
+    except ValueError:
+        sig = ()
+    if len(sig) == 0:
+        return hash_obj.hexdigest()
+    else:
+        return hash_obj.hexdigest(SHAKE_LENGTH)
+
+
+def get_md(string, algorithm):
+    """Process text string through hash-function
+    and return function return.
+
+    Args:
+        string: Text string for hashing.
+        algorithm: Text string defines hash-algorithm.
+
+    Returns:
+        Text string - hash-function hexdigest.
+
+    """
+    with metrics.span('hash', algorithm, len(string)) as span:
+        digest = hexdigest(hashlib.new(algorithm, string.encode('utf-8')))
+        span.size_out = len(digest)
+    return digest
+
+
+def get_md_stream(chunks, algorithm):
+    """Streaming version of get_md() for bytes chunks"""
+    hash_obj = hashlib.new(algorithm)
+    with metrics.span('hash', algorithm) as span:
+        size = 0
+        for chunk in chunks:
+            hash_obj.update(chunk)
+            size += len(chunk)
+        digest = hexdigest(hash_obj)
+        span.size_in, span.size_out = size, len(digest)
+    return digest
+
+
+def iter_file_slices(fp, chunk_size=FILE_CHUNK_SIZE):
+    """Memory-map file and yield its content by zero-copy slices.
+    Every slice is released right after consumer takes the next one.
+
+    Args:
+        fp: File object opened in binary mode.
+        chunk_size: Integer - max slice length in bytes.
+
+    Returns:
+        Generator - memoryview slices of file content.
+
+    """
+    size = os.fstat(fp.fileno()).st_size
+    if not size:
+        return
+    with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+         memoryview(mapped) as view, \
+         metrics.span('file', 'mmap', size) as span:
+        span.size_out = size
+        for start in range(0, size, chunk_size):
+            with view[start:start + chunk_size] as chunk:
+                yield chunk
+
+
+def get_md_file(file_name, algorithm, chunk_size=FILE_CHUNK_SIZE):
+    """Hash file content without reading it into memory.
+
+    Args:
+        file_name: Text string defines filename.
+        algorithm: Text string defines hash-algorithm.
+        chunk_size: Integer - bytes fed to hash object at once.
+
+    Returns:
+        Text string - hash-function hexdigest.
+
+    """
+    with open(file_name, 'rb') as fp:
+        return get_md_stream(iter_file_slices(fp, chunk_size), algorithm)
+
+
+def get_mds_stream(chunks, algorithms, max_workers=None):
+    """Hash bytes chunks by several hash-functions in one pass.
+    Every chunk is fed to all hash objects on thread pool.
+
+    Args:
+        chunks: Iterable of bytes-like objects.
+        algorithms: Iterable of text strings defines hash-algorithms.
+        max_workers: Integer - threads count (default: hash objects count).
+
+    Returns:
+        Errors - dictionary algorithm to dictionary with error title
+                 and error text for algorithms failed to create.
+        Digests - dictionary algorithm to hexdigest.
+
+    """
+    errors, hash_objs = {}, {}
+    for algorithm in algorithms:
+        try:
+            hash_objs[algorithm] = hashlib.new(algorithm)
+        except Exception as ex:
+            errors[algorithm] = {'title': ex.__class__.__name__,
+                                 'text': str(ex)}
+
+    updates = [hash_obj.update for hash_obj in hash_objs.values()]
+    with ThreadPoolExecutor(max_workers=max_workers or
+                            max(len(updates), 1)) as pool, \
+         metrics.span('hash', ','.join(hash_objs)) as span:
+        for chunk in chunks:
+            span.size_in += len(chunk)
+            if len(chunk) < PARALLEL_MIN or len(updates) < 2:
+                for update in updates:
+                    update(chunk)
+            else:
+                # wait for all updates before chunk gets released
+                for future in [pool.submit(update, chunk)
+                               for update in updates]:
+                    future.result()
+
+    digests = {algorithm: hexdigest(hash_obj)
+               for algorithm, hash_obj in hash_objs.items()}
+    return errors, digests
+
+
+def get_mds(string, algorithms, chunk_size=FILE_CHUNK_SIZE):
+    """Multi-digest version of get_md()"""
+    data = memoryview(string.encode('utf-8'))
+    chunks = (data[start:start + chunk_size]
+              for start in range(0, len(data), chunk_size))
+    return get_mds_stream(chunks, algorithms)
+
+
+def get_mds_file(file_name, algorithms, chunk_size=FILE_CHUNK_SIZE):
+    """Multi-digest version of get_md_file()"""
+    with open(file_name, 'rb') as fp:
+        return get_mds_stream(iter_file_slices(fp, chunk_size), algorithms)
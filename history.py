@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+from pipeline import CANCELLABLE, Pipeline
+from textsdb import pack_text, unpack_text
+import coders
+import hashes
+
+
+# bytes of checkpoints and deltas kept by ConversionHistory
+HISTORY_BUDGET = 32 * 2 ** 20
+# common prefix and suffix of edited text are searched block by block
+DELTA_BLOCK = 64 * 1024
+
+# Step turns state N into state N + 1.
+# op - 'encode', 'decode', 'hash', 'pipeline' (algorithm is recipe,
+#      key is decode flag) or 'edit' (key is start of replaced span,
+#      data is (old, new) packed spans);
+# data of not invertible conversion is packed input text (checkpoint),
+# None for conversions rebuilt backwards by inverse codec.
+Step = namedtuple('Step', ('op', 'algorithm', 'key', 'data', 'size'))
+
+
+def common_prefix(first, second):
+    """Length of common prefix of two text strings"""
+    limit = min(len(first), len(second))
+    start = 0
+    while start < limit and first[start:start + DELTA_BLOCK] == \
+            second[start:start + DELTA_BLOCK]:
+        start += DELTA_BLOCK
+    low, high = start, min(start + DELTA_BLOCK, limit)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[start:middle] == second[start:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def common_suffix(first, second, limit):
+    """Length of common suffix of two text strings, up to limit"""
+    first_end, second_end = len(first), len(second)
+    length = 0
+    while length < limit:
+        block = min(DELTA_BLOCK, limit - length)
+        if first[first_end - length - block:first_end - length] != \
+                second[second_end - length - block:second_end - length]:
+            break
+        length += block
+    else:
+        return length
+    low, high = length, length + block
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[first_end - middle:first_end - length] == \
+                second[second_end - middle:second_end - length]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def is_invertible(op, algorithm):
+    """True if input of conversion is restored by inverse codec"""
+    return op == 'encode' and algorithm in CANCELLABLE
+
+
+def apply_conversion(text, op, algorithm, key=None):
+    """Replay recorded conversion.
+
+    Args:
+        text: Text string for conversion.
+        op: Text string - 'encode', 'decode', 'hash' or 'pipeline'.
+        algorithm: Text string - algorithm or pipeline recipe.
+        key: Text string or integer - algorithm key,
+             decode flag for pipeline.
+
+    Returns:
+        Text string - conversion result.
+
+    Raises:
+        ValueError - if conversion failed.
+
+    """
+    if op == 'hash':
+        return hashes.get_md(text, algorithm)
+    if op == 'pipeline':
+        error, text = Pipeline.from_recipe(algorithm, decode=key).run(text)
+    else:
+        error, text = getattr(coders, op)(text, algorithm, key)
+    if error:
+        raise ValueError(f'{error["title"]}: {error["text"]}')
+    return text
+
+
+def make_edit(old, new):
+    """Edit step replacing changed span of old text by new one"""
+    start = common_prefix(old, new)
+    end = common_suffix(old, new, min(len(old), len(new)) - start)
+    data = (pack_text(old[start:len(old) - end]),
+            pack_text(new[start:len(new) - end]))
+    return Step('edit', None, start, data,
+                len(data[0][1]) + len(data[1][1]))
+
+
+def apply_edit(text, step, backward=False):
+    """Apply edit step to text or revert it"""
+    old, new = (unpack_text(*packed) for packed in step.data)
+    if backward:
+        old, new = new, old
+    return text[:step.key] + new + text[step.key + len(old):]
+
+
+class ConversionHistory():
+    """Undo/redo history of text_field conversions.
+    Only the current text is kept as is. Steps store conversion
+    recipes, edits between conversions are stored as compressed
+    replaced spans. Previous state is rebuilt by inverse codec or
+    from packed input of not invertible conversion, next state by
+    replaying conversion. Oldest steps are dropped when packed
+    data exceeds budget."""
+    def __init__(self, budget=HISTORY_BUDGET):
+        """Init method.
+
+        Args:
+            budget: Integer - max bytes of packed checkpoints and edits.
+
+        """
+        self.budget = budget
+        self.reset()
+
+    def reset(self):
+        """Forget all steps, e.g. when new file is opened"""
+        self.text = None
+        self.steps = []
+        self.index = 0
+        self.size = 0
+
+    def can_undo(self):
+        """True if there is previous state"""
+        return self.index > 0
+
+    def can_redo(self):
+        """True if there is next state"""
+        return self.index < len(self.steps)
+
+    def record(self, text, result, op, algorithm, key=None):
+        """Add conversion step, redo steps are dropped.
+
+        Args:
+            text: Text string - conversion input, if it differs from
+                  current state, edit step is recorded before.
+            result: Text string - conversion result, new current state.
+            op: Text string - 'encode', 'decode', 'hash' or 'pipeline'.
+            algorithm: Text string - algorithm or pipeline recipe.
+            key: Text string or integer - algorithm key,
+                 decode flag for pipeline.
+
+        """
+        self.record_edit(text)
+        data, size = None, 0
+        # empty text is not decoded back by A1Z26, its checkpoint is free
+        if not is_invertible(op, algorithm) or not text:
+            data = pack_text(text)
+            size = len(data[1])
+        self.append(Step(op, algorithm, key, data, size))
+        self.text = result
+        self.trim()
+
+    def record_edit(self, text):
+        """Make text current state, redo steps are dropped.
+        Edit step is recorded if text differs from current state."""
+        for step in self.steps[self.index:]:
+            self.size -= step.size
+        del self.steps[self.index:]
+        if self.text is not None and text != self.text:
+            self.append(make_edit(self.text, text))
+        self.text = text
+        self.trim()
+
+    def append(self, step):
+        """Append step after current state and make it current"""
+        self.steps.append(step)
+        self.index += 1
+        self.size += step.size
+
+    def trim(self):
+        """Drop oldest steps, then redo steps while over budget.
+        State is rebuilt from the nearest next checkpoint, so older
+        steps are never needed for newer states."""
+        while self.size > self.budget and self.index > 0:
+            self.size -= self.steps.pop(0).size
+            self.index -= 1
+        while self.size > self.budget and self.can_redo():
+            self.size -= self.steps.pop().size
+
+    def rebuild(self, index):
+        """Text of state by index, current state is not changed.
+        Reads steps only, so may run in worker thread.
+
+        Args:
+            index: Integer - state index from 0 to len(self.steps).
+
+        Returns:
+            Text string - state text.
+
+        """
+        if index >= self.index:
+            text = self.text
+            for step in self.steps[self.index:index]:
+                if step.op == 'edit':
+                    text = apply_edit(text, step)
+                else:
+                    text = apply_conversion(text, step.op, step.algorithm,
+                                            step.key)
+            return text
+        start, text = self.index, self.text
+        for position in range(index, self.index):
+            step = self.steps[position]
+            if step.op != 'edit' and step.data:
+                start, text = position, unpack_text(*step.data)
+                break
+        for step in reversed(self.steps[index:start]):
+            if step.op == 'edit':
+                text = apply_edit(text, step, backward=True)
+            else:
+                text = apply_conversion(text, 'decode', step.algorithm,
+                                        step.key)
+        return text
+
+    def move(self, index, text):
+        """Make state current, text is rebuild(index) result"""
+        self.index = index
+        self.text = text
+
+    def label(self, index):
+        """Description of step by index like 'encode ROT13'"""
+        step = self.steps[index]
+        if step.op == 'edit':
+            return 'edit'
+        return f'{step.op} {step.algorithm}'
+
+
+def main():
+    """minimal funcs testing"""
+    text = 'Hello, Мир! ' * 200
+    history = ConversionHistory()
+    states = [text]
+    for op, algorithm, key in (('encode', 'ROT13', 3),
+                               ('encode', 'Base64', None),
+                               ('decode', 'Base64', None),
+                               ('hash', 'md5', None)):
+        states.append(apply_conversion(states[-1], op, algorithm, key))
+        history.record(states[-2], states[-1], op, algorithm, key)
+    edited = states[-1][:5] + 'edit' + states[-1][9:]
+    states.append(edited)
+    states.append(apply_conversion(edited, 'encode', 'Vigenere', 'key'))
+    history.record(edited, states[-1], 'encode', 'Vigenere', 'key')
+    assert len(history.steps) == 6 and history.size < len(text)
+    for index in range(len(states) - 1, -1, -1):
+        assert history.rebuild(index) == states[index]
+        history.move(index, states[index])
+    assert not history.can_undo() and history.rebuild(6) == states[6]
+    history.move(2, states[2])
+    history.record(states[2], states[1], 'decode', 'Base64')
+    assert not history.can_redo() and history.rebuild(0) == text
+    history.record_edit(text)
+    assert history.index == 4 and history.rebuild(3) == states[1]
+
+    history = ConversionHistory()
+    history.record('', '', 'encode', 'A1Z26')
+    assert history.rebuild(0) == ''
+
+    assert common_prefix('abc', 'abd') == 2
+    assert common_suffix('xabc', 'yabc', 4) == 3
+    assert common_suffix('abc', 'abc', 1) == 1
+    step = make_edit('a' * 100000 + 'b', 'a' * 100000 + 'cc')
+    assert step.key == 100000
+    assert apply_edit('a' * 100000 + 'b', step) == 'a' * 100000 + 'cc'
+
+    history = ConversionHistory(budget=10)
+    history.record(text, 'x', 'hash', 'md5')
+    history.record('x', 'y', 'hash', 'md5')
+    assert history.index == 1 and history.rebuild(0) == 'x'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import mmap
+import codecs
+from array import array
+from collections import OrderedDict
+
+import hashes
+
+
+# offset of every LINE_INDEX_STEP-th line is kept in index
+LINE_INDEX_STEP = 64
+INDEX_CHUNK = 4 * 1024 * 1024
+# longer lines are cut when shown
+MAX_LINE_BYTES = 16 * 1024
+BLOCK_CACHE_SIZE = 256
+TRUNCATED_MARK = ' …'
+
+
+class LineIndex():
+    """Sparse line offsets index of read-only memory-mapped file.
+    Only every step-th line offset is kept, so 2 GB log
+    of 20M lines takes about 2.5 MB of index. File is indexed
+    incrementally by index_step() calls."""
+    def __init__(self, file_name, step=LINE_INDEX_STEP):
+        """Init method.
+
+        Args:
+            file_name: Text string defines filename.
+            step: Integer - lines between kept offsets.
+
+        """
+        self.file_name = file_name
+        self.step = step
+        self.group = re.compile(rb'(?:[^\n]*\n){%d}' % step)
+        self.fp = open(file_name, 'rb')
+        self.size = os.fstat(self.fp.fileno()).st_size
+        self.mapped = None
+        if self.size:
+            self.mapped = mmap.mmap(self.fp.fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+        self.checkpoints = array('Q', [0])
+        # lines after the last checkpoint, known when indexing is done
+        self.tail_lines = 0
+        self.window = INDEX_CHUNK
+        self.done = not self.size
+        self.blocks = OrderedDict()
+
+    def close(self):
+        """Unmap and close file"""
+        self.blocks.clear()
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+        self.fp.close()
+
+    @property
+    def line_count(self):
+        """Lines indexed so far"""
+        return (len(self.checkpoints) - 1) * self.step + self.tail_lines
+
+    @property
+    def progress(self):
+        """Indexed part of file in percents"""
+        if self.done:
+            return 100
+        return self.checkpoints[-1] * 100 // self.size
+
+    def index_step(self, max_bytes=INDEX_CHUNK):
+        """Index next part of file.
+
+        Args:
+            max_bytes: Integer - bytes scanned by one call,
+                       grows for groups of very long lines.
+
+        Returns:
+            Boolean - True if the whole file is indexed.
+
+        """
+        if self.done:
+            return True
+        pos = self.checkpoints[-1]
+        end = min(self.size, pos + max(max_bytes, self.window))
+        ends = [match.end() for match in
+                self.group.finditer(self.mapped, pos, end)]
+        self.checkpoints.extend(ends)
+        if end == self.size:
+            self.tail_lines = self.count_lines(self.checkpoints[-1],
+                                               self.size)
+            self.done = True
+        elif not ends:
+            # step lines do not fit into window
+            self.window = (end - pos) * 2
+        return self.done
+
+    def count_lines(self, start, end):
+        """Count lines between offsets, last line may lack newline"""
+        count = 0
+        while start < end:
+            newline = self.mapped.find(b'\n', start, end)
+            count += 1
+            if newline == -1:
+                break
+            start = newline + 1
+        return count
+
+    def block(self, number):
+        """Decoded lines of number-th step-lines block,
+        recently used blocks are cached"""
+        if number in self.blocks:
+            self.blocks.move_to_end(number)
+            return self.blocks[number]
+        start = self.checkpoints[number]
+        if number + 1 < len(self.checkpoints):
+            end = self.checkpoints[number + 1]
+        else:
+            end = self.size
+        lines = []
+        while start < end and len(lines) < self.step:
+            newline = self.mapped.find(b'\n', start, end)
+            stop = end if newline == -1 else newline + 1
+            line = self.mapped[start:min(stop, start + MAX_LINE_BYTES)]
+            line = line.decode('utf-8', 'replace').rstrip('\r\n')
+            if stop - start > MAX_LINE_BYTES:
+                line += TRUNCATED_MARK
+            lines.append(line)
+            start = stop
+        self.blocks[number] = lines
+        if len(self.blocks) > BLOCK_CACHE_SIZE:
+            self.blocks.popitem(last=False)
+        return lines
+
+    def line(self, number):
+        """Text of number-th line, long lines are cut"""
+        if self.mapped is None or number >= self.line_count:
+            return ''
+        lines = self.block(number // self.step)
+        number %= self.step
+        return lines[number] if number < len(lines) else ''
+
+
+def decode_chunks(chunks):
+    """Decode UTF-8 bytes chunks like memory-mapped file slices,
+    char split between chunks is decoded with the next one.
+
+    Args:
+        chunks: Iterable of bytes-like objects.
+
+    Returns:
+        Generator - text strings.
+
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def main():
+    """minimal funcs testing"""
+    import tempfile
+    lines = [f'line {number} ' + 'я' * (number % 7)
+             for number in range(1000)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = os.path.join(tmp_dir, 'large.txt')
+        with open(file_name, 'w', encoding='utf-8') as fp:
+            fp.write('\n'.join(lines))
+        index = LineIndex(file_name, step=16)
+        while not index.index_step(100):
+            pass
+        assert index.line_count == len(lines)
+        assert all(index.line(number) == line
+                   for number, line in enumerate(lines))
+        with open(file_name, 'rb') as fp:
+            chunks = hashes.iter_file_slices(fp, 7)
+            assert ''.join(decode_chunks(chunks)) == '\n'.join(lines)
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from statistics import quantiles
+from time import perf_counter
+
+from client import AsyncClient, socket_path
+from bench import parse_size
+
+
+REQUESTS = 2000
+CONCURRENCY = 16
+SIZES = ('100', '1K')
+KEYS = {'ROT13': 13, 'Vigenere': 'key'}
+SEED = 42
+# seconds to wait for spawned daemon socket
+SPAWN_TIMEOUT = 10
+LETTERS = 'abcdefghijklmnopqrstuvwxyz абвгдеёжзийклмнопрстуфхцчшщъыьэюя\n'
+
+
+def make_texts(sizes, seed=SEED):
+    """Random text of every size"""
+    rnd = random.Random(seed)
+    return [''.join(rnd.choices(LETTERS, k=parse_size(size)))
+            for size in sizes]
+
+
+async def worker(client, texts, op, algorithm, count, latencies, errors):
+    """Send count requests one after another, record latencies"""
+    key = KEYS.get(algorithm)
+    for index in range(count):
+        started = perf_counter()
+        try:
+            await client.request(op, algorithm, texts[index % len(texts)],
+                                 key if op != 'hash' else None)
+        except Exception as ex:
+            errors.append(ex)
+        latencies.append(perf_counter() - started)
+
+
+async def run(path, texts, op, algorithm, requests, concurrency,
+              connections):
+    """Load daemon by concurrency workers sharing connections.
+
+    Returns:
+        Tuple - latencies list, errors list and wall time in seconds.
+
+    """
+    clients = [await AsyncClient.connect(path) for _ in range(connections)]
+    latencies, errors = [], []
+    started = perf_counter()
+    counts = [requests // concurrency + (index < requests % concurrency)
+              for index in range(concurrency)]
+    await asyncio.gather(*(worker(clients[index % connections], texts, op,
+                                  algorithm, count, latencies, errors)
+                           for index, count in enumerate(counts)))
+    elapsed = perf_counter() - started
+    for client in clients:
+        await client.close()
+    return latencies, errors, elapsed
+
+
+def spawn_daemon(path, jobs=None):
+    """Start local daemon on path and wait for its socket"""
+    args = [sys.executable, os.path.join(os.path.dirname(
+        os.path.abspath(__file__)), 'daemon.py'), '-s', path]
+    if jobs:
+        args += ['-j', str(jobs)]
+    process = subprocess.Popen(args)
+    deadline = time.monotonic() + SPAWN_TIMEOUT
+    while not os.path.exists(path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError('Daemon failed to start')
+        time.sleep(0.05)
+    return process
+
+
+def parse_args(args=None):
+    """Command line arguments parser"""
+    parser = argparse.ArgumentParser(
+        description='Measure conversion daemon latency percentiles.')
+    parser.add_argument('-s', '--socket', default=None,
+                        help='daemon socket path (default: $CRYPTEX_SOCKET '
+                             'or cryptex-UID.sock in temp directory)')
+    parser.add_argument('--spawn', action='store_true',
+                        help='start local daemon on temporary socket')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='spawned daemon worker processes count')
+    parser.add_argument('-m', '--mode', choices=('encode', 'decode', 'hash'),
+                        default='encode')
+    parser.add_argument('-a', '--algorithm', default='ROT13')
+    parser.add_argument('-n', '--requests', type=int, default=REQUESTS)
+    parser.add_argument('-c', '--concurrency', type=int, default=CONCURRENCY,
+                        help='requests in flight')
+    parser.add_argument('--connections', type=int, default=None,
+                        help='connections count (default: concurrency)')
+    parser.add_argument('-z', '--size', action='append', default=None,
+                        help='request text size like 100, 1K or 1M, '
+                             'repeat for size mix '
+                             f'(default: {", ".join(SIZES)})')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Run load test and print latency percentiles"""
+    args = parse_args(args)
+    texts = make_texts(args.size or SIZES)
+    connections = min(args.connections or args.concurrency,
+                      args.concurrency)
+    path = socket_path(args.socket)
+    process = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.spawn:
+            path = os.path.join(tmp_dir, 'cryptex.sock')
+            process = spawn_daemon(path, args.jobs)
+        try:
+            latencies, errors, elapsed = asyncio.run(run(
+                path, texts, args.mode, args.algorithm, args.requests,
+                args.concurrency, connections))
+        finally:
+            if process:
+                process.terminate()
+                process.wait()
+
+    if len(latencies) < 2:
+        print('Not enough requests for percentiles', file=sys.stderr)
+        return 1
+    percentiles = quantiles(latencies, n=100, method='inclusive')
+    print(f'{len(latencies)} requests, {args.concurrency} in flight, '
+          f'{connections} connections, {elapsed:.2f} s, '
+          f'{len(latencies) / elapsed:.0f} req/s')
+    print(f'p50 {percentiles[49] * 1000:.2f} ms, '
+          f'p90 {percentiles[89] * 1000:.2f} ms, '
+          f'p99 {percentiles[98] * 1000:.2f} ms, '
+          f'max {max(latencies) * 1000:.2f} ms')
+    if errors:
+        print(f'{len(errors)} errors, first: {errors[0]}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,29 +4,66 @@
 import sys
 import os
 import hashlib
-from inspect import signature
 import json
 import ctypes
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from time import time, perf_counter
+
+# startup report counts time from here, before Qt is imported
+STARTED = perf_counter()
 
 # from PyQt5 import uic
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QDialog,
-                             QFileDialog, QAction)
+                             QFileDialog, QAction, QInputDialog,
+                             QToolButton, QLabel)
 from PyQt5.QtGui import QKeySequence
-from PyQt5.QtCore import Qt, QSignalMapper, QTranslator
+from PyQt5.QtCore import (Qt, QSignalMapper, QTranslator, QThreadPool,
+                          QTimer)
 
-from misc import (AboutWindow, HelpWindow, TextsDB,
+from misc import (AboutWindow, HelpWindow, HashesWindow, SearchWindow,
+                  LargeFileWindow, PreviewDock, StatusBarSink, TextsDB,
                   CONFIG_FILE, UI_DIR)
+from textsdb import PREVIEW_LENGTH
 from ui.main import Ui_MainWindow
+import binary
 import coders
+import hashes
+import metrics
+from history import ConversionHistory, HISTORY_BUDGET
+from pipeline import Pipeline
+from resultcache import ResultCache, CACHE_DB_FILENAME, MEMORY_BUDGET
+from workers import (ConvertWorker, CachedConvertWorker, FileHashWorker,
+                     MultiHashWorker, BinaryOpenWorker, BinarySaveWorker,
+                     FileConvertWorker, HistoryWorker, RotCrackWorker,
+                     VigenereCrackWorker, VIGENERE_PARALLEL_MIN)
+
+
+DEFAULT_HASH_SET = ('md5', 'sha1', 'sha256', 'sha512', 'blake2b')
+DB_PAGE_SIZE = 50
+# deferred init runs after the first paint or after this delay in ms
+DEFERRED_INIT_DELAY = 500
+STARTUP_REPORT_FLAG = '--startup-report'
+# larger files are opened in read-only large file viewer
+LARGE_FILE_MIN = 16 * 1024 * 1024
 
 
 class MainWindow(QMainWindow, Ui_MainWindow):
     """main window defines here"""
-    def __init__(self):
-        """init ui and connect some callbacks"""
+    def __init__(self, startup=None):
+        """init ui and connect some callbacks,
+        DB and dialogs are created later
+
+        Args:
+            startup: metrics.Stopwatch started at launch.
+
+        """
+        self.startup = startup or metrics.Stopwatch('startup', STARTED)
         super().__init__()
         # uic.loadUi(UI_DIR + '/main.ui', self)
         self.setupUi(self)
+        self.startup.mark('setupUi')
 
         self.trans = QTranslator(self)
         # self.change_lang(UI_DIR + '/eng-ru')
@@ -34,10 +71,18 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
         self.hide_error()
         self.load_params()
+        self.init_metrics()
 
         self.load_langs()
 
-        self.tdb = TextsDB()
+        self.tdb = None
+        # SQLite tier is opened by deferred_init() if enabled
+        self.cache = ResultCache(
+            self.params.get('result_cache_mb', MEMORY_BUDGET >> 20) << 20)
+        self.history = ConversionHistory(
+            self.params.get('history_mb', HISTORY_BUDGET >> 20) << 20)
+        self.painted = False
+        self.deferred = False
 
         self.convert_button.clicked.connect(self.convert)
         self.radio_encode.toggled.connect(self.switch_mode_callback)
@@ -46,19 +91,26 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.coding_selector.currentTextChanged\
             .connect(self.switch_algorithm_callback)
 
+        for error in coders.load_plugins():
+            self.show_error(error['title'], error['text'])
         self.coders_list = coders.CODERS
         self.decoders_list = coders.DECODERS
-        hash_algs = hashlib.algorithms_available
-        self.hashes_list = [str(hs) for hs in sorted(hash_algs)]
+        self.hashes_list = None
 
         self.save_filename = ''
-
-        self.about_dialog = AboutWindow(parent=self)
-        self.menu_about.triggered.connect(self.about_dialog.show)
-
-        self.help_dialog = HelpWindow(parent=self)
+        self.large_window = None
+
+        self.dialogs = {}
+        self.dialog_factories = {
+            'about': lambda: AboutWindow(parent=self),
+            'help': lambda: HelpWindow(parent=self),
+            'hashes': self.make_hashes_dialog,
+            'search': self.make_search_dialog,
+        }
+        self.menu_about.triggered.connect(
+            lambda: self.dialog('about').show())
         self.menu_help.setShortcuts(QKeySequence('Ctrl+H'))
-        self.menu_help.triggered.connect(self.help_dialog.show)
+        self.menu_help.triggered.connect(lambda: self.dialog('help').show())
 
         self.actionNew.setShortcuts(QKeySequence('Ctrl+N'))
         self.actionNew.triggered.connect(self.new_file)
@@ -68,6 +120,27 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.actionSave.triggered.connect(self.save_file)
         self.actionSave_As.setShortcuts(QKeySequence('Ctrl+Shift+S'))
         self.actionSave_As.triggered.connect(lambda e: self.save_file(True))
+        self.actionOpenLarge = QAction('Open large file...', self)
+        self.actionOpenLarge.triggered.connect(self.open_large_file)
+        self.menuFile.insertAction(self.actionDatebase_actions,
+                                   self.actionOpenLarge)
+        self.actionOpenBinary = QAction('Open binary file...', self)
+        self.actionOpenBinary.triggered.connect(self.open_binary)
+        self.menuFile.insertAction(self.actionDatebase_actions,
+                                   self.actionOpenBinary)
+        self.actionSaveBinary = QAction('Save decoded binary...', self)
+        self.actionSaveBinary.triggered.connect(self.save_binary)
+        self.menuFile.insertAction(self.actionDatebase_actions,
+                                   self.actionSaveBinary)
+        self.actionHashFile = QAction('Hash file...', self)
+        self.actionHashFile.triggered.connect(self.hash_file)
+        self.menuFile.insertAction(self.actionDatebase_actions,
+                                   self.actionHashFile)
+        self.actionHashTable = QAction('Hash table...', self)
+        self.actionHashTable.triggered.connect(self.hash_table)
+        self.menuFile.insertAction(self.actionDatebase_actions,
+                                   self.actionHashTable)
+        self.menuFile.insertSeparator(self.actionDatebase_actions)
         self.actionExit.setShortcuts(QKeySequence('Ctrl+Q'))
         self.actionExit.triggered.connect(self.close)
 
@@ -80,13 +153,80 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.actionClear.setShortcuts(QKeySequence('Ctrl+Backspace'))
         self.actionClear.triggered.connect(self.text_field.clear)
 
+        self.actionUndoConversion = QAction('Undo conversion', self)
+        self.actionUndoConversion.setShortcuts(QKeySequence('Ctrl+Alt+Z'))
+        self.actionUndoConversion.triggered.connect(
+            lambda: self.history_move(-1))
+        self.actionRedoConversion = QAction('Redo conversion', self)
+        self.actionRedoConversion.setShortcuts(
+            QKeySequence('Ctrl+Alt+Shift+Z'))
+        self.actionRedoConversion.triggered.connect(
+            lambda: self.history_move(1))
+        self.menuEdit.addSeparator()
+        self.menuEdit.addAction(self.actionUndoConversion)
+        self.menuEdit.addAction(self.actionRedoConversion)
+
+        self.preview = PreviewDock(self.text_field.document(), self)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.preview)
+        self.preview.hide()
+        self.actionPreview = self.preview.toggleViewAction()
+        self.actionPreview.setText('Live preview')
+        self.actionPreview.setShortcuts(QKeySequence('Ctrl+L'))
+        self.menuEdit.addAction(self.actionPreview)
+        for signal in (self.radio_encode.toggled, self.radio_decode.toggled,
+                       self.radio_hash.toggled,
+                       self.coding_selector.currentTextChanged,
+                       self.key_spin.valueChanged,
+                       self.key_field.textChanged):
+            signal.connect(self.update_preview)
+
+        self.actionPipeline = QAction('Convert by pipeline...', self)
+        self.actionPipeline.setShortcuts(QKeySequence('Ctrl+P'))
+        self.actionPipeline.triggered.connect(self.convert_pipeline)
+        self.menuEdit.addSeparator()
+        self.menuEdit.addAction(self.actionPipeline)
+        self.actionRotCrack = QAction('Find ROT shift and decode', self)
+        self.actionRotCrack.setShortcuts(QKeySequence('Ctrl+R'))
+        self.actionRotCrack.triggered.connect(self.rot_crack)
+        self.menuEdit.addAction(self.actionRotCrack)
+        self.actionVigenereCrack = QAction('Find Vigenere key...', self)
+        self.actionVigenereCrack.setShortcuts(QKeySequence('Ctrl+Shift+R'))
+        self.actionVigenereCrack.triggered.connect(self.vigenere_crack)
+        self.menuEdit.addAction(self.actionVigenereCrack)
+        # key lengths evaluation pool, started by the first key search
+        self.crack_pool = None
+
+        self.job = None
+        self.actionCancel = QAction('Cancel conversion', self)
+        self.actionCancel.setShortcuts(QKeySequence('Esc'))
+        self.actionCancel.setEnabled(False)
+        self.actionCancel.triggered.connect(self.cancel_job)
+        self.menuEdit.addAction(self.actionCancel)
+        cancel_button = QToolButton(self)
+        cancel_button.setDefaultAction(self.actionCancel)
+        self.statusbar.addPermanentWidget(cancel_button)
+        self.update_history_actions()
+
         self.actionDBSave.triggered.connect(self.db_save_text)
         self.actionDBLoadLast.triggered.connect(self.db_load_text)
 
+        self.actionDBSearch = QAction('Search saved texts...', self)
+        self.actionDBSearch.setShortcuts(QKeySequence('Ctrl+F'))
+        self.actionDBSearch.triggered.connect(
+            lambda: self.dialog('search').show())
+        self.menuFile.insertAction(self.menuLoad_text.menuAction(),
+                                   self.actionDBSearch)
+        self.db_index_timer = QTimer(self)
+        self.db_index_timer.timeout.connect(self.db_index_step)
+        # DB actions are enabled when DB gets opened by deferred_init()
+        for action in (self.actionDBSave, self.actionDBLoadLast,
+                       self.actionDBSearch, self.menuLoad_text.menuAction()):
+            action.setEnabled(False)
+
         self.window_title = self.windowTitle()
 
         self.update_recent_menu()
-        self.db_update_menu()
+        self.menuLoad_text.aboutToShow.connect(self.db_first_page)
 
         if os.name == 'nt':
             # some Шindows black magic here
@@ -102,6 +242,84 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.radio_decode.setChecked(True)
         else:
             self.radio_hash.setChecked(True)
+        self.update_preview()
+
+        QTimer.singleShot(DEFERRED_INIT_DELAY, self.deferred_init)
+        self.startup.mark('init')
+
+    def hash_algorithms(self):
+        """Sorted hash algorithms names, computed on first use"""
+        if self.hashes_list is None:
+            self.hashes_list = sorted(map(str, hashlib.algorithms_available))
+        return self.hashes_list
+
+    def dialog(self, name):
+        """Return named dialog, dialogs are created on first use.
+        Plain method, not property: setupUi() inspects all attributes.
+
+        Args:
+            name: Text string - dialog_factories key.
+
+        Returns:
+            QDialog.
+
+        """
+        if name not in self.dialogs:
+            self.dialogs[name] = self.dialog_factories[name]()
+        return self.dialogs[name]
+
+    def make_hashes_dialog(self):
+        """Hash table dialog factory"""
+        dialog = HashesWindow(
+            self.hash_algorithms(),
+            self.params.get('hash_set', DEFAULT_HASH_SET), parent=self)
+        dialog.compute_button.clicked.connect(self.hash_table_compute)
+        dialog.compute_button.setEnabled(not self.job)
+        return dialog
+
+    def make_search_dialog(self):
+        """Saved texts search dialog factory"""
+        dialog = SearchWindow(self.tdb, parent=self)
+        dialog.text_selected.connect(self.db_load_text)
+        return dialog
+
+    def paintEvent(self, event):
+        """Record time to first paint and start deferred init"""
+        super().paintEvent(event)
+        if not self.painted:
+            self.painted = True
+            self.startup.mark('first paint')
+            QTimer.singleShot(0, self.deferred_init)
+
+    def deferred_init(self):
+        """Open DB and fill DB menu after window is shown"""
+        if self.deferred:
+            return
+        self.deferred = True
+        self.tdb = TextsDB()
+        if self.params.get('result_cache_db'):
+            self.cache.attach_db(CACHE_DB_FILENAME)
+        self.db_update_menu()
+        for action in (self.actionDBSave, self.actionDBSearch,
+                       self.menuLoad_text.menuAction()):
+            action.setEnabled(True)
+        self.db_index_timer.start(0)
+        self.startup.mark('DB ready')
+        if STARTUP_REPORT_FLAG in QApplication.instance().arguments():
+            print(self.startup.report(), file=sys.stderr)
+        self.startup.flush()
+
+    def init_metrics(self):
+        """Enable instrumentation sinks from CRYPTEX_METRICS environment
+        variable or 'metrics' param, 'status' shows the last
+        measurement in status bar"""
+        spec = os.environ.get(metrics.ENV_VARIABLE,
+                              self.params.get('metrics', ''))
+        for token in metrics.configure(spec):
+            if token == 'status':
+                label = QLabel(self)
+                self.statusbar.addPermanentWidget(label)
+                metrics.add_sink(StatusBarSink(label))
 
     def load_langs(self):
         self.fil_langs_menu([('', 'English'), ('eng-ru', 'Русский'), ('eng-chs', '汉语')])
@@ -122,30 +340,63 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.retranslateUi(self)
 
     def db_update_menu(self):
-        """Update load-text menu with texts list from db"""
+        """Reset load-text menu, texts previews are loaded
+        page by page when menu is shown and scrolled to 'More...'"""
         self.menuLoad_text.clear()
-        clear_DBAction = QAction("Clear items", self)
-        clear_DBAction.triggered.connect(self.db_clear)
-        clear_DBAction.setEnabled(False)
-        self.actionDBLoadLast.setEnabled(False)
-
-        self.db_mapper = QSignalMapper(self)
-
-        for text in self.tdb.get_rows():
-            action_name = text[1]
-            action_id = str(text[0])
-            if len(action_name) >= 15:
-                action_name = action_name[:15] + '...'
-            DBAction = QAction(action_name, self)
-            self.menuLoad_text.addAction(DBAction)
-            self.db_mapper.setMapping(DBAction, action_id)
-            DBAction.triggered.connect(self.db_mapper.map)
-            clear_DBAction.setEnabled(True)
-            self.actionDBLoadLast.setEnabled(True)
-
-        self.db_mapper.mapped['QString'].connect(self.db_load_text)
-        self.menuLoad_text.addSeparator()
-        self.menuLoad_text.addAction(clear_DBAction)
+        self.db_actions = {}
+        self.db_last_id = 0
+        self.db_complete = False
+
+        self.db_more_action = QAction('More...', self)
+        self.db_more_action.hovered.connect(self.db_load_page)
+        self.db_more_action.triggered.connect(self.db_load_page)
+        self.menuLoad_text.addAction(self.db_more_action)
+        self.db_separator = self.menuLoad_text.addSeparator()
+        self.db_clear_action = QAction("Clear items", self)
+        self.db_clear_action.triggered.connect(self.db_clear)
+        self.menuLoad_text.addAction(self.db_clear_action)
+
+        has_rows = bool(self.tdb.get_previews(limit=1))
+        self.db_clear_action.setEnabled(has_rows)
+        self.actionDBLoadLast.setEnabled(has_rows)
+
+    def db_index_step(self):
+        """Idle-time conversion of plain text rows to compact storage
+        and indexing of texts saved before search index existed"""
+        if self.tdb.migrate_step() and self.tdb.index_step():
+            self.db_index_timer.stop()
+
+    def db_first_page(self):
+        """Load first previews page when load-text menu is shown"""
+        if not self.db_actions and not self.db_complete:
+            self.db_load_page()
+
+    def db_load_page(self):
+        """Append next page of texts previews to load-text menu"""
+        if self.db_complete:
+            return
+        rows = self.tdb.get_previews(self.db_last_id, DB_PAGE_SIZE + 1)
+        with metrics.span('widget', 'menuLoad_text.page', len(rows)) as span:
+            for id_, preview, timestamp in rows[:DB_PAGE_SIZE]:
+                self.db_add_action(id_, preview, timestamp)
+                self.db_last_id = id_
+            span.size_out = min(len(rows), DB_PAGE_SIZE)
+        if len(rows) <= DB_PAGE_SIZE:
+            self.db_complete = True
+            self.menuLoad_text.removeAction(self.db_more_action)
+
+    def db_add_action(self, id_, preview, timestamp=None):
+        """Add text preview item to load-text menu"""
+        if len(preview) >= PREVIEW_LENGTH:
+            preview = preview[:PREVIEW_LENGTH] + '...'
+        action = QAction(preview, self)
+        if timestamp:
+            action.setToolTip(datetime.fromtimestamp(timestamp).isoformat())
+        action.triggered.connect(lambda _, id_=id_: self.db_load_text(id_))
+        before = self.db_separator if self.db_complete \
+            else self.db_more_action
+        self.menuLoad_text.insertAction(before, action)
+        self.db_actions[id_] = action
 
     def db_clear(self, event):
         """Clear db and update load-text menu"""
@@ -158,13 +409,18 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             text = self.tdb.get_row(int(event))
         else:
             text = self.tdb.get_row()
-        self.text_field.setPlainText(text)
+        if text is not None:
+            self.set_text(text)
 
     def db_save_text(self, event):
-        """Save text into db as new record"""
-        text = self.text_field.toPlainText()
-        self.tdb.add_row(text)
-        self.db_update_menu()
+        """Save text into db as new record
+        and add it to load-text menu if all pages are loaded"""
+        text = self.get_text()
+        id_ = self.tdb.add_row(text)
+        if self.db_complete:
+            self.db_add_action(id_, text[:PREVIEW_LENGTH], int(time()))
+        self.db_clear_action.setEnabled(True)
+        self.actionDBLoadLast.setEnabled(True)
 
     def clear_recent(self, event):
         """Reset recent files dictionary"""
@@ -199,12 +455,15 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         """Reset previously opened/saved filename and cleans text_field"""
         self.save_filename = ''
         self.text_field.clear()
+        self.history.reset()
+        self.update_history_actions()
         self.setWindowTitle(self.window_title)
 
     def open_file(self, file_name=None):
         """Open file function.
         Show file selection dialog if file_name not set,
-        reads file and place file content to text area
+        reads file and place file content to text area,
+        files larger than LARGE_FILE_MIN go to large file viewer
 
         Args:
             file_name: Text string defines filename to open.
@@ -217,13 +476,21 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             file_name = QFileDialog.getOpenFileName(self,
                                                     'Open file',
                                                     dir_path)[0]
+        if file_name and os.path.isfile(file_name) and \
+           os.path.getsize(file_name) > LARGE_FILE_MIN:
+            self.open_large_file(file_name)
+            return
         if file_name:
             self.save_filename = file_name
             self.params['save_dir'] = os.path.dirname(
                 os.path.abspath(self.save_filename))
             try:
-                text = open(self.save_filename, 'r').read()
-                self.text_field.setPlainText(text)
+                with metrics.span('file', 'open_file') as span:
+                    text = open(self.save_filename, 'r').read()
+                    span.size_out = len(text)
+                self.set_text(text)
+                self.history.reset()
+                self.update_history_actions()
                 self.setWindowTitle(self.window_title + ': ' +
                                     self.save_filename)
 
@@ -261,22 +528,132 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         basename = os.path.basename(self.save_filename)
         self.params['recent_files'][basename] = self.save_filename
         self.update_recent_menu()
-        text = self.text_field.toPlainText()
+        text = self.get_text()
         try:
-            open(self.save_filename, 'w').write(text)
+            with metrics.span('file', 'save_file', len(text)) as span:
+                span.size_out = open(self.save_filename, 'w').write(text)
             self.setWindowTitle(self.window_title + ': ' +
                                 self.save_filename)
         except Exception as ex:
             self.show_error(ex.__class__.__name__, str(ex))
 
+    def open_large_file(self, file_name=None):
+        """Open file in read-only large file viewer.
+        File is memory-mapped and never loaded into text area,
+        viewer convert button converts the whole file into new one.
+
+        Args:
+            file_name: Text string defines filename to open.
+
+        """
+        dir_path = self.params.get('save_dir', os.path.abspath(os.getcwd()))
+        if not file_name:
+            file_name = QFileDialog.getOpenFileName(self, 'Open large file',
+                                                    dir_path)[0]
+        if not file_name:
+            return
+        self.params['save_dir'] = os.path.dirname(os.path.abspath(file_name))
+        if self.large_window:
+            self.large_window.close()
+            self.large_window.deleteLater()
+        try:
+            self.large_window = LargeFileWindow(file_name, parent=self)
+        except Exception as ex:
+            self.large_window = None
+            self.show_error(ex.__class__.__name__, str(ex))
+            return
+        self.large_window.convert_button.clicked.connect(
+            self.convert_large_file)
+        self.large_window.convert_button.setEnabled(not self.job)
+        self.large_window.show()
+
+    def convert_large_file(self):
+        """Large file viewer convert button callback.
+        Whole file is converted by streaming job with selected
+        mode and algorithm, result goes to new file,
+        in hash mode hexdigest is placed to text area"""
+        file_name = self.large_window.file_name
+        self.hide_error()
+        algorithm = self.coding_selector.currentText()
+        if self.radio_hash.isChecked():
+            self.start_job(FileHashWorker(file_name, algorithm),
+                           f'{algorithm}: {file_name}')
+            return
+        mode = 'encoded' if self.radio_encode.isChecked() else 'decoded'
+        out_name = QFileDialog.getSaveFileName(
+            self, f'Save {mode} file ({algorithm})',
+            f'{file_name}.{mode}')[0]
+        if out_name:
+            if os.path.abspath(out_name) == os.path.abspath(file_name):
+                self.show_error('ValueError',
+                                'Result file must differ from source file')
+                return
+            self.start_job(FileConvertWorker(file_name, self.converter(),
+                                             out_name),
+                           f'Saved: {out_name}',
+                           on_done=lambda result: None)
+
+    def select_binary_codec(self, title):
+        """Ask for binary codec name, returns None if cancelled"""
+        names = list(binary.CODECS)
+        last = self.params.get('last_binary')
+        algorithm, ok = QInputDialog.getItem(
+            self, title, 'Encoding:', names,
+            names.index(last) if last in names else 0, False)
+        if not ok:
+            return None
+        self.params['last_binary'] = algorithm
+        return algorithm
+
+    def open_binary(self):
+        """Open binary file action callback.
+        File is read by memory-mapped slices and its encoded
+        content is placed to text area"""
+        algorithm = self.select_binary_codec('Open binary file')
+        if not algorithm:
+            return
+        dir_path = self.params.get('save_dir', os.path.abspath(os.getcwd()))
+        file_name = QFileDialog.getOpenFileName(
+            self, f'Open binary file ({algorithm})', dir_path)[0]
+        if file_name:
+            self.params['save_dir'] = os.path.dirname(
+                os.path.abspath(file_name))
+            self.hide_error()
+            self.start_job(BinaryOpenWorker(file_name, algorithm),
+                           f'{algorithm}: {file_name}')
+
+    def save_binary(self):
+        """Save decoded binary action callback.
+        Text area content is decoded to bytes and written to file"""
+        algorithm = self.select_binary_codec('Save decoded binary')
+        if not algorithm:
+            return
+        dir_path = self.params.get('save_dir', os.path.abspath(os.getcwd()))
+        file_name = QFileDialog.getSaveFileName(
+            self, f'Save decoded binary ({algorithm})', dir_path)[0]
+        if file_name:
+            self.hide_error()
+            self.start_job(BinarySaveWorker(self.get_text(),
+                                            algorithm, file_name),
+                           f'Saved: {file_name}',
+                           on_done=lambda result: None)
+
     def closeEvent(self, event):
         """close child forms and save self form dimensions
         and some another params
 
         """
-        self.about_dialog.close()
-        self.help_dialog.close()
+        if self.job:
+            self.job.cancel()
+        if self.crack_pool:
+            self.crack_pool.shutdown(wait=False, cancel_futures=True)
+        for dialog in self.dialogs.values():
+            dialog.close()
+        if self.large_window:
+            self.large_window.close()
+        self.cache.close()
         self.save_params()
+        metrics.shutdown()
 
     def save_params(self):
         """serialize params dict and write to pretty .json file"""
@@ -335,7 +712,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             elif coders.is_key(event) == coders.KEY_TEXT:
                 self.show_key_field()
 
-        elif event in self.hashes_list:
+        elif self.radio_hash.isChecked() and \
+                event in self.hash_algorithms():
             self.params['last_hash'] = event
 
     def get_md(self, string, algorithm):
@@ -351,15 +729,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             Text string - hash-function hexdigest.
 
         """
-        hash_obj = hashlib.new(algorithm, string.encode('utf-8'))
-        try:
-            sig = signature(hash_obj.hexdigest).parameters
-        except ValueError:
-            sig = ()
-        if len(sig) == 0:
-            return hash_obj.hexdigest()
-        else:
-            return hash_obj.hexdigest(1024)
+        return hashes.get_md(string, algorithm)
 
     def encode(self, string, algorithm, key=None):
         """Process text through selected by drop-down menu encoding function
@@ -401,11 +771,81 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         select method by checked radiobutton and drop-down menu
         than process text through selected function.
 
-        Gets text string and place processed text from/to text_field
+        Gets text string from text_field and starts background job,
+        processed text is placed to text_field when job finishes
 
         """
         self.hide_error()
-        key_type = coders.is_key(self.coding_selector.currentText())
+        text = self.get_text()
+        job = CachedConvertWorker(text, self.converter(),
+                                  self.cache, *self.conversion())
+        self.start_job(job, on_done=lambda result:
+                       self.convert_done(job, text, result))
+
+    def convert_done(self, job, text, result):
+        """Place conversion result to text area and record it
+        to conversion history"""
+        self.set_converted(text, result, *job.conversion)
+        if job.cached:
+            self.statusbar.showMessage('Cached result')
+
+    def set_converted(self, text, result, op, algorithm, key=None):
+        """Place conversion result to text area.
+
+        Args:
+            text: Text string - conversion input.
+            result: Text string - conversion result.
+            op: Text string - 'encode', 'decode', 'hash' or 'pipeline'.
+            algorithm: Text string - algorithm or pipeline recipe.
+            key: Text string or integer - algorithm key,
+                 decode flag for pipeline.
+
+        """
+        self.set_text(result)
+        self.history.record(text, result, op, algorithm, key)
+        self.update_history_actions()
+
+    def history_move(self, offset):
+        """Undo/redo conversion actions callback,
+        state text is rebuilt by background job"""
+        text = self.get_text()
+        if self.history.text is not None and text != self.history.text:
+            # text was edited after conversion, undo drops the edit
+            self.history.record_edit(text)
+        index = self.history.index + offset
+        if not 0 <= index <= len(self.history.steps):
+            self.update_history_actions()
+            return
+        label = self.history.label(min(index, self.history.index))
+        message = ('Undone: ' if offset < 0 else 'Redone: ') + label
+        self.hide_error()
+        self.start_job(HistoryWorker(self.history, index), message,
+                       on_done=lambda text: self.history_moved(index, text))
+
+    def history_moved(self, index, text):
+        """Place rebuilt state text to text area"""
+        self.history.move(index, text)
+        self.set_text(text)
+        self.update_history_actions()
+
+    def update_history_actions(self):
+        """Enable undo/redo conversion actions by history state"""
+        self.actionUndoConversion.setEnabled(self.job is None and
+                                             self.history.can_undo())
+        self.actionRedoConversion.setEnabled(self.job is None and
+                                             self.history.can_redo())
+
+    def conversion(self):
+        """Selected conversion.
+
+        Returns:
+            Text string - 'encode', 'decode' or 'hash'.
+            Text string - algorithm.
+            Text string, integer or None - algorithm key.
+
+        """
+        algorithm = self.coding_selector.currentText()
+        key_type = coders.is_key(algorithm)
         key = None
         if key_type == coders.KEY_DECIMAL:
             key = self.key_spin.value()
@@ -413,23 +853,243 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             key = self.key_field.text()
 
         if self.radio_encode.isChecked():
-            text = self.encode(self.text_field.toPlainText(),
-                               self.coding_selector.currentText(),
-                               key)
-
+            op = 'encode'
         elif self.radio_decode.isChecked():
-            text = self.decode(self.text_field.toPlainText(),
-                               self.coding_selector.currentText(),
-                               key)
-
+            op = 'decode'
         elif self.radio_hash.isChecked():
-            text = self.get_md(self.text_field.toPlainText(),
-                               self.coding_selector.currentText())
-
+            op = 'hash'
         else:
             raise ZeroDivisionError('Oh shi~')
+        return op, algorithm, key
+
+    def converter(self):
+        """Streaming conversion selected by checked radiobutton,
+        drop-down menu and key fields.
+
+        Returns:
+            Callable - takes iterable of text chunks,
+            returns iterable of converted chunks.
+
+        """
+        op, algorithm, key = self.conversion()
+
+        if op == 'encode':
+            def convert(chunks):
+                return coders.encode_stream(chunks, algorithm, key)
+
+        elif op == 'decode':
+            def convert(chunks):
+                return coders.decode_stream(chunks, algorithm, key)
+
+        else:
+            def convert(chunks):
+                chunks = (chunk.encode('utf-8') for chunk in chunks)
+                return (hashes.get_md_stream(chunks, algorithm),)
+
+        return convert
+
+    def update_preview(self):
+        """Pass selected conversion to preview dock"""
+        if self.coding_selector.currentText():
+            self.preview.set_conversion(*self.conversion())
+
+    def convert_pipeline(self):
+        """Convert text by several codecs in one pass.
+        Asks for recipe like 'ROT13:3 | Base64 | URL',
+        in decode mode recipe runs backwards with inverted steps.
+
+        """
+        recipe, ok = QInputDialog.getText(
+            self, 'Pipeline', 'Steps (Name:key | ~Name for decoding):',
+            text=self.params.get('last_pipeline', ''))
+        if not ok:
+            return
+        self.params['last_pipeline'] = recipe
+        self.hide_error()
+        try:
+            pipeline = Pipeline.from_recipe(
+                recipe, decode=self.radio_decode.isChecked())
+        except Exception as ex:
+            self.show_error(ex.__class__.__name__, str(ex))
+            return
+
+        message = ''
+        if pipeline.fusions:
+            message = 'Fused: ' + '; '.join(pipeline.fusions)
+        text = self.get_text()
+        decode = self.radio_decode.isChecked()
+        self.start_job(ConvertWorker(text, pipeline.run_stream), message,
+                       on_done=lambda result: self.set_converted(
+                           text, result, 'pipeline', recipe, decode))
+
+    def rot_crack(self):
+        """Decode ROT text with unknown shift.
+        Shifts are ranked by letter frequencies, text is decoded
+        by the best one and ROT13 decoding with found key is selected.
+
+        """
+        self.hide_error()
+        text = self.get_text()
+        self.start_job(RotCrackWorker(text),
+                       on_done=lambda result: self.rot_crack_done(text,
+                                                                  result))
+
+    def rot_crack_done(self, source, result):
+        """Show text decoded by the best shift and shifts confidence"""
+        ranked, text = result
+        best = ranked[0]
+        self.radio_decode.setChecked(True)
+        self.coding_selector.setCurrentText('ROT13')
+        self.key_spin.setMaximum(max(self.key_spin.maximum(), best.shift))
+        self.key_spin.setValue(best.shift)
+        self.set_converted(source, text, 'decode', 'ROT13', best.shift)
+        others = ', '.join(f'{score.shift} ({score.confidence:.1%})'
+                           for score in ranked[1:])
+        self.statusbar.showMessage(f'ROT shift {best.shift}, confidence '
+                                   f'{best.confidence:.1%}; next: {others}')
+
+    def vigenere_crack(self):
+        """Find Vigenere keys of text encoded with unknown key,
+        selected key candidate is used for decoding"""
+        self.hide_error()
+        text = self.get_text()
+        if self.crack_pool is None and len(text) >= VIGENERE_PARALLEL_MIN:
+            # forking process running Qt threads is unsafe
+            self.crack_pool = ProcessPoolExecutor(
+                mp_context=multiprocessing.get_context('spawn'))
+        self.start_job(VigenereCrackWorker(text, executor=self.crack_pool),
+                       on_done=self.vigenere_crack_done)
+
+    def vigenere_crack_done(self, ranked):
+        """Ask for one of key candidates and decode text by it"""
+        items = [f'{candidate.key}  ({candidate.score:.3f})  '
+                 f'{" ".join(candidate.preview.split())}'
+                 for candidate in ranked]
+        item, ok = QInputDialog.getItem(self, 'Vigenere keys',
+                                        'Key (score) and preview:',
+                                        items, 0, False)
+        if not ok:
+            return
+        self.radio_decode.setChecked(True)
+        self.coding_selector.setCurrentText('Vigenere')
+        self.key_field.setText(ranked[items.index(item)].key)
+        self.convert()
+
+    def hash_file(self):
+        """Hash file action callback.
+        File is hashed by memory-mapped slices without loading
+        into text_field, hexdigest is placed into text_field.
+        Uses selected hash algorithm in hash mode or the last used one.
+
+        """
+        algorithm = self.params.get('last_hash', hashes.DEFAULT_HASH)
+        if self.radio_hash.isChecked():
+            algorithm = self.coding_selector.currentText()
+        dir_path = self.params.get('save_dir', os.path.abspath(os.getcwd()))
+        file_name = QFileDialog.getOpenFileName(self,
+                                                f'Hash file ({algorithm})',
+                                                dir_path)[0]
+        if file_name:
+            self.hide_error()
+            self.start_job(FileHashWorker(file_name, algorithm),
+                           f'{algorithm}: {file_name}')
+
+    def hash_table(self):
+        """Hash table action callback, shows hashes dialog"""
+        self.dialog('hashes').show()
+        self.dialog('hashes').raise_()
+
+    def hash_table_compute(self):
+        """Hash text_field content by all checked algorithms in one pass
+        and fill hashes dialog with digests"""
+        algorithms = self.dialog('hashes').checked()
+        self.params['hash_set'] = algorithms
+        self.hide_error()
+        self.start_job(MultiHashWorker(self.get_text(),
+                                       algorithms),
+                       on_done=lambda result:
+                           self.dialog('hashes').show_digests(*result))
 
-        self.text_field.setPlainText(text)
+    def start_job(self, job, message='', on_done=None):
+        """Run conversion job on thread pool.
+
+        Args:
+            job: ConvertWorker instance.
+            message: Text string shown in status bar when job is done.
+            on_done: Callable - takes job result,
+                     by default result replaces text_field content.
+
+        """
+        if self.job:
+            return
+        self.job = job
+        self.job.signals.progress.connect(self.job_progress)
+        self.job.signals.finished.connect(
+            lambda error, result: self.job_finished(error, result,
+                                                    message, on_done))
+        self.convert_button.setEnabled(False)
+        self.actionPipeline.setEnabled(False)
+        self.actionRotCrack.setEnabled(False)
+        self.actionVigenereCrack.setEnabled(False)
+        self.actionUndoConversion.setEnabled(False)
+        self.actionRedoConversion.setEnabled(False)
+        self.actionHashFile.setEnabled(False)
+        self.actionOpenBinary.setEnabled(False)
+        self.actionSaveBinary.setEnabled(False)
+        if self.large_window:
+            self.large_window.convert_button.setEnabled(False)
+        if 'hashes' in self.dialogs:
+            self.dialogs['hashes'].compute_button.setEnabled(False)
+        self.actionCancel.setEnabled(True)
+        QThreadPool.globalInstance().start(self.job)
+
+    def cancel_job(self):
+        """Cancel action callback, job stops between chunks"""
+        if self.job:
+            self.job.cancel()
+            self.statusbar.showMessage('Cancelling...')
+
+    def job_progress(self, percent):
+        """Show running job progress in status bar"""
+        self.statusbar.showMessage(f'Converting... {percent}%')
+
+    def job_finished(self, error, result, message='', on_done=None):
+        """Apply job result and unlock controls"""
+        self.job = None
+        self.convert_button.setEnabled(True)
+        self.actionPipeline.setEnabled(True)
+        self.actionRotCrack.setEnabled(True)
+        self.actionVigenereCrack.setEnabled(True)
+        self.update_history_actions()
+        self.actionHashFile.setEnabled(True)
+        self.actionOpenBinary.setEnabled(True)
+        self.actionSaveBinary.setEnabled(True)
+        if self.large_window:
+            self.large_window.convert_button.setEnabled(True)
+        if 'hashes' in self.dialogs:
+            self.dialogs['hashes'].compute_button.setEnabled(True)
+        self.actionCancel.setEnabled(False)
+        if error:
+            self.statusbar.clearMessage()
+            self.show_error(error['title'], error['text'])
+            return
+        self.statusbar.showMessage(message)
+        if on_done:
+            on_done(result)
+        else:
+            self.set_text(result)
+
+    def get_text(self):
+        """Return text_field content"""
+        with metrics.span('widget', 'text_field.toPlainText') as span:
+            text = self.text_field.toPlainText()
+            span.size_out = len(text)
+        return text
+
+    def set_text(self, text):
+        """Replace text_field content"""
+        with metrics.span('widget', 'text_field.setPlainText', len(text)):
+            self.text_field.setPlainText(text)
 
     def show_key_spin(self):
         """Show numeric key field"""
@@ -454,18 +1114,20 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.key_field.hide()
 
     def set_drop_down_coders(self):
-        """Fill drop-down menu with coders methods"""
+        """Fill drop-down menu with coders methods from codecs registry"""
+        self.coders_list = coders.CODERS
         index = 0
-        if 'last_coder' in self.params:
+        if self.params.get('last_coder') in self.coders_list:
             index = self.coders_list.index(self.params['last_coder'])
         self.coding_selector.clear()
         self.coding_selector.addItems(self.coders_list)
         self.coding_selector.setCurrentIndex(index)
 
     def set_drop_down_decoders(self):
-        """Fill drop-down menu with decoders methods"""
+        """Fill drop-down menu with decoders methods from codecs registry"""
+        self.decoders_list = coders.DECODERS
         index = 0
-        if 'last_decoder' in self.params:
+        if self.params.get('last_decoder') in self.decoders_list:
             index = self.decoders_list.index(self.params['last_decoder'])
         self.coding_selector.clear()
         self.coding_selector.addItems(self.decoders_list)
@@ -475,9 +1137,9 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         """Fill drop-down menu with hash algorithms"""
         index = 0
         if 'last_hash' in self.params:
-            index = self.hashes_list.index(self.params['last_hash'])
+            index = self.hash_algorithms().index(self.params['last_hash'])
         self.coding_selector.clear()
-        self.coding_selector.addItems(self.hashes_list)
+        self.coding_selector.addItems(self.hash_algorithms())
         self.coding_selector.setCurrentIndex(index)
 
     def hide_error(self):
@@ -0,0 +1,416 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import threading
+import tracemalloc
+from collections import namedtuple
+from time import perf_counter, time
+
+
+ENV_VARIABLE = 'CRYPTEX_METRICS'
+SPEC_SEPARATOR = ','
+PROMETHEUS_PREFIX = 'cryptex'
+# min seconds between Prometheus textfile rewrites
+PROMETHEUS_INTERVAL = 5.0
+
+# kind - 'codec', 'hash', 'db', 'file' or 'widget',
+# size_in/size_out - chars for text, bytes for binary data, rows for db,
+# peak_memory - tracemalloc peak in bytes or None if not traced,
+# error - exception class name or None.
+Measurement = namedtuple('Measurement', ('kind', 'name', 'seconds',
+                                         'size_in', 'size_out',
+                                         'peak_memory', 'error',
+                                         'timestamp'))
+
+# instrumentation is disabled while there are no sinks
+SINKS = []
+TRACE_MEMORY = False
+# spans tracing memory, tracemalloc peak is carried into them
+# before every reset_peak(), so nested spans keep outer peaks
+TRACED_SPANS = []
+TRACE_LOCK = threading.Lock()
+
+
+class NullSpan():
+    """Span used when instrumentation is disabled, does nothing.
+    Shared instance, so sizes assigned by callers are dropped."""
+    __slots__ = ()
+    size_in = 0
+    size_out = 0
+
+    def __setattr__(self, name, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span():
+    """Timed section, measurement is sent to sinks on exit.
+    Set size_out inside with block to record output size."""
+    def __init__(self, kind, name, size_in=0):
+        self.kind = kind
+        self.name = name
+        self.size_in = size_in
+        self.size_out = 0
+        self.started = None
+        self.peak = None
+
+    def __enter__(self):
+        if TRACE_MEMORY:
+            with TRACE_LOCK:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                peak = tracemalloc.get_traced_memory()[1]
+                for span in TRACED_SPANS:
+                    span.peak = max(span.peak, peak)
+                tracemalloc.reset_peak()
+                self.peak = 0
+                TRACED_SPANS.append(self)
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.finish(exc_type.__name__ if exc_type else None)
+        return False
+
+    def finish(self, error=None):
+        """Send measurement to all sinks"""
+        seconds = perf_counter() - self.started
+        peak = None
+        if self.peak is not None:
+            with TRACE_LOCK:
+                if tracemalloc.is_tracing():
+                    peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+                TRACED_SPANS.remove(self)
+        emit(Measurement(self.kind, self.name, seconds, self.size_in,
+                         self.size_out, peak, error, time()))
+
+
+def span(kind, name, size_in=0):
+    """Context manager timing a section:
+
+        with metrics.span('codec', 'ROT13.encode', len(text)) as span:
+            text = rot13(text)
+            span.size_out = len(text)
+
+    Returns shared no-op span while instrumentation is disabled."""
+    if not SINKS:
+        return NULL_SPAN
+    return Span(kind, name, size_in)
+
+
+def call(kind, name, op, func, data, *args):
+    """Call func(data, *args) timing it and recording data and result
+    lengths, name and op are joined only while instrumentation is on.
+
+    Args:
+        kind: Text string - measurement kind.
+        name: Text string - measurement name.
+        op: Text string - operation, measurement name suffix.
+        func: Callable to time.
+        data: First func argument, sized object.
+
+    Returns:
+        func return value.
+
+    """
+    if not SINKS:
+        return func(data, *args)
+    with Span(kind, f'{name}.{op}', len(data)) as span:
+        result = func(data, *args)
+        span.size_out = len(result)
+    return result
+
+
+def stream(kind, name, chunks, convert):
+    """Time streaming conversion from the first chunk to the last one.
+
+    Args:
+        kind: Text string - measurement kind.
+        name: Text string - measurement name.
+        chunks: Iterable of source chunks.
+        convert: Callable - takes chunks, returns iterable
+                 of converted chunks.
+
+    Returns:
+        Iterable - converted chunks, convert(chunks) itself
+                   while instrumentation is disabled.
+
+    """
+    if not SINKS:
+        return convert(chunks)
+    return stream_span(Span(kind, name), chunks, convert)
+
+
+def stream_span(span, chunks, convert):
+    """Generator counting chunks sizes on both sides of convert"""
+    def count(chunks):
+        for chunk in chunks:
+            span.size_in += len(chunk)
+            yield chunk
+
+    with span:
+        for chunk in convert(count(chunks)):
+            span.size_out += len(chunk)
+            yield chunk
+
+
+class Stopwatch():
+    """Named checkpoints timed from one start point,
+    like 'first paint' of application startup"""
+    def __init__(self, kind, started=None):
+        """Init method.
+
+        Args:
+            kind: Text string - measurement kind of checkpoints.
+            started: Float - perf_counter() value of start point.
+
+        """
+        self.kind = kind
+        self.started = perf_counter() if started is None else started
+        self.marks = []
+
+    def mark(self, name):
+        """Record checkpoint, returns seconds since start"""
+        elapsed = perf_counter() - self.started
+        self.marks.append((name, elapsed))
+        return elapsed
+
+    def report(self):
+        """Text table of checkpoints with time since start
+        and since previous checkpoint"""
+        lines = [f'{self.kind} timing:']
+        previous = 0
+        for name, elapsed in self.marks:
+            lines.append(f'  {name:<16} {elapsed * 1000:9.1f} ms '
+                         f'(+{(elapsed - previous) * 1000:.1f} ms)')
+            previous = elapsed
+        return '\n'.join(lines)
+
+    def flush(self):
+        """Send recorded checkpoints to sinks as measurements,
+        checkpoints are kept until sinks get configured"""
+        if not SINKS:
+            return
+        for name, elapsed in self.marks:
+            emit(Measurement(self.kind, name, elapsed, 0, 0,
+                             None, None, time()))
+        self.marks = []
+
+
+def emit(measurement):
+    """Send measurement to all sinks, sink errors are ignored
+    so instrumentation never breaks the measured code"""
+    for sink in SINKS:
+        try:
+            sink.write(measurement)
+        except Exception:
+            pass
+
+
+class JsonLinesSink():
+    """Appends measurements to file as JSON lines"""
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.lock = threading.Lock()
+        self.fp = open(file_name, 'a', encoding='utf-8')
+
+    def write(self, measurement):
+        """Append measurement line"""
+        line = json.dumps(measurement._asdict(), ensure_ascii=False)
+        with self.lock:
+            self.fp.write(line + '\n')
+            self.fp.flush()
+
+    def close(self):
+        """Close log file"""
+        with self.lock:
+            self.fp.close()
+
+
+class PrometheusSink():
+    """Aggregates measurements into counters and rewrites
+    Prometheus node_exporter textfile at most every interval seconds"""
+    COUNTERS = (('calls_total', 'Instrumented calls count.'),
+                ('errors_total', 'Instrumented calls raised exception.'),
+                ('seconds_total', 'Wall time spent in calls.'),
+                ('size_in_total', 'Input size: chars, bytes or rows.'),
+                ('size_out_total', 'Output size: chars, bytes or rows.'))
+
+    def __init__(self, file_name, prefix=PROMETHEUS_PREFIX,
+                 interval=PROMETHEUS_INTERVAL):
+        self.file_name = file_name
+        self.prefix = prefix
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.peaks = {}
+        self.written = 0
+
+    def write(self, measurement):
+        """Add measurement to counters"""
+        labels = (measurement.kind, measurement.name)
+        with self.lock:
+            counters = self.counters.setdefault(labels, [0, 0, 0.0, 0, 0])
+            counters[0] += 1
+            counters[1] += measurement.error is not None
+            counters[2] += measurement.seconds
+            counters[3] += measurement.size_in
+            counters[4] += measurement.size_out
+            if measurement.peak_memory is not None:
+                self.peaks[labels] = max(self.peaks.get(labels, 0),
+                                         measurement.peak_memory)
+            if time() - self.written >= self.interval:
+                self.flush()
+
+    def flush(self):
+        """Write textfile atomically, must be called under lock"""
+        lines = []
+        for index, (name, help_text) in enumerate(self.COUNTERS):
+            metric = f'{self.prefix}_{name}'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} counter')
+            for (kind, label), counters in sorted(self.counters.items()):
+                lines.append(f'{metric}{{kind="{kind}",'
+                             f'name="{escape_label(label)}"}} '
+                             f'{counters[index]}')
+        if self.peaks:
+            metric = f'{self.prefix}_peak_memory_bytes'
+            lines.append(f'# HELP {metric} Max tracemalloc peak of a call.')
+            lines.append(f'# TYPE {metric} gauge')
+            for (kind, label), peak in sorted(self.peaks.items()):
+                lines.append(f'{metric}{{kind="{kind}",'
+                             f'name="{escape_label(label)}"}} {peak}')
+        tmp_name = self.file_name + '.tmp'
+        with open(tmp_name, 'w', encoding='utf-8') as fp:
+            fp.write('\n'.join(lines) + '\n')
+        os.replace(tmp_name, self.file_name)
+        self.written = time()
+
+    def close(self):
+        """Write final counters"""
+        with self.lock:
+            self.flush()
+
+
+def escape_label(value):
+    """Escape Prometheus label value"""
+    return value.replace('\\', '\\\\').replace('"', '\\"') \
+                .replace('\n', '\\n')
+
+
+def summary(measurement):
+    """One-line text description of measurement"""
+    text = (f'{measurement.name}: {measurement.seconds * 1000:.1f} ms, '
+            f'{measurement.size_in} -> {measurement.size_out}')
+    if measurement.seconds and measurement.size_in:
+        speed = measurement.size_in / measurement.seconds / 2 ** 20
+        text += f' ({speed:.2f} M/s)'
+    if measurement.peak_memory is not None:
+        text += f', peak {measurement.peak_memory / 2 ** 20:.2f} MiB'
+    if measurement.error:
+        text += f', {measurement.error}'
+    return text
+
+
+def add_sink(sink):
+    """Enable instrumentation by adding sink"""
+    SINKS.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    """Remove and close sink, instrumentation is disabled
+    with the last sink removed"""
+    SINKS.remove(sink)
+    if hasattr(sink, 'close'):
+        sink.close()
+
+
+def configure(spec=None):
+    """Add sinks described by spec like
+    'jsonl:metrics.jsonl,prom:cryptex.prom,memory'.
+    'memory' token enables tracemalloc peaks, unknown tokens
+    are returned so callers (GUI) may handle their own sinks.
+
+    Args:
+        spec: Text string, CRYPTEX_METRICS environment variable by default.
+
+    Returns:
+        List - unhandled spec tokens.
+
+    """
+    global TRACE_MEMORY
+    if spec is None:
+        spec = os.environ.get(ENV_VARIABLE, '')
+    unknown = []
+    for token in spec.split(SPEC_SEPARATOR):
+        token = token.strip()
+        kind, _, arg = token.partition(':')
+        if not token:
+            continue
+        if kind == 'jsonl':
+            add_sink(JsonLinesSink(arg or 'metrics.jsonl'))
+        elif kind == 'prom':
+            add_sink(PrometheusSink(arg or 'cryptex.prom'))
+        elif kind == 'memory':
+            TRACE_MEMORY = True
+        else:
+            unknown.append(token)
+    return unknown
+
+
+def shutdown():
+    """Remove all sinks, flushing aggregated ones"""
+    global TRACE_MEMORY
+    for sink in list(SINKS):
+        remove_sink(sink)
+    if TRACE_MEMORY and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    TRACE_MEMORY = False
+
+
+def reset():
+    """Drop sinks without closing them,
+    used in forked worker processes owning no sinks"""
+    global TRACE_MEMORY
+    SINKS.clear()
+    TRACE_MEMORY = False
+
+
+def main():
+    """minimal funcs testing"""
+    NULL_SPAN.size_in += 100
+    assert NULL_SPAN.size_in == 0
+
+    class ListSink():
+        def __init__(self):
+            self.items = []
+
+        def write(self, measurement):
+            self.items.append(measurement)
+
+    sink = ListSink()
+    add_sink(sink)
+    configure('memory')
+    with span('test', 'outer'):
+        data = bytearray(4 * 2 ** 20)
+        del data
+        with span('test', 'inner'):
+            pass
+    inner, outer = sink.items
+    assert outer.peak_memory >= 4 * 2 ** 20 > inner.peak_memory
+    shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,34 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import sqlite3
-from time import time
-
 # from PyQt5 import uic
-from PyQt5.QtWidgets import QDialog
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout,
+                             QTableWidget, QTableWidgetItem, QHeaderView,
+                             QPushButton, QLineEdit, QListWidget,
+                             QListWidgetItem, QListView, QLabel,
+                             QDockWidget, QPlainTextEdit)
+from PyQt5.QtGui import QFontDatabase, QTextCursor
+from PyQt5.QtCore import (Qt, QObject, QTimer, QAbstractListModel,
+                          QModelIndex, pyqtSignal)
 
 from ui.help import Ui_help_dialog
 from ui.about import Ui_about_dialog
+from textsdb import TextsDB, DB_FILENAME
+from largefile import LineIndex
+from history import apply_conversion
+import preview
+import metrics
 
 CONFIG_FILE = 'config.json'
 UI_DIR = 'ui'
-DB_FILENAME = 'saved_texts.sqlite'
+SEARCH_DELAY = 250
+SEARCH_HIGHLIGHT = ('«', '»')
+# interval between large file indexing steps in ms
+LARGE_INDEX_INTERVAL = 0
+# not incremental conversions are previewed after typing pause in ms
+PREVIEW_DELAY = 300
+# and for texts up to PREVIEW_FULL_MAX chars
+PREVIEW_FULL_MAX = 1024 * 1024
 
 
 class AboutWindow(QDialog, Ui_about_dialog):
@@ -54,72 +69,303 @@ class HelpWindow(QDialog, Ui_help_dialog):
             pass
 
 
-class TextsDB():
-    """DB-interaction class"""
-    def __init__(self, db_filename=DB_FILENAME):
+class HashesWindow(QDialog):
+    """Dialog with table of hash algorithms and their digests,
+    algorithms are selected by check boxes"""
+    def __init__(self, algorithms, checked=(), parent=None):
+        super().__init__(parent=parent)
+        self.setWindowTitle('Hashes')
+        self.setWindowFlags(
+            self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.resize(640, 480)
+
+        self.table = QTableWidget(len(algorithms), 2, self)
+        self.table.setHorizontalHeaderLabels(('Algorithm', 'Digest'))
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(
+            1, QHeaderView.Stretch)
+        for row, algorithm in enumerate(algorithms):
+            item = QTableWidgetItem(algorithm)
+            item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if algorithm in checked
+                               else Qt.Unchecked)
+            self.table.setItem(row, 0, item)
+            self.table.setItem(row, 1, QTableWidgetItem(''))
+
+        self.compute_button = QPushButton('Compute', self)
+        self.close_button = QPushButton('Close', self)
+        self.close_button.clicked.connect(self.close)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        buttons.addWidget(self.compute_button)
+        buttons.addWidget(self.close_button)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+
+    def checked(self):
+        """Returns list of checked algorithms"""
+        return [self.table.item(row, 0).text()
+                for row in range(self.table.rowCount())
+                if self.table.item(row, 0).checkState() == Qt.Checked]
+
+    def show_digests(self, errors, digests):
+        """Fill digest column with hexdigests or error titles"""
+        for row in range(self.table.rowCount()):
+            algorithm = self.table.item(row, 0).text()
+            item = self.table.item(row, 1)
+            if algorithm in digests:
+                item.setText(digests[algorithm])
+                item.setToolTip('')
+            elif algorithm in errors:
+                item.setText(errors[algorithm]['title'])
+                item.setToolTip(errors[algorithm]['text'])
+            else:
+                item.setText('')
+                item.setToolTip('')
+
+
+class SearchWindow(QDialog):
+    """Saved texts full-text search dialog,
+    query runs when user stops typing for SEARCH_DELAY ms"""
+    text_selected = pyqtSignal(int)
+
+    def __init__(self, tdb, parent=None):
+        super().__init__(parent=parent)
+        self.tdb = tdb
+        self.setWindowTitle('Search saved texts')
+        self.setWindowFlags(
+            self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.resize(480, 360)
+
+        self.search_field = QLineEdit(self)
+        self.search_field.setPlaceholderText('Search...')
+        self.results = QListWidget(self)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.search_field)
+        layout.addWidget(self.results)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(SEARCH_DELAY)
+        self.timer.timeout.connect(self.search)
+        self.search_field.textChanged.connect(self.timer.start)
+        self.results.itemActivated.connect(
+            lambda item: self.text_selected.emit(item.data(Qt.UserRole)))
+
+    def search(self):
+        """Fill results list with ranked matches snippets"""
+        self.results.clear()
+        for id_, snippet, timestamp in \
+                self.tdb.search(self.search_field.text(), highlight=SEARCH_HIGHLIGHT):
+            item = QListWidgetItem(' '.join(snippet.split()))
+            item.setData(Qt.UserRole, id_)
+            self.results.addItem(item)
+
+
+class StatusBarSink(QObject):
+    """Metrics sink showing the last measurement summary in label.
+    Measurements come from worker threads too,
+    so label is updated by queued signal."""
+    measured = pyqtSignal(str)
+
+    def __init__(self, label):
         """Init method.
-        Opens or create file-based db with required table 'texts'"""
-        self.db_filename = db_filename
-        self.table_name = 'texts'
-        self.conn = sqlite3.connect(db_filename)
-        self.cur = self.conn.cursor()
-        self.init_db()
-
-    def __del__(self):
-        """Explicit is better than implicit"""
-        self.conn.close()
-
-    def init_db(self):
-        """Creates 'texts' table with 3 fields:
-        id - autoincremented primary key;
-        text - user texts storage field;
-        timestamp - timestamp of saved text"""
-        sql = f'''CREATE TABLE IF NOT EXISTS `{self.table_name}` (
-                    `id` INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT UNIQUE,
-                    `text` TEXT,
-                    `timestamp` INTEGER
-                  )'''
-        self.cur.execute(sql)
-        self.conn.commit()
-
-    def add_row(self, text, timestamp=None):
-        """Inserts new user-text into table"""
-        if not timestamp or not isinstance(timestamp, int):
-            timestamp = int(time())
-
-        sql = f'''INSERT INTO `{self.table_name}`(`text`,`timestamp`)
-                            VALUES (?, ?);'''
-        self.cur.execute(sql, (text, timestamp))
-        self.conn.commit()
-        return self.cur.lastrowid
-
-    def get_row(self, id_=None):
-        """Returns id-defined text from table
-        or last text if id not specified"""
-        if not id_:
-            sql = f'''SELECT `text` FROM `{self.table_name}`
-                                    ORDER BY `id` DESC LIMIT 1'''
-            res = self.cur.execute(sql).fetchone()
-        else:
-            sql = f'''SELECT `text` FROM `{self.table_name}` WHERE `id` = ?;'''
-            res = self.cur.execute(sql, (id_,)).fetchone()
-
-        return res[0]
-
-    def get_rows(self):
-        """Returns list of (id, text)-tuples with all texts from table"""
-        sql = f'''SELECT `id`, `text` FROM `{self.table_name}`;'''
-        res = self.cur.execute(sql).fetchall()
-        return res
-
-    def delete_row(self, id_):
-        """Deletes id-specified text from table"""
-        sql = f'''DELETE FROM `{self.table_name}` WHERE `id` = ?;'''
-        self.cur.execute(sql, (id_,))
-        self.conn.commit()
-
-    def clear_db(self):
-        """Like DROP TABLE but more gentle"""
-        sql = f'DELETE FROM `{self.table_name}`'
-        self.cur.execute(sql)
-        self.conn.commit()
+
+        Args:
+            label: QLabel showing summaries, usually status bar widget.
+
+        """
+        super().__init__()
+        self.label = label
+        self.measured.connect(self.show_summary)
+
+    def write(self, measurement):
+        """Metrics sink interface, may run in any thread"""
+        self.measured.emit(metrics.summary(measurement))
+
+    def show_summary(self, text):
+        """Show summary, full text is kept in tooltip"""
+        self.label.setText(text if len(text) < 80 else text[:77] + '...')
+        self.label.setToolTip(text)
+
+
+class LargeFileModel(QAbstractListModel):
+    """List model over LineIndex, view asks for visible rows only.
+    Rows are appended as file indexing goes on."""
+    def __init__(self, lines, parent=None):
+        super().__init__(parent)
+        self.lines = lines
+        self.rows = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.rows
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.lines.line(index.row())
+        return None
+
+    def update_rows(self):
+        """Append rows indexed since the last call"""
+        count = self.lines.line_count
+        if count > self.rows:
+            self.beginInsertRows(QModelIndex(), self.rows, count - 1)
+            self.rows = count
+            self.endInsertRows()
+
+
+class LargeFileWindow(QDialog):
+    """Read-only viewer of memory-mapped file.
+    Lines are indexed by timer steps and only visible lines
+    are decoded, so file size is limited by address space only.
+    Conversion is done by main window through convert_button."""
+    def __init__(self, file_name, parent=None):
+        super().__init__(parent=parent)
+        self.file_name = file_name
+        self.setWindowTitle(f'Large file: {file_name}')
+        self.setWindowFlags(
+            self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.resize(800, 600)
+
+        self.lines = LineIndex(file_name)
+        self.model = LargeFileModel(self.lines, self)
+        self.view = QListView(self)
+        self.view.setUniformItemSizes(True)
+        self.view.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.view.setModel(self.model)
+        self.status_label = QLabel(self)
+        self.convert_button = QPushButton('Convert to file...', self)
+        self.close_button = QPushButton('Close', self)
+        self.close_button.clicked.connect(self.close)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.status_label)
+        buttons.addStretch()
+        buttons.addWidget(self.convert_button)
+        buttons.addWidget(self.close_button)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.view)
+        layout.addLayout(buttons)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.index_step)
+        self.timer.start(LARGE_INDEX_INTERVAL)
+        self.index_step()
+
+    def index_step(self):
+        """Index next part of file and show new rows"""
+        done = self.lines.index_step()
+        self.model.update_rows()
+        self.status_label.setText(f'{self.lines.line_count} lines, '
+                                  f'{self.lines.progress}% indexed')
+        if done:
+            self.timer.stop()
+
+    def closeEvent(self, event):
+        """Stop indexing and unmap file"""
+        self.timer.stop()
+        self.lines.close()
+        super().closeEvent(event)
+
+
+class PreviewDock(QDockWidget):
+    """Live conversion preview of text document.
+    Document edits are converted by preview.IncrementalConverter
+    and applied to the preview as converted span edits,
+    other conversions run on the whole text after typing pause."""
+    def __init__(self, document, parent=None):
+        super().__init__('Preview', parent)
+        self.document = document
+        self.output = QPlainTextEdit(self)
+        self.output.setReadOnly(True)
+        self.output.setUndoRedoEnabled(False)
+        self.setWidget(self.output)
+        self.conversion = None
+        self.converter = None
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(PREVIEW_DELAY)
+        self.timer.timeout.connect(self.refresh)
+        self.document.contentsChange.connect(self.contents_change)
+        self.visibilityChanged.connect(
+            lambda visible: visible and self.refresh())
+
+    def set_conversion(self, op, algorithm, key=None):
+        """Change previewed conversion, see history.apply_conversion()"""
+        self.conversion = (op, algorithm, key)
+        self.converter = None
+        try:
+            self.converter = preview.make_converter(op, algorithm, key)
+        except Exception:
+            # bad key, refresh() shows conversion error
+            pass
+        if self.isVisible():
+            self.refresh()
+
+    def source_text(self, cursor=None):
+        """Document text or cursor selection as plain text"""
+        if cursor is None:
+            return self.document.toPlainText()
+        return cursor.selectedText().replace('\u2029', '\n')\
+            .replace('\u2028', '\n').replace('\xa0', ' ')
+
+    def refresh(self):
+        """Convert the whole document"""
+        self.timer.stop()
+        if self.conversion is None:
+            return
+        text = self.source_text()
+        try:
+            if self.converter:
+                result = self.converter.reset(text)
+            elif len(text) > PREVIEW_FULL_MAX:
+                raise ValueError(f'Text is too large for {self.conversion[1]}'
+                                 ' preview')
+            else:
+                result = apply_conversion(text, *self.conversion)
+        except Exception as ex:
+            self.show_error(ex.__class__.__name__, str(ex))
+            return
+        self.output.setPlaceholderText('')
+        self.output.setPlainText(result)
+
+    def contents_change(self, position, removed, added):
+        """Document contentsChange callback, converts edited span"""
+        if not self.isVisible() or self.conversion is None:
+            return
+        if self.converter is None or self.timer.isActive():
+            self.timer.start()
+            return
+        # positions are UTF-16 code units, reported span may include
+        # final paragraph separator, so changed count is taken from length
+        length = self.document.characterCount() - 1
+        units = self.converter.source.total_units()
+        removed = min(removed, units - position)
+        added = length - units + removed
+        if removed < 0 or added < 0:
+            self.refresh()
+            return
+        cursor = QTextCursor(self.document)
+        cursor.setPosition(position)
+        cursor.setPosition(position + added, QTextCursor.KeepAnchor)
+        try:
+            with metrics.span('preview', f'{self.conversion[1]}.update',
+                              added):
+                start, count, text = self.converter.update_units(
+                    position, removed, self.source_text(cursor))
+        except Exception:
+            # converter state is unknown, convert the whole text
+            self.timer.start()
+            return
+        cursor = QTextCursor(self.output.document())
+        cursor.setPosition(start)
+        cursor.setPosition(start + count, QTextCursor.KeepAnchor)
+        cursor.insertText(text)
+
+    def show_error(self, error_title, error_text):
+        """Clear preview and show conversion error in it"""
+        self.output.clear()
+        self.output.setPlaceholderText(f'{error_title}: {error_text}')
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+from math import lcm
+
+import coders
+
+
+# codecs for which decode(encode(text)) gives text back
+CANCELLABLE = ('ROT13', 'Vigenere', 'A1Z26', 'A1Z26 compact',
+               'Base64', 'URL', 'Base64 URL-safe', 'Base32', 'Base85')
+# max length of merged Vigenere key schedule
+VIGENERE_FUSE_MAX = 4096
+# shift of ROT13 step without key
+ROT_DEFAULT_SHIFT = 13
+RECIPE_SEPARATOR = '|'
+RECIPE_DECODE = '~'
+
+# kind - 'encode', 'decode', 'rot' (arg is shift)
+#        or 'vigenere' (arg is key schedule)
+Step = namedtuple('Step', ('kind', 'algorithm', 'arg'))
+
+
+def normalize(mode, algorithm, key=None):
+    """Convert (mode, algorithm, key) step to fusable Step"""
+    if algorithm == 'ROT13':
+        if key is None:
+            key = ROT_DEFAULT_SHIFT
+        try:
+            shift = int(key)
+        except (TypeError, ValueError):
+            raise ValueError(f'ROT13 key must be integer, got {key!r}') \
+                from None
+        return Step('rot', algorithm, shift if mode == 'encode' else -shift)
+    if algorithm == 'Vigenere':
+        shifts = coders.vigenere_key_shifts(key or '', mode != 'encode')
+        if shifts:
+            return Step('vigenere', algorithm, shifts)
+    return Step(mode, algorithm, key)
+
+
+def fuse_pair(first, second):
+    """Try to fuse two adjacent steps.
+
+    Args:
+        first: Step.
+        second: Step running right after first.
+
+    Returns:
+        None - if steps can not be fused,
+        else tuple of fused steps (empty if steps cancel each other)
+        and text string describing fusion.
+
+    """
+    if first.kind == second.kind == 'rot':
+        shift = first.arg + second.arg
+        if shift % coders.ROT_PERIOD == 0:
+            return (), f'ROT13 {first.arg:+d}, {second.arg:+d} -> identity'
+        return ((Step('rot', 'ROT13', shift),),
+                f'ROT13 {first.arg:+d}, {second.arg:+d} -> {shift:+d}')
+
+    if first.kind == second.kind == 'vigenere':
+        len_key = lcm(len(first.arg), len(second.arg))
+        if len_key > VIGENERE_FUSE_MAX:
+            return None
+        shifts = tuple(first.arg[i % len(first.arg)] +
+                       second.arg[i % len(second.arg)]
+                       for i in range(len_key))
+        if all(shift % coders.ROT_PERIOD == 0 for shift in shifts):
+            return (), 'Vigenere, Vigenere -> identity'
+        return ((Step('vigenere', 'Vigenere', shifts),),
+                f'Vigenere, Vigenere -> Vigenere ({len_key} shifts)')
+
+    if (first.kind, second.kind) == ('encode', 'decode') and \
+       first.algorithm == second.algorithm and first.arg == second.arg and \
+       first.algorithm in CANCELLABLE:
+        return (), f'{first.algorithm} encode, decode -> identity'
+
+    return None
+
+
+class Pipeline():
+    """Ordered list of codec steps running in one pass"""
+    def __init__(self, steps, fuse=True):
+        """Init method.
+
+        Args:
+            steps: Iterable of (mode, algorithm, key) tuples,
+                   mode is 'encode' or 'decode'.
+            fuse: Boolean - fuse adjacent steps before running.
+
+        """
+        self.fusions = []
+        self.steps = [normalize(*step) for step in steps]
+        if fuse:
+            self.fuse()
+
+    @classmethod
+    def from_recipe(cls, recipe, decode=False, fuse=True):
+        """Build pipeline from text recipe like 'ROT13:3 | Base64 | ~URL'.
+        Step is algorithm name with optional ':key',
+        '~' prefix marks decoding step.
+        With decode=True the whole recipe is reverted:
+        steps run backwards with inverted modes.
+
+        """
+        steps = []
+        for token in recipe.split(RECIPE_SEPARATOR):
+            token = token.strip()
+            if not token:
+                continue
+            mode = 'encode'
+            if token.startswith(RECIPE_DECODE):
+                mode = 'decode'
+                token = token[len(RECIPE_DECODE):].strip()
+            algorithm, _, key = token.partition(':')
+            if algorithm not in coders.REGISTRY:
+                raise KeyError(f'Unknown algorithm {algorithm!r}')
+            steps.append((mode, algorithm, key or None))
+        if decode:
+            steps = [('decode' if mode == 'encode' else 'encode',
+                      algorithm, key)
+                     for mode, algorithm, key in reversed(steps)]
+        return cls(steps, fuse)
+
+    def fuse(self):
+        """Fuse adjacent steps, fusion descriptions are saved
+        into self.fusions list"""
+        stack = []
+        for step in self.steps:
+            pending = [step]
+            while pending:
+                step = pending.pop()
+                fused = fuse_pair(stack[-1], step) if stack else None
+                if fused is None:
+                    stack.append(step)
+                else:
+                    stack.pop()
+                    pending.extend(fused[0])
+                    self.fusions.append(fused[1])
+        self.steps = stack
+
+    def run(self, text):
+        """Process text through all steps.
+
+        Args:
+            text: Text string for conversion.
+
+        Returns:
+            Error - None if conversion is ok,
+                    else dictionary with error title and error text.
+            Text string - converted text,
+                          result of last successful step on error.
+
+        """
+        for step in self.steps:
+            if step.kind == 'encode':
+                error, text = coders.encode(text, step.algorithm, step.arg)
+            elif step.kind == 'decode':
+                error, text = coders.decode(text, step.algorithm, step.arg)
+            else:
+                error = None
+                try:
+                    if step.kind == 'rot':
+                        text = coders.rot13(text, step.arg)
+                    else:
+                        text = coders.vigenere_batch_transform(text,
+                                                               step.arg)
+                except Exception as ex:
+                    error = {'title': ex.__class__.__name__,
+                             'text': str(ex)}
+            if error:
+                return error, text
+        return None, text
+
+    def run_stream(self, chunks):
+        """Streaming version of run(), exceptions are raised to the caller.
+
+        Args:
+            chunks: Iterable of text strings.
+
+        Returns:
+            Iterator - converted text chunks.
+
+        """
+        for step in self.steps:
+            if step.kind == 'rot':
+                chunks = coders.rot13_stream(chunks, step.arg)
+            elif step.kind == 'vigenere':
+                chunks = coders.vigenere_shifts_stream(chunks, step.arg)
+            elif step.kind == 'encode':
+                chunks = coders.encode_stream(chunks, step.algorithm,
+                                              step.arg)
+            else:
+                chunks = coders.decode_stream(chunks, step.algorithm,
+                                              step.arg)
+        return iter(chunks)
+
+
+def main():
+    """minimal funcs testing"""
+    pipeline = Pipeline.from_recipe('ROT13 | Base64')
+    assert pipeline.run('Hello')[1] == coders.encode(
+        coders.rot13('Hello'), 'Base64')[1]
+    try:
+        Pipeline.from_recipe('ROT13:x')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('bad ROT13 key accepted')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,481 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import base64 as b64
+import urllib.parse
+
+import coders
+
+
+# source text is indexed by blocks of about PREVIEW_BLOCK chars,
+# edited block is re-measured, blocks are split when twice larger
+PREVIEW_BLOCK = 4096
+
+
+class PrefixSums():
+    """Fenwick tree of non-negative integers: value update,
+    prefix sum and prefix search in O(log n)"""
+    def __init__(self, values):
+        """Init method, builds tree in O(n).
+
+        Args:
+            values: List of integers.
+
+        """
+        self.tree = [0] + values
+        for index in range(1, len(self.tree)):
+            parent = index + (index & -index)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[index]
+
+    def add(self, index, delta):
+        """Add delta to value by index"""
+        index += 1
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, count):
+        """Sum of first count values"""
+        total = 0
+        while count:
+            total += self.tree[count]
+            count -= count & -count
+        return total
+
+    def search(self, value):
+        """Max count of first values with sum not greater than value.
+
+        Returns:
+            Integer - values count.
+            Integer - their sum.
+
+        """
+        count, total = 0, 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            if count + step < len(self.tree) and \
+               total + self.tree[count + step] <= value:
+                count += step
+                total += self.tree[count]
+            step >>= 1
+        return count, total
+
+
+def utf16_length(text):
+    """Length of text in UTF-16 code units, QTextDocument positions
+    count chars outside Basic Multilingual Plane twice"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+class BlockText():
+    """Text kept as list of blocks of about PREVIEW_BLOCK chars.
+    Block lengths, UTF-16 lengths and optional additive measure
+    (letters, bytes, converted length) are kept in PrefixSums,
+    so edit touches one block and measure of prefix is O(log n)
+    lookup plus measuring part of one block."""
+    def __init__(self, text='', measure=None, block=PREVIEW_BLOCK):
+        """Init method.
+
+        Args:
+            text: Text string.
+            measure: Callable - takes text string, returns integer,
+                     measure of concatenation is sum of measures.
+            block: Integer - block length.
+
+        """
+        self.measure = measure or len
+        self.block = block
+        self.build(self.split(text))
+
+    def split(self, text):
+        """Cut text into blocks"""
+        return [text[offset:offset + self.block]
+                for offset in range(0, len(text), self.block)]
+
+    def build(self, blocks):
+        """Measure blocks and build their prefix sums"""
+        self.blocks = blocks or ['']
+        self.lengths = list(map(len, self.blocks))
+        self.units_lengths = list(map(utf16_length, self.blocks))
+        self.measures = list(map(self.measure, self.blocks))
+        self.index()
+
+    def index(self):
+        """Rebuild prefix sums of measured blocks, O(blocks count)"""
+        self.starts = PrefixSums(list(self.lengths))
+        self.units = PrefixSums(list(self.units_lengths))
+        self.sums = PrefixSums(list(self.measures))
+
+    def __len__(self):
+        return self.starts.prefix(len(self.blocks))
+
+    def __str__(self):
+        return ''.join(self.blocks)
+
+    def total(self):
+        """Measure of the whole text"""
+        return self.sums.prefix(len(self.blocks))
+
+    def total_units(self):
+        """UTF-16 length of the whole text"""
+        return self.units.prefix(len(self.blocks))
+
+    def locate(self, offset):
+        """Block containing offset, last block for text end.
+
+        Returns:
+            Integer - block index.
+            Integer - block start offset.
+
+        """
+        index, start = self.starts.search(offset)
+        if index >= len(self.blocks):
+            index = len(self.blocks) - 1
+            start = self.starts.prefix(index)
+        return index, start
+
+    def prefix(self, offset):
+        """Measure of text[:offset]"""
+        index, start = self.locate(offset)
+        return self.sums.prefix(index) + \
+            self.measure(self.blocks[index][:offset - start])
+
+    def offset(self, units):
+        """Char offset of UTF-16 code units offset"""
+        index, before = self.units.search(units)
+        if index >= len(self.blocks):
+            index = len(self.blocks) - 1
+            before = self.units.prefix(index)
+        block = self.blocks[index]
+        units -= before
+        low, high = 0, min(units, len(block))
+        if utf16_length(block) != len(block):
+            while low < high:
+                middle = (low + high + 1) // 2
+                if utf16_length(block[:middle]) <= units:
+                    low = middle
+                else:
+                    high = middle - 1
+        else:
+            low = high
+        return self.starts.prefix(index) + low
+
+    def slice(self, start, end):
+        """Text of [start, end) span"""
+        index, offset = self.locate(start)
+        parts = []
+        while offset < end and index < len(self.blocks):
+            block = self.blocks[index]
+            parts.append(block[max(start - offset, 0):end - offset])
+            offset += len(block)
+            index += 1
+        return ''.join(parts)
+
+    def replace(self, position, removed, added):
+        """Replace removed chars at position by added text,
+        only blocks touched by the edit are measured again"""
+        first, start = self.locate(position)
+        last = self.locate(position + removed - 1)[0] if removed else first
+        region = ''.join(self.blocks[first:last + 1])
+        region = region[:position - start] + added + \
+            region[position + removed - start:]
+        if first == last and len(region) <= 2 * self.block:
+            values = (len(region), utf16_length(region),
+                      self.measure(region))
+            for sums, lengths, value in zip(
+                    (self.starts, self.units, self.sums),
+                    (self.lengths, self.units_lengths, self.measures),
+                    values):
+                sums.add(first, value - lengths[first])
+                lengths[first] = value
+            self.blocks[first] = region
+            return
+        blocks = self.split(region) or ['']
+        self.blocks[first:last + 1] = blocks
+        self.lengths[first:last + 1] = map(len, blocks)
+        self.units_lengths[first:last + 1] = map(utf16_length, blocks)
+        self.measures[first:last + 1] = map(self.measure, blocks)
+        self.index()
+
+
+class IncrementalConverter():
+    """Conversion of source text updated by source edits,
+    source is BlockText with measure of measure() method.
+    Subclasses define convert(text) converting the whole text and
+    update(position, removed, added) applying source edit: removed
+    chars at position are replaced by added text, converted edited
+    span is returned as (start, count, text) edit of converted text."""
+    # converted char has the same UTF-16 length as source one,
+    # else converted text is ASCII
+    same_layout = False
+
+    def __init__(self):
+        self.source = BlockText('', self.measure)
+
+    @staticmethod
+    def measure(text):
+        """Additive measure indexed by source"""
+        return len(text)
+
+    def reset(self, text):
+        """Set source text, returns converted text"""
+        self.source = BlockText(text, self.measure)
+        return self.convert(text)
+
+    def update_units(self, position, removed, added):
+        """update() with positions in UTF-16 code units
+        like QTextDocument ones, for source and converted text"""
+        start = self.source.offset(position)
+        end = self.source.offset(position + removed)
+        units = self.source.total_units()
+        out_start, count, text = self.update(start, end - start, added)
+        if not self.same_layout:
+            return out_start, count, text
+        # same layout converters replace edited span or text tail
+        out_end = position + removed if out_start + count == end \
+            else units
+        return position, out_end - position, text
+
+
+class RotConverter(IncrementalConverter):
+    """ROT encoding or decoding, char by char"""
+    same_layout = True
+
+    def __init__(self, shift):
+        super().__init__()
+        self.shift = shift
+
+    def convert(self, text):
+        return coders.rot13(text, self.shift)
+
+    def update(self, position, removed, added):
+        self.source.replace(position, removed, added)
+        return position, removed, self.convert(added)
+
+
+class VigenereConverter(IncrementalConverter):
+    """Vigenere encoding or decoding. Key phase of edited span
+    is looked up by letters count index, text after the span
+    is converted again only if letters count changed
+    by not a multiple of key length."""
+    same_layout = True
+    measure = staticmethod(coders.vigenere_letters_count)
+
+    def __init__(self, shifts):
+        """Init method.
+
+        Args:
+            shifts: Tuple from coders.vigenere_key_shifts().
+
+        """
+        super().__init__()
+        self.shifts = shifts
+
+    def convert(self, text, phase=0):
+        return coders.vigenere_batch_transform(text, self.shifts, phase)
+
+    def update(self, position, removed, added):
+        period = len(self.shifts) or 1
+        phase = self.source.prefix(position) % period
+        delta = self.measure(added) - \
+            self.measure(self.source.slice(position, position + removed))
+        length = len(self.source)
+        self.source.replace(position, removed, added)
+        if delta % period:
+            return position, length - position, self.convert(
+                self.source.slice(position, len(self.source)), phase)
+        return position, removed, self.convert(added, phase)
+
+
+class UrlEncoder(IncrementalConverter):
+    """URL encoding, every char is quoted separately, position
+    of converted char is looked up by converted length index"""
+    @staticmethod
+    def measure(text):
+        """Length of converted text"""
+        return len(urllib.parse.quote(text))
+
+    def convert(self, text):
+        return urllib.parse.quote(text)
+
+    def update(self, position, removed, added):
+        start = self.source.prefix(position)
+        end = self.source.prefix(position + removed)
+        self.source.replace(position, removed, added)
+        return start, end - start, self.convert(added)
+
+
+class A1Z26Encoder(UrlEncoder):
+    """A1Z26 encoding. Index measures every char as its number
+    followed by separator, the last separator is not in output."""
+    @staticmethod
+    def measure(text):
+        return len(coders.a1z26_encode(text)) + 1 if text else 0
+
+    def convert(self, text):
+        return coders.a1z26_encode(text)
+
+    def update(self, position, removed, added):
+        length = len(self.source)
+        total = self.source.total()
+        start, end, converted = super().update(position, removed, added)
+        end += start
+        if converted:
+            converted += '-'
+        if position + removed < length:
+            return start, end - start, converted
+        # edit reaches text end, so does its trailing separator
+        if converted and position == length and position:
+            return total - 1, 0, '-' + converted[:-1]
+        if converted:
+            return start, max(total - 1, 0) - start, converted[:-1]
+        start = max(start - 1, 0)
+        return start, max(total - 1, 0) - start, ''
+
+
+class Base64Encoder(IncrementalConverter):
+    """Base64 encoding of UTF-8 text by 3-byte groups. Edited groups
+    are encoded again, groups after them too if bytes count changed
+    by not a multiple of 3. Byte offsets are looked up by index."""
+    @staticmethod
+    def measure(text):
+        """UTF-8 bytes count"""
+        return len(text.encode('utf-8'))
+
+    def convert(self, text):
+        return coders.base64_encode(text)
+
+    def update(self, position, removed, added):
+        begin = self.source.prefix(position)
+        end = self.source.prefix(position + removed)
+        total = self.source.total()
+        delta = self.measure(added) - (end - begin)
+        group = begin - begin % 3
+        if delta % 3:
+            old_end = total
+        else:
+            old_end = min(end + -end % 3, total)
+        # 3-byte groups may start or end inside 2 chars around edit
+        first = max(position - 2, 0)
+        first_byte = begin - self.measure(self.source.slice(first,
+                                                            position))
+        self.source.replace(position, removed, added)
+        last = position + len(added) + 2 if not delta % 3 \
+            else len(self.source)
+        data = self.source.slice(first, last).encode('utf-8')[
+            group - first_byte:old_end + delta - first_byte]
+        return group // 3 * 4, (old_end + 2) // 3 * 4 - group // 3 * 4, \
+            b64.b64encode(data).decode('utf-8')
+
+
+def make_converter(op, algorithm, key=None):
+    """IncrementalConverter for conversion.
+
+    Args:
+        op: Text string - 'encode', 'decode' or 'hash'.
+        algorithm: Text string defines algorithm.
+        key: Text string or integer - algorithm key.
+
+    Returns:
+        IncrementalConverter instance or None if conversion
+        has no incremental version.
+
+    """
+    if op == 'encode' or op == 'decode':
+        if algorithm == 'ROT13':
+            return RotConverter(int(key) if op == 'encode' else -int(key))
+        if algorithm == 'Vigenere':
+            return VigenereConverter(
+                coders.vigenere_key_shifts(key, op == 'decode'))
+    if op == 'encode':
+        if algorithm == 'URL':
+            return UrlEncoder()
+        if algorithm == 'A1Z26':
+            return A1Z26Encoder()
+        if algorithm == 'Base64':
+            return Base64Encoder()
+    return None
+
+
+def main():
+    """minimal funcs testing"""
+    import random
+    rnd = random.Random(0)
+    letters = 'abc XYZ,\nабвЯё€😀'
+    sums = PrefixSums([3, 0, 2, 5])
+    assert sums.prefix(3) == 5 and sums.search(5) == (3, 5)
+    sums.add(1, 1)
+    assert sums.search(3) == (1, 3) and sums.search(4) == (2, 4)
+
+    text = ''.join(rnd.choices(letters, k=100))
+    source = BlockText(text, coders.vigenere_letters_count, block=8)
+    for _ in range(300):
+        position = rnd.randint(0, len(text))
+        removed = min(rnd.choice((0, 1, 20)), len(text) - position)
+        added = ''.join(rnd.choices(letters, k=rnd.choice((0, 1, 20))))
+        text = text[:position] + added + text[position + removed:]
+        source.replace(position, removed, added)
+        offset = rnd.randint(0, len(text))
+        assert source.prefix(offset) == \
+            coders.vigenere_letters_count(text[:offset])
+        assert source.slice(offset, offset + 10) == text[offset:offset + 10]
+        units = utf16_length(text[:offset])
+        assert source.offset(units) == offset
+        assert str(source) == text and len(source) == len(text)
+        assert source.total_units() == utf16_length(text)
+
+    for op, algorithm, key in (('encode', 'ROT13', 5),
+                               ('decode', 'Vigenere', 'ключ'),
+                               ('encode', 'Vigenere', 'key'),
+                               ('encode', 'URL', None),
+                               ('encode', 'A1Z26', None),
+                               ('encode', 'Base64', None)):
+        converter = make_converter(op, algorithm, key)
+        text = ''.join(rnd.choices(letters, k=300))
+        output = converter.reset(text)
+        for _ in range(300):
+            position = rnd.randint(0, len(text))
+            removed = rnd.choice((0, 0, 1, 2, 5))
+            removed = min(removed, len(text) - position)
+            added = ''.join(rnd.choices(letters, k=rnd.choice((0, 1, 3))))
+            if rnd.random() < 0.02:
+                position, removed = 0, len(text)
+            text = text[:position] + added + text[position + removed:]
+            start, count, converted = converter.update(position, removed,
+                                                       added)
+            output = output[:start] + converted + output[start + count:]
+            assert output == getattr(coders, op)(text, algorithm, key)[1], \
+                (algorithm, position, removed, added)
+        assert str(converter.source) == text
+
+    # QTextDocument positions count emoji as 2 UTF-16 code units
+    for op, algorithm, key in (('encode', 'ROT13', 5),
+                               ('encode', 'Vigenere', 'key'),
+                               ('encode', 'A1Z26', None),
+                               ('encode', 'Base64', None)):
+        converter = make_converter(op, algorithm, key)
+        text = 'ab😀cd'
+        output = converter.reset(text).encode('utf-16-le')
+        for _ in range(200):
+            units = utf16_length(text)
+            index = rnd.randint(0, len(text))
+            count = min(rnd.choice((0, 1, 2)), len(text) - index)
+            position = utf16_length(text[:index])
+            removed = utf16_length(text[index:index + count])
+            added = ''.join(rnd.choices(letters, k=rnd.choice((0, 1, 2))))
+            text = text[:index] + added + text[index + count:]
+            start, count, converted = converter.update_units(
+                position, removed, added)
+            assert 0 <= start and start + count <= \
+                (units if converter.same_layout else len(output) // 2)
+            output = output[:start * 2] + converted.encode('utf-16-le') + \
+                output[(start + count) * 2:]
+            assert output.decode('utf-16-le') == \
+                getattr(coders, op)(text, algorithm, key)[1], \
+                (algorithm, text, position, removed, added)
+    assert make_converter('decode', 'Base64') is None
+
+
+if __name__ == '__main__':
+    main()
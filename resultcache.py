@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from time import time
+
+from pipeline import CANCELLABLE
+from textsdb import DB_FILENAME, pack_text, unpack_text
+
+
+# memory tier budget, bytes of cached Python strings
+MEMORY_BUDGET = 64 * 2 ** 20
+# SQLite tier budget, bytes of packed results
+DB_BUDGET = 256 * 2 ** 20
+CACHE_DB_FILENAME = os.path.join(os.path.dirname(DB_FILENAME),
+                                 'results_cache.sqlite')
+# shorter texts are converted faster than looked up
+CACHE_MIN = 1024
+# least recently used rows deleted at once when DB is over budget
+DB_EVICT_BATCH = 64
+
+
+def text_digest(text):
+    """Input digest of cache key"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+class ResultsDB():
+    """SQLite tier of ResultCache, results are packed by
+    textsdb.pack_text() and evicted by last use time"""
+    def __init__(self, db_filename=CACHE_DB_FILENAME, budget=DB_BUDGET):
+        """Init method.
+
+        Args:
+            db_filename: Text string defines db filename.
+            budget: Integer - max summary size of packed results.
+
+        """
+        self.db_filename = db_filename
+        self.budget = budget
+        self.conn = sqlite3.connect(db_filename, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS `results` (
+                               `op` TEXT NOT NULL,
+                               `algorithm` TEXT NOT NULL,
+                               `key` TEXT NOT NULL,
+                               `digest` BLOB NOT NULL,
+                               `codec` TEXT,
+                               `data` BLOB,
+                               `used` REAL,
+                               PRIMARY KEY (`op`, `algorithm`, `key`,
+                                            `digest`)
+                             )''')
+        self.conn.execute('''CREATE INDEX IF NOT EXISTS `results_used`
+                             ON `results`(`used`)''')
+        self.conn.commit()
+        self.size = self.conn.execute(
+            'SELECT COALESCE(SUM(LENGTH(`data`)), 0) FROM `results`'
+        ).fetchone()[0]
+        self.evictions = 0
+
+    def get(self, key):
+        """Return cached result of (op, algorithm, key, digest)
+        key or None, hit updates row use time"""
+        row = self.conn.execute('''SELECT `codec`, `data` FROM `results`
+                                   WHERE `op` = ? AND `algorithm` = ?
+                                   AND `key` = ? AND `digest` = ?''',
+                                key).fetchone()
+        if row is None:
+            return None
+        self.conn.execute('''UPDATE `results` SET `used` = ?
+                             WHERE `op` = ? AND `algorithm` = ?
+                             AND `key` = ? AND `digest` = ?''',
+                          (time(),) + key)
+        self.conn.commit()
+        return unpack_text(*row)
+
+    def put(self, key, text):
+        """Store result, least recently used rows are deleted
+        while DB is over budget"""
+        codec, data = pack_text(text)
+        if len(data) > self.budget:
+            return
+        old = self.conn.execute('''SELECT LENGTH(`data`) FROM `results`
+                                   WHERE `op` = ? AND `algorithm` = ?
+                                   AND `key` = ? AND `digest` = ?''',
+                                key).fetchone()
+        self.conn.execute('INSERT OR REPLACE INTO `results` '
+                          'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                          key + (codec, data, time()))
+        self.size += len(data) - (old[0] if old else 0)
+        while self.size > self.budget:
+            rows = self.conn.execute('''SELECT `rowid`, LENGTH(`data`)
+                                        FROM `results` ORDER BY `used`
+                                        LIMIT ?''',
+                                     (DB_EVICT_BATCH,)).fetchall()
+            for rowid, size in rows:
+                if self.size <= self.budget:
+                    break
+                self.conn.execute('DELETE FROM `results` WHERE `rowid` = ?',
+                                  (rowid,))
+                self.size -= size
+                self.evictions += 1
+        self.conn.commit()
+
+    def clear(self):
+        """Delete all results"""
+        self.conn.execute('DELETE FROM `results`')
+        self.conn.commit()
+        self.size = 0
+
+    def close(self):
+        """Close connection"""
+        self.conn.close()
+
+
+class ResultCache():
+    """Two-tier cache of conversion and hash results keyed by
+    (op, algorithm, key, input digest): LRU in memory with byte budget
+    and optional ResultsDB. Encoding result of codec with exact
+    decoding is registered as decoding result of its output too,
+    so decoding text back is a hit. Thread-safe."""
+    def __init__(self, budget=MEMORY_BUDGET, db_filename=None,
+                 db_budget=DB_BUDGET, min_size=CACHE_MIN):
+        """Init method.
+
+        Args:
+            budget: Integer - max bytes of cached strings in memory.
+            db_filename: Text string defines SQLite tier filename,
+                         None disables the tier.
+            db_budget: Integer - max bytes of packed results in DB.
+            min_size: Integer - shorter texts are not cached.
+
+        """
+        self.budget = budget
+        self.min_size = min_size
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.db = None
+        if db_filename:
+            self.attach_db(db_filename, db_budget)
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def attach_db(self, db_filename=CACHE_DB_FILENAME, budget=DB_BUDGET):
+        """Open SQLite tier, may be done after cache is in use"""
+        db = ResultsDB(db_filename, budget)
+        with self.lock:
+            self.db = db
+
+    @staticmethod
+    def make_key(op, algorithm, key, text):
+        """Cache key, algorithm key is normalized to text string"""
+        return (op, algorithm, '' if key is None else str(key),
+                text_digest(text))
+
+    def get(self, op, algorithm, key, text):
+        """Return cached result or None.
+
+        Args:
+            op: Text string - 'encode', 'decode' or 'hash'.
+            algorithm: Text string defines algorithm.
+            key: Text string or integer - algorithm key.
+            text: Text string - conversion input.
+
+        Returns:
+            Text string - cached result or None.
+
+        """
+        if len(text) < self.min_size:
+            return None
+        cache_key = self.make_key(op, algorithm, key, text)
+        with self.lock:
+            result = self.entries.get(cache_key)
+            if result is not None:
+                self.entries.move_to_end(cache_key)
+                self.hits += 1
+                return result
+            if self.db:
+                result = self.db.get(cache_key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.db_hits += 1
+            self.store(cache_key, result)
+        return result
+
+    def put(self, op, algorithm, key, text, result):
+        """Cache result, encoding result of CANCELLABLE codec
+        is also cached as decoding result of its output"""
+        if len(text) < self.min_size:
+            return
+        items = [(self.make_key(op, algorithm, key, text), result)]
+        if op == 'encode' and algorithm in CANCELLABLE:
+            items.append((self.make_key('decode', algorithm, key, result),
+                          text))
+        with self.lock:
+            for cache_key, value in items:
+                self.store(cache_key, value)
+                if self.db:
+                    self.db.put(cache_key, value)
+
+    def store(self, cache_key, value):
+        """Put value to memory tier evicting least recently used
+        entries, must be called under lock"""
+        size = sys.getsizeof(value)
+        if size > self.budget:
+            return
+        old = self.entries.pop(cache_key, None)
+        if old is not None:
+            self.size -= sys.getsizeof(old)
+        self.entries[cache_key] = value
+        self.size += size
+        while self.size > self.budget:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= sys.getsizeof(evicted)
+            self.evictions += 1
+
+    def convert(self, op, algorithm, key, text, func):
+        """Return cached result or func() result caching it"""
+        result = self.get(op, algorithm, key, text)
+        if result is None:
+            result = func()
+            self.put(op, algorithm, key, text, result)
+        return result
+
+    def stats(self):
+        """Dictionary of counters and sizes"""
+        with self.lock:
+            stats = {'hits': self.hits, 'db_hits': self.db_hits,
+                     'misses': self.misses, 'evictions': self.evictions,
+                     'entries': len(self.entries), 'size': self.size}
+            if self.db:
+                stats['db_size'] = self.db.size
+                stats['db_evictions'] = self.db.evictions
+        return stats
+
+    def clear(self):
+        """Drop all results of both tiers, counters are kept"""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            if self.db:
+                self.db.clear()
+
+    def close(self):
+        """Close SQLite tier"""
+        if self.db:
+            self.db.close()
+
+
+def main():
+    """minimal funcs testing"""
+    import tempfile
+    import coders
+    text = 'Hello Мир ' * 200
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_filename = os.path.join(tmp_dir, 'cache.sqlite')
+        cache = ResultCache(budget=64 * 1024, db_filename=db_filename)
+        encoded = cache.convert('encode', 'Vigenere', 'key', text,
+                                lambda: coders.vigenere_encode(text, 'key'))
+        assert cache.get('decode', 'Vigenere', 'key', encoded) == text
+        assert cache.get('encode', 'Vigenere', 'key', text) == encoded
+        assert cache.get('encode', 'Vigenere', 'other', text) is None
+        assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 2
+        for index in range(20):
+            cache.put('hash', 'md5', None, f'{index}' + text, 'x' * 4096)
+        assert cache.size <= cache.budget and cache.evictions
+        assert cache.get('decode', 'Vigenere', 'key', encoded) == text
+        assert cache.db_hits == 1
+        cache.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,568 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+import lzma
+import zlib
+import queue
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from itertools import zip_longest
+from time import time
+
+import metrics
+
+DB_FILENAME = 'saved_texts.sqlite'
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+POOL_SIZE = 4
+PREVIEW_LENGTH = 15
+PAGE_SIZE = 50
+INDEX_BATCH = 500
+SEARCH_LIMIT = 20
+HIGHLIGHT = ('[', ']')
+SNIPPET_LENGTH = 64
+MIGRATE_BATCH = 500
+# texts shorter than COMPRESS_MIN bytes are stored as is
+COMPRESS_MIN = 512
+COMPRESSORS = {'zlib': (zlib.compress, zlib.decompress),
+               'lzma': (lzma.compress, lzma.decompress)}
+
+
+def pack_text(text, compressor='zlib', threshold=COMPRESS_MIN):
+    """Encode text for bodies table.
+
+    Args:
+        text: Text string.
+        compressor: Text string - one of COMPRESSORS keys.
+        threshold: Integer - min size in bytes to compress.
+
+    Returns:
+        Text string - codec name, 'raw' for not compressed data.
+        Bytes - encoded text.
+
+    """
+    data = text.encode('utf-8')
+    if len(data) >= threshold:
+        packed = COMPRESSORS[compressor][0](data)
+        if len(packed) < len(data):
+            return compressor, packed
+    return 'raw', data
+
+
+def unpack_text(codec, data):
+    """Decode text packed by pack_text()"""
+    if codec != 'raw':
+        data = COMPRESSORS[codec][1](data)
+    return bytes(data).decode('utf-8')
+
+
+def make_snippet(text, words, highlight=HIGHLIGHT, length=SNIPPET_LENGTH):
+    """Cut text fragment around first found word
+    and highlight all words prefixes in it"""
+    pattern = re.compile('|'.join(r'(?<!\w)' + re.escape(word) + r'\w*'
+                                  for word in words), re.IGNORECASE)
+    found = pattern.search(text)
+    start = max(found.start() - length // 4, 0) if found else 0
+    fragment = text[start:start + length]
+    fragment = pattern.sub(lambda m: highlight[0] + m[0] + highlight[1],
+                           fragment)
+    return ('...' if start else '') + fragment + \
+        ('...' if start + length < len(text) else '')
+
+
+class ConnectionPool():
+    """Fixed-size pool of read-only connections,
+    lets background workers read while GUI thread writes"""
+    def __init__(self, db_filename, size=POOL_SIZE):
+        self.db_filename = db_filename
+        self.size = size
+        self.created = 0
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+
+    def connect(self):
+        """Open new read-only connection usable from any thread,
+        unpack_text() is available to queries as SQL function"""
+        conn = sqlite3.connect(self.db_filename, check_same_thread=False)
+        conn.execute('PRAGMA query_only = ON')
+        conn.create_function('unpack_text', 2, unpack_text,
+                             deterministic=True)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow connection from pool,
+        waits for idle one if all connections are busy"""
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                create = self.created < self.size
+                if create:
+                    self.created += 1
+            conn = self.connect() if create else self.idle.get()
+        try:
+            yield conn
+        finally:
+            self.idle.put(conn)
+
+    def close(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self.created = 0
+
+
+class TextsBatch():
+    """Operations collected by TextsDB.batch()"""
+    def __init__(self):
+        self.ops = []
+
+    def add_row(self, text, timestamp=None):
+        """Queue insert of new user-text"""
+        if not timestamp or not isinstance(timestamp, int):
+            timestamp = int(time())
+        self.ops.append(('insert', (text, timestamp)))
+
+    def delete_row(self, id_):
+        """Queue delete of id-specified text"""
+        self.ops.append(('delete', (id_,)))
+
+
+class TextsDB():
+    """DB-interaction class.
+    Writes go through one WAL-mode connection guarded by lock,
+    reads use connections pool."""
+    def __init__(self, db_filename=DB_FILENAME, synchronous='NORMAL',
+                 pool_size=POOL_SIZE, compact=True, compressor='zlib'):
+        """Init method.
+        Opens or create file-based db with required table 'texts'
+
+        Args:
+            db_filename: Text string defines db filename.
+            synchronous: Text string - one of SYNCHRONOUS_LEVELS.
+            pool_size: Integer - max read connections count.
+            compact: Boolean - store new texts content-addressed
+                     and compressed in 'bodies' table.
+            compressor: Text string - one of COMPRESSORS keys.
+
+        """
+        if synchronous.upper() not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f'Unknown synchronous level {synchronous!r}')
+        if compressor not in COMPRESSORS:
+            raise ValueError(f'Unknown compressor {compressor!r}')
+        self.db_filename = db_filename
+        self.table_name = 'texts'
+        self.bodies_name = 'bodies'
+        self.compact = compact
+        self.compressor = compressor
+        self.fts_name = 'texts_fts'
+        self.fts = False
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_filename, check_same_thread=False)
+        self.cur = self.conn.cursor()
+        self.cur.execute('PRAGMA journal_mode = WAL')
+        self.cur.execute(f'PRAGMA synchronous = {synchronous.upper()}')
+        self.init_db()
+        self.pool = ConnectionPool(db_filename, pool_size)
+
+    def __del__(self):
+        """Explicit is better than implicit"""
+        # __init__ may fail before connections are opened
+        if hasattr(self, 'pool'):
+            self.pool.close()
+        if hasattr(self, 'conn'):
+            self.conn.close()
+
+    def init_db(self):
+        """Creates 'texts' table with 4 fields:
+        id - autoincremented primary key;
+        text - user texts storage field, NULL for compact rows;
+        timestamp - timestamp of saved text;
+        body_id - 'bodies' row with text of compact row.
+        And 'bodies' table with unique texts keyed by sha256 digest:
+        codec - 'raw' or compressor name;
+        data - encoded text;
+        head - text beginning for previews."""
+        sql = f'''CREATE TABLE IF NOT EXISTS `{self.table_name}` (
+                    `id` INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT UNIQUE,
+                    `text` TEXT,
+                    `timestamp` INTEGER,
+                    `body_id` INTEGER
+                  )'''
+        bodies_sql = f'''CREATE TABLE IF NOT EXISTS `{self.bodies_name}` (
+                    `id` INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT UNIQUE,
+                    `digest` TEXT NOT NULL UNIQUE,
+                    `codec` TEXT,
+                    `data` BLOB,
+                    `head` TEXT
+                  )'''
+        with self.lock:
+            self.cur.execute(sql)
+            columns = [row[1] for row in self.cur.execute(
+                f'PRAGMA table_info(`{self.table_name}`);')]
+            if 'body_id' not in columns:
+                self.cur.execute(f'''ALTER TABLE `{self.table_name}`
+                                     ADD COLUMN `body_id` INTEGER;''')
+            self.cur.execute(bodies_sql)
+            self.cur.execute(f'''CREATE INDEX IF NOT EXISTS
+                                 `{self.table_name}_body_id`
+                                 ON `{self.table_name}`(`body_id`);''')
+            self.conn.commit()
+        self.init_fts()
+
+    def init_fts(self):
+        """Creates FTS5 full-text index of texts kept in sync by triggers.
+        Texts saved before index creation are indexed later
+        by index_step() calls, progress is kept in '*_state' table.
+        Compact rows bodies are indexed once per body
+        by contentless '*_bodies' index.
+        Search falls back to LIKE if SQLite has no FTS5."""
+        fts, table = self.fts_name, self.table_name
+        with self.lock, self.conn:
+            try:
+                self.cur.execute(f'''CREATE VIRTUAL TABLE IF NOT EXISTS
+                                     `{fts}_bodies`
+                                     USING fts5(`text`, content='');''')
+            except sqlite3.OperationalError:
+                return
+            exists = self.cur.execute(
+                '''SELECT 1 FROM sqlite_master WHERE name = ?;''',
+                (fts,)).fetchone()
+            if not exists:
+                self.cur.execute(f'''CREATE VIRTUAL TABLE `{fts}`
+                                     USING fts5(`text`);''')
+                self.cur.execute(f'''CREATE TABLE `{fts}_state` (
+                                       `indexed_upto` INTEGER,
+                                       `backfill_upto` INTEGER);''')
+                self.cur.execute(f'''INSERT INTO `{fts}_state`
+                                     SELECT 0, IFNULL(MAX(`id`), 0)
+                                     FROM `{table}`;''')
+                self.cur.execute(f'''CREATE TRIGGER `{fts}_insert`
+                                     AFTER INSERT ON `{table}`
+                                     WHEN new.`text` IS NOT NULL BEGIN
+                    INSERT INTO `{fts}`(rowid, `text`)
+                        VALUES (new.`id`, new.`text`);
+                END;''')
+                self.cur.execute(f'''CREATE TRIGGER `{fts}_delete`
+                                     AFTER DELETE ON `{table}` BEGIN
+                    DELETE FROM `{fts}` WHERE rowid = old.`id`;
+                END;''')
+                self.cur.execute(f'''CREATE TRIGGER `{fts}_update`
+                                     AFTER UPDATE OF `text` ON `{table}` BEGIN
+                    UPDATE `{fts}` SET `text` = new.`text`
+                        WHERE rowid = old.`id`;
+                END;''')
+        self.fts = True
+
+    def index_step(self, limit=INDEX_BATCH):
+        """Add next batch of texts saved before index creation
+        to full-text index, compact rows are indexed by bodies index.
+
+        Args:
+            limit: Integer - max texts count indexed by one call.
+
+        Returns:
+            Boolean - True if all texts are indexed.
+
+        """
+        if not self.fts:
+            return True
+        fts = self.fts_name
+        with self.lock, self.conn:
+            indexed, upto = self.cur.execute(
+                f'SELECT * FROM `{fts}_state`;').fetchone()
+            if indexed >= upto:
+                return True
+            rows = self.cur.execute(
+                f'''SELECT `id`, `text` FROM `{self.table_name}`
+                    WHERE `id` > ? AND `id` <= ? AND `text` IS NOT NULL
+                    ORDER BY `id` LIMIT ?;''',
+                (indexed, upto, limit)).fetchall()
+            self.cur.executemany(
+                f'INSERT INTO `{fts}`(rowid, `text`) VALUES (?, ?);', rows)
+            indexed = rows[-1][0] if len(rows) == limit else upto
+            self.cur.execute(f'UPDATE `{fts}_state` SET `indexed_upto` = ?;',
+                             (indexed,))
+        return indexed >= upto
+
+    def search(self, query, limit=SEARCH_LIMIT, highlight=HIGHLIGHT):
+        """Full-text search over saved texts,
+        every word of query matches as word prefix.
+
+        Args:
+            query: Text string - words to search.
+            limit: Integer - max results count.
+            highlight: Tuple - opening and closing marks of found words.
+
+        Returns:
+            List - (id, snippet, timestamp)-tuples, best matches first.
+
+        """
+        words = query.split()
+        if not words:
+            return []
+        if not self.fts:
+            # compact rows bodies are unpacked to match beyond head
+            sql = f'''SELECT t.`id`, t.`timestamp`,
+                             IFNULL(t.`text`, unpack_text(b.`codec`, b.`data`))
+                                 AS `body`
+                      FROM `{self.table_name}` t
+                      LEFT JOIN `{self.bodies_name}` b ON b.`id` = t.`body_id`
+                      WHERE `body` LIKE ?
+                      ORDER BY t.`id` DESC LIMIT ?;'''
+            return [(id_, make_snippet(text, words, highlight), timestamp)
+                    for id_, timestamp, text in
+                    self.query(sql, ('%' + query.strip() + '%', limit))]
+
+        match = ' '.join('"{}"*'.format(word.replace('"', '""'))
+                         for word in words)
+        sql = f'''SELECT t.`id`,
+                         snippet(`{self.fts_name}`, 0, ?, ?, '...', 12),
+                         t.`timestamp`
+                  FROM `{self.fts_name}` f
+                  JOIN `{self.table_name}` t ON t.`id` = f.rowid
+                  WHERE `{self.fts_name}` MATCH ?
+                  ORDER BY rank LIMIT ?;'''
+        found = self.query(sql, (*highlight, match, limit))
+        sql = f'''SELECT t.`id`, b.`codec`, b.`data`, t.`timestamp`
+                  FROM `{self.fts_name}_bodies` f
+                  JOIN `{self.table_name}` t ON t.`body_id` = f.rowid
+                  JOIN `{self.bodies_name}` b ON b.`id` = f.rowid
+                  WHERE `{self.fts_name}_bodies` MATCH ?
+                  ORDER BY rank LIMIT ?;'''
+        found_bodies = [(id_, make_snippet(unpack_text(codec, data),
+                                           words, highlight), timestamp)
+                        for id_, codec, data, timestamp in
+                        self.query(sql, (match, limit))]
+        # bm25 ranks of two indexes come from different statistics,
+        # so results are interleaved by their places in own index
+        return [row for pair in zip_longest(found, found_bodies)
+                for row in pair if row][:limit]
+
+    def query(self, sql, params=()):
+        """Run read query on pooled connection and return all rows"""
+        with self.pool.connection() as conn, \
+             metrics.span('db', 'query') as span:
+            rows = conn.execute(sql, params).fetchall()
+            span.size_out = len(rows)
+        return rows
+
+    def add_body(self, text):
+        """Returns id of 'bodies' row with text,
+        inserts packed text if there is no such row yet.
+        Must be called inside transaction."""
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        row = self.cur.execute(
+            f'SELECT `id` FROM `{self.bodies_name}` WHERE `digest` = ?;',
+            (digest,)).fetchone()
+        if row:
+            return row[0]
+        codec, data = pack_text(text, self.compressor)
+        self.cur.execute(
+            f'''INSERT INTO `{self.bodies_name}`
+                    (`digest`, `codec`, `data`, `head`)
+                VALUES (?, ?, ?, ?);''',
+            (digest, codec, data, text[:SNIPPET_LENGTH]))
+        body_id = self.cur.lastrowid
+        if self.fts:
+            self.cur.execute(
+                f'''INSERT INTO `{self.fts_name}_bodies`(rowid, `text`)
+                    VALUES (?, ?);''', (body_id, text))
+        return body_id
+
+    def collect_bodies(self, ids=None):
+        """Delete bodies not referenced by texts anymore.
+        Must be called inside transaction.
+
+        Args:
+            ids: Iterable of integers - bodies to check,
+                 all bodies are checked if not set.
+
+        """
+        sql = f'''SELECT `id`, `codec`, `data` FROM `{self.bodies_name}` b
+                  WHERE NOT EXISTS (SELECT 1 FROM `{self.table_name}`
+                                    WHERE `body_id` = b.`id`)'''
+        if ids is None:
+            rows = self.cur.execute(sql).fetchall()
+        else:
+            rows = [row for id_ in set(ids) if id_ for row in
+                    self.cur.execute(sql + ' AND b.`id` = ?', (id_,))]
+        for id_, codec, data in rows:
+            if self.fts:
+                self.cur.execute(
+                    f'''INSERT INTO `{self.fts_name}_bodies`
+                            (`{self.fts_name}_bodies`, rowid, `text`)
+                        VALUES ('delete', ?, ?);''',
+                    (id_, unpack_text(codec, data)))
+            self.cur.execute(
+                f'DELETE FROM `{self.bodies_name}` WHERE `id` = ?;', (id_,))
+
+    def insert_rows(self, rows):
+        """Insert (text, timestamp) rows,
+        must be called inside transaction.
+
+        Returns:
+            Integer - id of the last inserted row.
+
+        """
+        with metrics.span('db', 'insert_rows', len(rows)) as span:
+            if self.compact:
+                sql = f'''INSERT INTO `{self.table_name}`
+                            (`timestamp`, `body_id`) VALUES (?, ?);'''
+                rows = [(timestamp, self.add_body(text))
+                        for text, timestamp in rows]
+            else:
+                sql = f'''INSERT INTO `{self.table_name}`
+                            (`text`, `timestamp`) VALUES (?, ?);'''
+            if len(rows) == 1:
+                # executemany() does not update lastrowid
+                self.cur.execute(sql, rows[0])
+            else:
+                self.cur.executemany(sql, rows)
+            span.size_out = len(rows)
+        return self.cur.lastrowid
+
+    def delete_rows(self, ids):
+        """Delete id-specified texts and their unused bodies,
+        must be called inside transaction"""
+        ids = [(id_,) for id_ in ids]
+        with metrics.span('db', 'delete_rows', len(ids)) as span:
+            body_ids = [row[0] for id_ in ids for row in self.cur.execute(
+                f'''SELECT `body_id` FROM `{self.table_name}`
+                    WHERE `id` = ?;''', id_)]
+            self.cur.executemany(
+                f'DELETE FROM `{self.table_name}` WHERE `id` = ?;', ids)
+            self.collect_bodies(body_ids)
+            span.size_out = len(ids)
+
+    def add_row(self, text, timestamp=None):
+        """Inserts new user-text into table"""
+        if not timestamp or not isinstance(timestamp, int):
+            timestamp = int(time())
+
+        with self.lock, self.conn:
+            return self.insert_rows([(text, timestamp)])
+
+    @contextmanager
+    def batch(self):
+        """Group many inserts and deletes into one transaction:
+
+            with tdb.batch() as batch:
+                batch.add_row(text)
+                batch.delete_row(id_)
+
+        Operations run in order on exit, consecutive operations
+        of the same kind are executed by one executemany() call.
+        Nothing is written if block raises."""
+        batch = TextsBatch()
+        yield batch
+        with self.lock, self.conn:
+            start = 0
+            for end in range(1, len(batch.ops) + 1):
+                kind = batch.ops[start][0]
+                if end == len(batch.ops) or batch.ops[end][0] != kind:
+                    args = [op[1] for op in batch.ops[start:end]]
+                    if kind == 'insert':
+                        self.insert_rows(args)
+                    else:
+                        self.delete_rows(arg[0] for arg in args)
+                    start = end
+
+    def migrate_step(self, limit=MIGRATE_BATCH):
+        """Convert next batch of plain text rows to compact ones,
+        every batch runs in its own transaction.
+
+        Args:
+            limit: Integer - max rows count converted by one call.
+
+        Returns:
+            Boolean - True if there are no plain text rows left.
+
+        """
+        if not self.compact:
+            return True
+        with self.lock, self.conn:
+            rows = self.cur.execute(
+                f'''SELECT `id`, `text` FROM `{self.table_name}`
+                    WHERE `text` IS NOT NULL ORDER BY `id` LIMIT ?;''',
+                (limit,)).fetchall()
+            self.cur.executemany(
+                f'''UPDATE `{self.table_name}`
+                    SET `text` = NULL, `body_id` = ? WHERE `id` = ?;''',
+                [(self.add_body(text), id_) for id_, text in rows])
+            if self.fts:
+                self.cur.executemany(
+                    f'DELETE FROM `{self.fts_name}` WHERE rowid = ?;',
+                    [(id_,) for id_, text in rows])
+        return len(rows) < limit
+
+    def get_row(self, id_=None):
+        """Returns id-defined text from table
+        or last text if id not specified,
+        None if there is no such text"""
+        sql = f'''SELECT t.`text`, b.`codec`, b.`data`
+                  FROM `{self.table_name}` t
+                  LEFT JOIN `{self.bodies_name}` b ON b.`id` = t.`body_id`'''
+        if not id_:
+            res = self.query(sql + ' ORDER BY t.`id` DESC LIMIT 1;')
+        else:
+            res = self.query(sql + ' WHERE t.`id` = ?;', (id_,))
+        if not res:
+            return None
+
+        text, codec, data = res[0]
+        return text if codec is None else unpack_text(codec, data)
+
+    def get_rows(self):
+        """Returns list of (id, text)-tuples with all texts from table"""
+        sql = f'''SELECT t.`id`, t.`text`, b.`codec`, b.`data`
+                  FROM `{self.table_name}` t
+                  LEFT JOIN `{self.bodies_name}` b ON b.`id` = t.`body_id`
+                  ORDER BY t.`id`;'''
+        return [(id_, text if codec is None else unpack_text(codec, data))
+                for id_, text, codec, data in self.query(sql)]
+
+    def get_previews(self, after_id=0, limit=PAGE_SIZE,
+                     length=PREVIEW_LENGTH):
+        """Returns page of texts previews ordered by id,
+        full texts are not read.
+
+        Args:
+            after_id: Integer - last id of previous page (keyset).
+            limit: Integer - max page length.
+            length: Integer - preview length in chars.
+
+        Returns:
+            List - (id, text prefix, timestamp)-tuples.
+
+        """
+        sql = f'''SELECT t.`id`, substr(IFNULL(t.`text`, b.`head`), 1, ?),
+                         t.`timestamp`
+                    FROM `{self.table_name}` t
+                    LEFT JOIN `{self.bodies_name}` b
+                        ON b.`id` = t.`body_id`
+                    WHERE t.`id` > ?
+                    ORDER BY t.`id` LIMIT ?;'''
+        return self.query(sql, (length, after_id or 0, limit))
+
+    def delete_row(self, id_):
+        """Deletes id-specified text from table"""
+        with self.lock, self.conn:
+            self.delete_rows((id_,))
+
+    def clear_db(self):
+        """Like DROP TABLE but more gentle"""
+        with self.lock, self.conn:
+            self.cur.execute(f'DELETE FROM `{self.table_name}`')
+            self.cur.execute(f'DELETE FROM `{self.bodies_name}`')
+            if self.fts:
+                self.cur.execute(
+                    f'''INSERT INTO `{self.fts_name}_bodies`
+                            (`{self.fts_name}_bodies`)
+                        VALUES ('delete-all');''')
@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from coders import CHUNK_SIZE
+import binary
+import coders
+import cryptanalysis
+import largefile
+import hashes
+
+
+# ranked ROT shifts returned by RotCrackWorker
+ROT_CRACK_TOP = 3
+# Vigenere key candidates returned by VigenereCrackWorker
+VIGENERE_CRACK_TOP = 5
+# min text length evaluated by process pool, shorter texts are
+# analyzed faster than pool round trips
+VIGENERE_PARALLEL_MIN = 20000
+
+
+class Cancelled(Exception):
+    """Conversion interrupted by user"""
+
+
+class WorkerSignals(QObject):
+    """Signals of ConvertWorker.
+    QRunnable is not a QObject so signals live here"""
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object, object)
+
+
+class ConvertWorker(QRunnable):
+    """Thread pool job converting text chunk by chunk.
+    Emits progress in percents after every chunk and
+    finished(error, text) at the end, text is None on error."""
+    def __init__(self, text, convert, chunk_size=CHUNK_SIZE):
+        """Init method.
+
+        Args:
+            text: Text string for conversion.
+            convert: Callable - takes iterable of text chunks,
+                     returns iterable of converted chunks.
+            chunk_size: Integer - max chunk length.
+
+        """
+        super().__init__()
+        self.text = text
+        self.convert = convert
+        self.chunk_size = chunk_size
+        self.cancelled = False
+        self.signals = WorkerSignals()
+
+    def cancel(self):
+        """Ask job to stop before the next chunk"""
+        self.cancelled = True
+
+    def track(self, chunks, total):
+        """Pass chunks through with progress report and cancel check.
+
+        Args:
+            chunks: Iterable of text strings or bytes-like objects.
+            total: Integer - summary length of all chunks.
+
+        Returns:
+            Generator - the same chunks.
+
+        """
+        done = 0
+        for chunk in chunks:
+            if self.cancelled:
+                raise Cancelled('Conversion cancelled')
+            self.signals.progress.emit(done * 100 // total)
+            yield chunk
+            done += len(chunk)
+
+    def chunks(self):
+        """Source text chunks"""
+        for start in range(0, len(self.text), self.chunk_size):
+            yield self.text[start:start + self.chunk_size]
+
+    def process(self):
+        """Job body, returns conversion result"""
+        chunks = self.track(self.chunks(), len(self.text))
+        return ''.join(self.convert(chunks))
+
+    def run(self):
+        """Thread pool entry point"""
+        error, result = None, None
+        try:
+            result = self.process()
+            if self.cancelled:
+                raise Cancelled('Conversion cancelled')
+            self.signals.progress.emit(100)
+        except Exception as ex:
+            error = {'title': ex.__class__.__name__, 'text': str(ex)}
+            result = None
+        self.text = None
+        self.signals.finished.emit(error, result)
+
+
+class CachedConvertWorker(ConvertWorker):
+    """ConvertWorker returning result from resultcache.ResultCache
+    if it is there, computed result is cached.
+    cached attribute tells where result came from."""
+    def __init__(self, text, convert, cache, op, algorithm, key=None):
+        """Init method.
+
+        Args:
+            text: Text string for conversion.
+            convert: Callable - takes iterable of text chunks,
+                     returns iterable of converted chunks.
+            cache: resultcache.ResultCache instance.
+            op: Text string - 'encode', 'decode' or 'hash'.
+            algorithm: Text string defines algorithm.
+            key: Text string or integer - algorithm key.
+
+        """
+        super().__init__(text, convert)
+        self.cache = cache
+        self.conversion = (op, algorithm, key)
+        self.cached = False
+
+    def process(self):
+        """Take result from cache or convert text and cache result"""
+        result = self.cache.get(*self.conversion, self.text)
+        if result is not None:
+            self.cached = True
+            return result
+        result = super().process()
+        if not self.cancelled:
+            self.cache.put(*self.conversion, self.text, result)
+        return result
+
+
+class FileHashWorker(ConvertWorker):
+    """Thread pool job hashing memory-mapped file by slices,
+    file content never gets into Python strings."""
+    def __init__(self, file_name, algorithm,
+                 chunk_size=hashes.FILE_CHUNK_SIZE):
+        """Init method.
+
+        Args:
+            file_name: Text string defines filename.
+            algorithm: Text string defines hash-algorithm.
+            chunk_size: Integer - bytes fed to hash object at once.
+
+        """
+        super().__init__(None, None, chunk_size)
+        self.file_name = file_name
+        self.algorithm = algorithm
+
+    def process(self):
+        """Hash file, returns hexdigest"""
+        with open(self.file_name, 'rb') as fp:
+            size = os.fstat(fp.fileno()).st_size
+            chunks = hashes.iter_file_slices(fp, self.chunk_size)
+            return hashes.get_md_stream(self.track(chunks, size),
+                                        self.algorithm)
+
+
+class MultiHashWorker(ConvertWorker):
+    """Thread pool job hashing text by several algorithms in one pass.
+    Result is (errors, digests) tuple from hashes.get_mds_stream()."""
+    def __init__(self, text, algorithms,
+                 chunk_size=hashes.FILE_CHUNK_SIZE):
+        """Init method.
+
+        Args:
+            text: Text string for hashing.
+            algorithms: Iterable of text strings defines hash-algorithms.
+            chunk_size: Integer - bytes fed to hash objects at once.
+
+        """
+        super().__init__(text, None, chunk_size)
+        self.algorithms = algorithms
+
+    def process(self):
+        """Hash text, returns errors and digests dictionaries"""
+        data = memoryview(self.text.encode('utf-8'))
+        chunks = (data[start:start + self.chunk_size]
+                  for start in range(0, len(data), self.chunk_size))
+        return hashes.get_mds_stream(self.track(chunks, len(data)),
+                                     self.algorithms)
+
+
+class BinaryOpenWorker(FileHashWorker):
+    """Thread pool job encoding binary file to text,
+    file is read by memory-mapped slices."""
+    def process(self):
+        """Encode file, returns encoded text"""
+        with open(self.file_name, 'rb') as fp:
+            size = os.fstat(fp.fileno()).st_size
+            chunks = hashes.iter_file_slices(fp, self.chunk_size)
+            chunks = binary.encode_stream(self.track(chunks, size),
+                                          self.algorithm)
+            return b''.join(chunks).decode('ascii')
+
+
+class BinarySaveWorker(ConvertWorker):
+    """Thread pool job decoding text to binary file.
+    Result is None, file is written chunk by chunk."""
+    def __init__(self, text, algorithm, file_name, chunk_size=CHUNK_SIZE):
+        """Init method.
+
+        Args:
+            text: Text string - encoded data.
+            algorithm: Text string - one of binary.CODECS names.
+            file_name: Text string defines result filename.
+            chunk_size: Integer - max chunk length.
+
+        """
+        super().__init__(text, None, chunk_size)
+        self.algorithm = algorithm
+        self.file_name = file_name
+
+    def process(self):
+        """Decode text into file"""
+        chunks = self.track(self.chunks(), len(self.text))
+        with open(self.file_name, 'wb') as out:
+            for data in binary.decode_stream(chunks, self.algorithm):
+                out.write(data)
+
+
+class FileConvertWorker(FileHashWorker):
+    """Thread pool job converting memory-mapped UTF-8 file
+    into another file chunk by chunk, result is None."""
+    def __init__(self, file_name, convert, out_name,
+                 chunk_size=hashes.FILE_CHUNK_SIZE):
+        """Init method.
+
+        Args:
+            file_name: Text string defines source filename.
+            convert: Callable - takes iterable of text chunks,
+                     returns iterable of converted chunks.
+            out_name: Text string defines result filename.
+            chunk_size: Integer - bytes decoded at once.
+
+        """
+        super().__init__(file_name, None, chunk_size)
+        self.convert = convert
+        self.out_name = out_name
+
+    def process(self):
+        """Convert file into out_name file"""
+        with open(self.file_name, 'rb') as fp, \
+                open(self.out_name, 'w', encoding='utf-8',
+                     newline='') as out:
+            size = os.fstat(fp.fileno()).st_size
+            chunks = hashes.iter_file_slices(fp, self.chunk_size)
+            chunks = largefile.decode_chunks(self.track(chunks, size))
+            for text in self.convert(chunks):
+                out.write(text)
+
+
+class HistoryWorker(ConvertWorker):
+    """Thread pool job rebuilding text of history.ConversionHistory
+    state, result is the state text."""
+    def __init__(self, history, index):
+        """Init method.
+
+        Args:
+            history: history.ConversionHistory instance.
+            index: Integer - state index.
+
+        """
+        super().__init__(None, None)
+        self.history = history
+        self.index = index
+
+    def process(self):
+        """Rebuild state text"""
+        return self.history.rebuild(self.index)
+
+
+class RotCrackWorker(ConvertWorker):
+    """Thread pool job finding ROT key of text.
+    Result is (ranked, text) tuple - cryptanalysis.rot_crack()
+    shift scores and text decoded by the best shift."""
+    def __init__(self, text, top=ROT_CRACK_TOP):
+        """Init method.
+
+        Args:
+            text: Text string - ROT encoded text.
+            top: Integer - max ranked shifts count.
+
+        """
+        super().__init__(text, None)
+        self.top = top
+
+    def process(self):
+        """Rank shifts and decode text"""
+        ranked = cryptanalysis.rot_crack(self.text, self.top)
+        if not ranked:
+            raise ValueError('No Latin or Cyrillic letters to analyze')
+        return ranked, coders.rot13_decode(self.text, ranked[0].shift)
+
+
+class VigenereCrackWorker(ConvertWorker):
+    """Thread pool job finding Vigenere keys of text.
+    Result is cryptanalysis.vigenere_crack() key candidates list."""
+    def __init__(self, text, top=VIGENERE_CRACK_TOP, executor=None):
+        """Init method.
+
+        Args:
+            text: Text string - Vigenere encoded text.
+            top: Integer - max key candidates count.
+            executor: concurrent.futures executor evaluating key lengths
+                      of texts from VIGENERE_PARALLEL_MIN chars.
+
+        """
+        super().__init__(text, None)
+        self.top = top
+        self.executor = executor
+
+    def process(self):
+        """Find key candidates"""
+        executor = self.executor \
+            if len(self.text) >= VIGENERE_PARALLEL_MIN else None
+        ranked = cryptanalysis.vigenere_crack(self.text, self.top,
+                                              executor=executor)
+        if not ranked:
+            raise ValueError('No Latin or Cyrillic letters to analyze')
+        return ranked